@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+import argparse
+import concurrent.futures
+import os
+import sys
+import typing as t
+
+import requirements_tester
+import tracing
+from journal import ProbeJournal
+from lockdiff import LockDiff
+from reqparser import Interner, LockfileParser, Requirement, RequirementsParser
+from workspace import ProbePool
+
+# these rely on running in a single project's directory
+UNSUPPORTED_OPTIONS = ("worker", "queue_dir", "test_impact", "bisect_versions")
+
+
+class Project:
+    def __init__(self, directory: str, interner: t.Optional[Interner] = None):
+        self.directory = os.path.abspath(directory)
+        with open(os.path.join(self.directory, "requirements.txt"), "r") as f:
+            self.reqs = LockfileParser(f, interner).parse()
+        with open(os.path.join(self.directory, "requirements.in"), "r") as f:
+            force_versioned_requirements = {req.name for req in RequirementsParser(f).parse() if req.specs}
+        self.unversioned_requirements = {r.name for r in self.reqs if r.name not in force_versioned_requirements}
+        self.run_id = requirements_tester.get_run_id(self.directory)
+
+    def path(self, filename: str) -> str:
+        # relative paths from the command line are per project, absolute ones are shared
+        return os.path.join(self.directory, filename)
+
+
+def search_projects(
+    projects: list[Project],
+    pool: ProbePool,
+    make_options: t.Callable[[Project], requirements_tester.ProbeOptions],
+    parallel_projects: int,
+    lookahead: int = 1,
+    strategy: str = "binary",
+    prune_unchanged: bool = False,
+) -> dict[str, t.Union[list[Requirement], Exception]]:
+    # each search runs in its own thread and hands its probes to the shared pool, so one project's slow probes
+    # leave the pool's workers to the others
+    def search_project(project: Project) -> list[Requirement]:
+        options = make_options(project)
+        unversioned_requirements = project.unversioned_requirements
+        tree = None
+        if prune_unchanged:
+            lock_diff = LockDiff(
+                project.reqs,
+                requirements_tester.resolve_pins(unversioned_requirements, project.reqs, options),
+            )
+            print(f"{project.directory}: {lock_diff.summary()}")
+            tree = lock_diff.prune()
+            unversioned_requirements = unversioned_requirements & lock_diff.changed
+        return requirements_tester.search(
+            project.reqs,
+            unversioned_requirements,
+            options,
+            pool=pool.for_project(project.directory),
+            lookahead=lookahead,
+            strategy=strategy,
+            tree=tree,
+        )
+
+    results: dict[str, t.Union[list[Requirement], Exception]] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallel_projects) as executor:
+        futures = {executor.submit(search_project, project): project for project in projects}
+        for future in concurrent.futures.as_completed(futures):
+            project = futures[future]
+            try:
+                results[project.directory] = future.result()
+            except Exception as e:
+                # one broken project should not cost the results of the others
+                results[project.directory] = e
+    return results
+
+
+def main(args: list[str]) -> dict[str, t.Union[list[Requirement], Exception]]:
+    parser = argparse.ArgumentParser(
+        description="Find the requirement updates that cause tests to fail in many projects at once, sharing"
+        " resolutions, environments, downloads and probe workers between them. Any other arguments are"
+        " requirements_tester options, applied to every project"
+    )
+    parser.add_argument(
+        "--projects",
+        nargs="+",
+        required=True,
+        help="Project directories, each with requirements.in, requirements.txt and requirements.dev.in",
+    )
+    parser.add_argument(
+        "--parallel-projects", type=int, default=4, help="Number of projects whose searches run at the same time"
+    )
+    batch_options, tester_args = parser.parse_known_args(args[1:])
+    options = requirements_tester.parse_args(tester_args)
+    for name in UNSUPPORTED_OPTIONS:
+        if getattr(options, name):
+            parser.error(f"--{name.replace('_', '-')} is not supported in batch mode")
+
+    interner = Interner()
+    projects = [Project(directory, interner) for directory in batch_options.projects]
+    print(
+        f"Parsed {len(projects)} projects: {sum(len(p.reqs) for p in projects)} requirements sharing"
+        f" {len(interner)} distinct names, versions and lines"
+    )
+
+    shared_options = requirements_tester.build_shared_probe_options(options)
+    cache, env_pool, wheelhouse = shared_options.cache, shared_options.env_pool, shared_options.wheelhouse
+    if wheelhouse is not None:
+        if not options.offline:
+            # pip skips the files an earlier project already downloaded
+            for project in projects:
+                requirements_tester.prefetch_wheelhouse(
+                    wheelhouse, project.reqs, project.unversioned_requirements, project.directory
+                )
+        elif not wheelhouse.exists():
+            raise Exception(f"Wheelhouse {wheelhouse.directory} is empty, cannot run offline")
+    # batch searches always run in workspaces, as projects can't share a directory or the running interpreter
+    pool = ProbePool(
+        options.jobs,
+        options.workspace_dir,
+        keep_workspaces=options.keep_workspaces,
+        create_virtualenvs=env_pool is None,
+    )
+    journals: list[ProbeJournal] = []
+    tracing.TRACER.enabled = True
+
+    def make_options(project: Project) -> requirements_tester.ProbeOptions:
+        journal = ProbeJournal(project.path(options.journal), project.run_id, resume=options.resume)
+        journals.append(journal)
+        return requirements_tester.build_probe_options(
+            options, project.reqs, project.directory, shared=shared_options, journal=journal
+        )
+
+    try:
+        results = search_projects(
+            projects,
+            pool,
+            make_options,
+            batch_options.parallel_projects,
+            options.lookahead,
+            options.strategy,
+            options.prune_unchanged,
+        )
+    finally:
+        pool.shutdown()
+        for journal in journals:
+            journal.close()
+        if env_pool is not None:
+            print(env_pool.summary())
+        if cache is not None:
+            print(cache.stats())
+        print(tracing.TRACER.summary())
+        if options.trace:
+            tracing.TRACER.write_chrome_trace(options.trace)
+
+    for project in projects:
+        result = results[project.directory]
+        if isinstance(result, Exception):
+            print(f"{project.directory}: search failed: {result}")
+        else:
+            print(f"{project.directory}: {', '.join(r.name for r in result) or 'no culprits'}")
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv)
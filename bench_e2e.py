@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+import zipfile
+
+import requirements_tester
+
+VERSIONS = ("1.0.0", "1.1.0")
+# tools the generated project needs in the wheelhouse for an offline run
+TEST_REQUIREMENTS = ("pytest",)
+
+CONFTEST = '''
+def pytest_addoption(parser):
+    # requirements_tester always passes pytest-django's --reuse-db
+    parser.addoption("--reuse-db", action="store_true")
+'''
+
+
+def package_name(idx: int) -> str:
+    return f"benchpkg-{idx:03d}"
+
+
+def module_name(idx: int) -> str:
+    return f"benchpkg_{idx:03d}"
+
+
+def generate_graph(packages: int, seed: int = 0) -> list[list[int]]:
+    # dependencies[idx] only lists higher indices, so the graph is acyclic and the low indices are the roots
+    rng = random.Random(seed)
+    return [
+        sorted(rng.sample(range(idx + 1, packages), min(packages - idx - 1, rng.randint(0, 2))))
+        for idx in range(packages)
+    ]
+
+
+def _record_line(path: str, content: bytes) -> str:
+    digest = base64.urlsafe_b64encode(hashlib.sha256(content).digest()).rstrip(b"=").decode("ascii")
+    return f"{path},sha256={digest},{len(content)}"
+
+
+def build_wheel(directory: str, name: str, module: str, version: str, requires: t.Sequence[str], value: str) -> str:
+    dist_info = f"{module}-{version}.dist-info"
+    files = {
+        f"{module}/__init__.py": f"VALUE = {value!r}\n".encode("utf-8"),
+        f"{dist_info}/METADATA": "".join(
+            [f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"]
+            + [f"Requires-Dist: {requirement}\n" for requirement in requires]
+        ).encode("utf-8"),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: bench_e2e\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = [_record_line(path, content) for path, content in files.items()] + [f"{dist_info}/RECORD,,"]
+    files[f"{dist_info}/RECORD"] = ("\n".join(record) + "\n").encode("utf-8")
+    path = os.path.join(directory, f"{module}-{version}-py3-none-any.whl")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as wheel:
+        for filename, content in files.items():
+            wheel.writestr(filename, content)
+    return path
+
+
+def build_index(wheelhouse: str, dependencies: list[list[int]], culprit: int):
+    os.makedirs(wheelhouse, exist_ok=True)
+    for idx, depends_on in enumerate(dependencies):
+        for version in VERSIONS:
+            value = "broken" if idx == culprit and version == VERSIONS[-1] else "ok"
+            requires = [f"{package_name(dependency)}>={VERSIONS[0]}" for dependency in depends_on]
+            build_wheel(wheelhouse, package_name(idx), module_name(idx), version, requires, value)
+
+
+def prefetch_test_requirements(wheelhouse: str):
+    # the only step that needs an index, and it is skipped when the wheels are already there
+    subprocess.run(
+        [sys.executable, "-m", "pip", "download", "--quiet", "--dest", wheelhouse, *TEST_REQUIREMENTS], check=True
+    )
+
+
+def build_project(project: str, dependencies: list[list[int]]):
+    os.makedirs(project, exist_ok=True)
+    dependents: list[list[int]] = [[] for _ in dependencies]
+    for idx, depends_on in enumerate(dependencies):
+        for dependency in depends_on:
+            dependents[dependency].append(idx)
+    roots = [idx for idx, via in enumerate(dependents) if not via]
+
+    with open(os.path.join(project, "requirements.in"), "w") as f:
+        f.writelines(f"{package_name(idx)}\n" for idx in roots)
+    # the pip-compile output for the first version of everything, which is what the tester starts from
+    with open(os.path.join(project, "requirements.txt"), "w") as f:
+        f.write("#\n# This file is autogenerated by pip-compile\n#\n")
+        for idx, via in enumerate(dependents):
+            f.write(f"{package_name(idx)}=={VERSIONS[0]}\n")
+            names = [package_name(dependent) for dependent in via] or ["-r requirements.in"]
+            if len(names) == 1:
+                f.write(f"    # via {names[0]}\n")
+            else:
+                f.write("    # via\n")
+                f.writelines(f"    #   {name}\n" for name in names)
+    with open(os.path.join(project, "requirements.dev.in"), "w") as f:
+        f.write("-r requirements.txt\n\n")
+        f.writelines(f"{requirement}\n" for requirement in TEST_REQUIREMENTS)
+    with open(os.path.join(project, "conftest.py"), "w") as f:
+        f.write(CONFTEST)
+    with open(os.path.join(project, "test_packages.py"), "w") as f:
+        for idx in range(len(dependencies)):
+            f.write(f"import {module_name(idx)}\n")
+        f.write("\n\n")
+        for idx in range(len(dependencies)):
+            f.write(f"def test_{module_name(idx)}():\n    assert {module_name(idx)}.VALUE == 'ok'\n\n\n")
+
+
+def read_journal(path: str) -> list[dict]:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f.readlines()[1:]]
+
+
+def main(args: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        description="Run the full requirements tester offline against a generated package index and project"
+    )
+    parser.add_argument("--packages", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--culprit", type=int, help="Index of the package whose newest version breaks the tests")
+    parser.add_argument("--directory", help="Where to build the index and project, a temporary directory by default")
+    parser.add_argument("--max-seconds", type=float, help="Exit with an error when the run takes longer than this")
+    parser.add_argument(
+        "tester_args", nargs=argparse.REMAINDER, help="Extra requirements_tester arguments, after a --"
+    )
+    options = parser.parse_args(args[1:])
+
+    rng = random.Random(options.seed)
+    dependencies = generate_graph(options.packages, options.seed)
+    culprit = options.culprit if options.culprit is not None else rng.randrange(options.packages)
+    root = options.directory or tempfile.mkdtemp(prefix="bench-e2e-")
+    wheelhouse = os.path.join(root, "wheelhouse")
+    project = os.path.join(root, "project")
+    journal = os.path.join(root, "journal.jsonl")
+
+    build_index(wheelhouse, dependencies, culprit)
+    if not any(name.startswith(TEST_REQUIREMENTS) for name in os.listdir(wheelhouse)):
+        prefetch_test_requirements(wheelhouse)
+    build_project(project, dependencies)
+    print(f"Planted a breaking {package_name(culprit)}=={VERSIONS[-1]} in {wheelhouse}")
+
+    tester_args = [a for a in options.tester_args if a != "--"]
+    started = time.monotonic()
+    previous_directory = os.getcwd()
+    os.chdir(project)
+    try:
+        culprits = requirements_tester.main(
+            [
+                "requirements_tester.py",
+                "--wheelhouse",
+                wheelhouse,
+                "--offline",
+                "--no-cache",
+                "--journal",
+                journal,
+                "--workspace-dir",
+                os.path.join(root, "workspaces"),
+                # probe workspaces get their own virtualenvs, the benchmark must never sync the running interpreter
+                "--jobs",
+                "2",
+                *tester_args,
+            ]
+        )
+    finally:
+        os.chdir(previous_directory)
+    elapsed = time.monotonic() - started
+
+    entries = read_journal(journal)
+    probes = [entry for entry in entries if not entry["reused"]]
+    print(f"{'stage':<8} {'mean s':>8} {'total s':>9}")
+    for stage in ("compile", "install", "test"):
+        seconds = [entry[f"{stage}_seconds"] for entry in probes]
+        print(f"{stage:<8} {sum(seconds) / max(len(seconds), 1):>8.2f} {sum(seconds):>9.2f}")
+    print(f"{len(probes)} probes ({len(entries) - len(probes)} reused) in {elapsed:.1f}s")
+
+    found = [r.name for r in culprits or []]
+    if found != [package_name(culprit)]:
+        sys.exit(f"Expected to find {package_name(culprit)}, found {found or 'nothing'}")
+    if options.max_seconds is not None and elapsed > options.max_seconds:
+        sys.exit(f"Took {elapsed:.1f}s, more than the allowed {options.max_seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+import argparse
+import random
+import sys
+import time
+import typing as t
+
+from reqparser import LockfileParser, RequirementsParser
+
+
+def generate_lock_file(entries: int, hashes: bool, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    names = [f"package-{idx:05d}" for idx in range(entries)]
+    lines = [
+        "#\n",
+        "# This file is autogenerated by pip-compile with python 3.9\n",
+        "# To update, run:\n",
+        "#\n",
+        "#    pip-compile requirements.in\n",
+        "#\n",
+    ]
+    for idx, name in enumerate(names):
+        version = f"{rng.randint(0, 30)}.{rng.randint(0, 30)}.{rng.randint(0, 30)}"
+        if hashes:
+            lines.append(f"{name}=={version} \\\n")
+            lines.append(f"    --hash=sha256:{rng.getrandbits(256):064x} \\\n")
+            lines.append(f"    --hash=sha256:{rng.getrandbits(256):064x}\n")
+        else:
+            lines.append(f"{name}=={version}\n")
+        # packages only depend on packages later in the file, so the graph is acyclic
+        dependents = rng.sample(names[:idx], min(idx, rng.randint(0, 3))) if idx else []
+        if not dependents:
+            lines.append("    # via -r requirements.in\n")
+        elif len(dependents) == 1:
+            lines.append(f"    # via {dependents[0]}\n")
+        else:
+            lines.append("    # via\n")
+            lines.extend(f"    #   {dependent}\n" for dependent in sorted(dependents))
+    return lines
+
+
+def time_parser(parse: t.Callable[[list[str]], list], lines: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(lines)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(args: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Compare lock file parser throughput")
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(args[1:])
+
+    plain = generate_lock_file(options.entries, hashes=False)
+    hashed = generate_lock_file(options.entries, hashes=True)
+    results = [
+        ("RequirementsParser", time_parser(lambda lines: RequirementsParser(lines).parse(), plain, options.repeat)),
+        ("LockfileParser", time_parser(lambda lines: LockfileParser(lines).parse(), plain, options.repeat)),
+        (
+            "LockfileParser (hashes)",
+            time_parser(lambda lines: LockfileParser(lines).parse(), hashed, options.repeat),
+        ),
+    ]
+    print(f"{'parser':<26} {'seconds':>8} {'entries/s':>12}")
+    for name, seconds in results:
+        print(f"{name:<26} {seconds:>8.3f} {options.entries / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
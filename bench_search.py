@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+import argparse
+import pathlib
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import typing as t
+
+from bench_parser import generate_lock_file
+from depgraph import DependencyGraph
+from planner import WeightedSearcher
+from reqparser import Requirement, RequirementsParser
+from searcher import DeltaDebugger, EndNodeReached, SpeculativeSearcher
+
+SHAPES = ("wide", "deep", "lockfile", "real")
+STRATEGIES = ("binary", "ddmin", "weighted")
+
+
+def _lock_lines(parents: list[list[str]]) -> list[str]:
+    # parents[idx] lists the packages that depend on package idx, in pip-compile's output format
+    lines = []
+    for idx, via in enumerate(parents):
+        lines.append(f"package-{idx:05d}==1.0.0\n")
+        if not via:
+            lines.append("    # via -r requirements.in\n")
+        elif len(via) == 1:
+            lines.append(f"    # via {via[0]}\n")
+        else:
+            lines.append("    # via\n")
+            lines.extend(f"    #   {name}\n" for name in sorted(via))
+    return lines
+
+
+def generate_forest(shape: str, size: int, seed: int = 0) -> list[Requirement]:
+    rng = random.Random(seed)
+    if shape == "real":
+        with open(pathlib.Path(__file__).parent / "testfiles" / "requirements_all.txt", "r") as f:
+            return RequirementsParser(f).parse()
+    if shape == "lockfile":
+        lines = generate_lock_file(size, hashes=False, seed=seed)
+    elif shape == "wide":
+        # many primary requirements, each pulling in a handful of leaves
+        parents = [[] if idx % 5 == 0 else [f"package-{idx - idx % 5:05d}"] for idx in range(size)]
+        lines = _lock_lines(parents)
+    elif shape == "deep":
+        # long chains, with the occasional package shared between two chains
+        parents = []
+        for idx in range(size):
+            via = [] if idx % 25 == 0 else [f"package-{idx - 1:05d}"]
+            if via and idx >= 50 and rng.random() < 0.1:
+                via.append(f"package-{rng.randrange(idx - 50, idx - 25):05d}")
+            parents.append(via)
+        lines = _lock_lines(parents)
+    else:
+        raise ValueError(f"Unknown shape {shape}")
+    return RequirementsParser(lines).parse()
+
+
+class Oracle:
+    # stands in for compiling, installing and running the tests of one probe
+    def __init__(self, culprits: set[str], interacting: bool, probe_seconds: float):
+        self.culprits = culprits
+        self.interacting = interacting
+        self.probe_seconds = probe_seconds
+        self.probes = 0
+
+    def passes(self, unpinned: frozenset[str]) -> bool:
+        self.probes += 1
+        if self.interacting:
+            return not self.culprits <= unpinned
+        return not self.culprits & unpinned
+
+
+class Measurement:
+    def __init__(self, probes: int, found: set[str], searcher_seconds: float, peak_bytes: int):
+        self.probes = probes
+        self.found = found
+        self.searcher_seconds = searcher_seconds
+        self.peak_bytes = peak_bytes
+
+
+def _search_binary(reqs: list[Requirement], graph: DependencyGraph, passes: t.Callable) -> set[str]:
+    # the same protocol as requirements_tester.search without a probe pool: a subset unpins its whole subtree
+    results: dict[frozenset[str], bool] = {}
+
+    def unpinned_for(subset) -> frozenset[str]:
+        return frozenset(graph.names_for(graph.subtree_mask(r.name for r in subset)))
+
+    searcher = SpeculativeSearcher([r for r in reqs if r.is_primary_dependency], lookahead=0)
+    while True:
+        while True:
+            for subset in searcher.candidates():
+                unpinned = unpinned_for(subset)
+                if unpinned in results:
+                    searcher.record(subset, results[unpinned])
+            searcher.advance()
+            if searcher.finished or unpinned_for(searcher.current) not in results:
+                break
+        if searcher.finished:
+            return {r.name for r in searcher.culprits}
+        unpinned = unpinned_for(searcher.current)
+        results[unpinned] = passes(unpinned)
+
+
+def _search_ddmin(reqs: list[Requirement], graph: DependencyGraph, passes: t.Callable) -> set[str]:
+    debugger = DeltaDebugger(list(reqs))
+    subset = debugger.failed()
+    while subset is not None:
+        subset = debugger.passed() if passes(frozenset(r.name for r in subset)) else debugger.failed()
+    return {r.name for r in debugger.result}
+
+
+def _search_weighted(reqs: list[Requirement], graph: DependencyGraph, passes: t.Callable) -> set[str]:
+    # without real version jumps, widely depended on packages are the most suspicious
+    searcher = WeightedSearcher(reqs, {r.name: 1 + len(graph.all_dependents(r.name)) for r in reqs})
+    found = set()
+    subset = searcher.failed()
+    while subset is not None:
+        if passes(frozenset(r.name for r in subset)):
+            subset = searcher.passed()
+            continue
+        try:
+            subset = searcher.failed()
+        except EndNodeReached as e:
+            found.add(e.requirement.name)
+            subset = searcher.passed()
+    return found
+
+
+SEARCHES = {"binary": _search_binary, "ddmin": _search_ddmin, "weighted": _search_weighted}
+
+
+def measure(strategy: str, reqs: list[Requirement], oracle: Oracle) -> Measurement:
+    oracle_seconds = 0.0
+
+    def passes(unpinned: frozenset[str]) -> bool:
+        nonlocal oracle_seconds
+        started = time.process_time()
+        try:
+            return oracle.passes(unpinned)
+        finally:
+            oracle_seconds += time.process_time() - started
+
+    tracemalloc.start()
+    started = time.process_time()
+    try:
+        graph = DependencyGraph(reqs)
+        # the baseline probe with everything unpinned, which every strategy starts from
+        found = set() if passes(frozenset(graph.names)) else SEARCHES[strategy](reqs, graph, passes)
+        searcher_seconds = time.process_time() - started - oracle_seconds
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(oracle.probes, found, searcher_seconds, peak_bytes)
+
+
+def main(args: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Compare search strategies against a simulated test oracle")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--size", type=int, default=500, help="Packages in each generated forest")
+    parser.add_argument("--culprits", type=int, default=1, help="Culprits planted in each trial")
+    parser.add_argument(
+        "--interacting", action="store_true", help="Tests only fail when every culprit is unpinned together"
+    )
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--probe-seconds", type=float, default=300.0, help="Simulated cost of one probe")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(args[1:])
+
+    print(
+        f"{'shape':<9} {'strategy':<9} {'probes':>7} {'max':>5} {'found':>6}"
+        f" {'sim hours':>10} {'cpu ms':>8} {'peak KiB':>9}"
+    )
+    for shape in options.shapes:
+        reqs = generate_forest(shape, options.size, options.seed)
+        for strategy in options.strategies:
+            rng = random.Random(options.seed)
+            measurements = []
+            correct = 0
+            for _ in range(options.trials):
+                culprits = set(rng.sample([r.name for r in reqs], options.culprits))
+                measurement = measure(strategy, reqs, Oracle(culprits, options.interacting, options.probe_seconds))
+                measurements.append(measurement)
+                correct += measurement.found == culprits
+            probes = [m.probes for m in measurements]
+            print(
+                f"{shape:<9} {strategy:<9} {statistics.mean(probes):>7.1f} {max(probes):>5}"
+                f" {correct / options.trials:>6.0%}"
+                f" {statistics.mean(probes) * options.probe_seconds / 3600:>10.2f}"
+                f" {statistics.mean(m.searcher_seconds for m in measurements) * 1000:>8.1f}"
+                f" {max(m.peak_bytes for m in measurements) / 1024:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,127 @@
+import array
+import typing as t
+
+from reqparser import Requirement
+
+
+def _to_csr(adjacency: list[list[int]]) -> tuple[array.array, array.array]:
+    offsets = array.array("i", [0])
+    targets = array.array("i")
+    for neighbours in adjacency:
+        targets.extend(sorted(neighbours))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def _closures(offsets: array.array, targets: array.array, order: list[int]) -> list[int]:
+    # order must list each node after everything it points to, cycles are settled by iterating to a fixpoint
+    closures = [0] * (len(offsets) - 1)
+    changed = True
+    while changed:
+        changed = False
+        for node in order:
+            closure = closures[node]
+            for idx in range(offsets[node], offsets[node + 1]):
+                target = targets[idx]
+                closure |= closures[target] | (1 << target)
+            if closure != closures[node]:
+                closures[node] = closure
+                changed = True
+    return closures
+
+
+class DependencyGraph:
+    def __init__(self, requirements: t.Sequence[Requirement]):
+        self.names: list[str] = [r.name for r in requirements]
+        self.ids: dict[str, int] = {name: idx for idx, name in enumerate(self.names)}
+
+        dependencies: list[list[int]] = [[] for _ in self.names]
+        dependents: list[list[int]] = [[] for _ in self.names]
+        for r in requirements:
+            for dependency in r.get_children():
+                if dependency.name in self.ids:
+                    dependencies[self.ids[r.name]].append(self.ids[dependency.name])
+                    dependents[self.ids[dependency.name]].append(self.ids[r.name])
+        self._dependency_offsets, self._dependency_targets = _to_csr(dependencies)
+        self._dependent_offsets, self._dependent_targets = _to_csr(dependents)
+
+        self._topological_order = self._sort(self._dependency_offsets, self._dependency_targets)
+        self._descendants = _closures(self._dependency_offsets, self._dependency_targets, self._topological_order)
+        self._ancestors = _closures(
+            self._dependent_offsets, self._dependent_targets, list(reversed(self._topological_order))
+        )
+
+    @staticmethod
+    def _sort(offsets: array.array, targets: array.array) -> list[int]:
+        # Kahn's algorithm, dependencies first. Nodes on a cycle are appended in id order at the end
+        count = len(offsets) - 1
+        remaining = array.array("i", (offsets[node + 1] - offsets[node] for node in range(count)))
+        dependents: list[list[int]] = [[] for _ in range(count)]
+        for node in range(count):
+            for idx in range(offsets[node], offsets[node + 1]):
+                dependents[targets[idx]].append(node)
+        ready = [node for node in range(count) if remaining[node] == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for dependent in dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) < count:
+            placed = set(order)
+            order.extend(node for node in range(count) if node not in placed)
+        return order
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def mask_for(self, names: t.Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= 1 << self.ids[name]
+        return mask
+
+    def names_for(self, mask: int) -> set[str]:
+        names = set()
+        while mask:
+            low_bit = mask & -mask
+            names.add(self.names[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return names
+
+    def dependencies(self, name: str) -> list[str]:
+        node = self.ids[name]
+        offsets = self._dependency_offsets
+        return [self.names[self._dependency_targets[idx]] for idx in range(offsets[node], offsets[node + 1])]
+
+    def dependents(self, name: str) -> list[str]:
+        node = self.ids[name]
+        offsets = self._dependent_offsets
+        return [self.names[self._dependent_targets[idx]] for idx in range(offsets[node], offsets[node + 1])]
+
+    def descendants_mask(self, name: str) -> int:
+        return self._descendants[self.ids[name]]
+
+    def ancestors_mask(self, name: str) -> int:
+        return self._ancestors[self.ids[name]]
+
+    def all_dependencies(self, name: str) -> set[str]:
+        return self.names_for(self.descendants_mask(name))
+
+    def all_dependents(self, name: str) -> set[str]:
+        return self.names_for(self.ancestors_mask(name))
+
+    def subtree_mask(self, names: t.Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            node = self.ids[name]
+            mask |= self._descendants[node] | (1 << node)
+        return mask
+
+    def subtree_size(self, name: str) -> int:
+        return bin(self.subtree_mask([name])).count("1")
+
+    def topological_order(self) -> list[str]:
+        return [self.names[node] for node in self._topological_order]
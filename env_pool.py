@@ -0,0 +1,238 @@
+import contextlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+import typing as t
+
+from workspace import VirtualEnvironment
+
+LOCK_PIN_REGEX = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(?:\[[^\]]*\])?==([^\s;\\]+)")
+INSTALLED_STATE_FILE = "installed.json"
+# the same packages pip-sync leaves alone
+PACKAGES_TO_IGNORE = {"pip", "pip-tools", "pip-review", "pkg-resources", "setuptools", "wheel", "distribute"}
+# how many times a waiting probe can lose its turn to probes closer to a free environment
+MAX_PASSED_OVER = 2
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_lock_pins(lock_text: str) -> dict[str, str]:
+    pins = {}
+    for line in lock_text.splitlines():
+        matches = LOCK_PIN_REGEX.match(line)
+        if matches:
+            pins[canonical_name(matches.group(1))] = matches.group(2)
+    return pins
+
+
+def pin_distance(installed: dict[str, str], target: dict[str, str]) -> int:
+    # number of packages a sync would have to install, upgrade, downgrade or remove
+    return sum(1 for name in installed.keys() | target.keys() if installed.get(name) != target.get(name))
+
+
+def _bytes_written_since(directory: str, since: float) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            with contextlib.suppress(OSError):
+                stat = os.lstat(os.path.join(dirpath, filename))
+                if stat.st_mtime >= since:
+                    total += stat.st_size
+    return total
+
+
+class SyncStats:
+    def __init__(
+        self,
+        environment: str,
+        installed: int,
+        removed: int,
+        seconds: float,
+        bytes_written: int,
+        reinstalled: int = 0,
+    ):
+        self.environment = environment
+        self.installed = installed
+        self.removed = removed
+        self.seconds = seconds
+        self.bytes_written = bytes_written
+        # installs of a version this environment already had before an earlier sync replaced it
+        self.reinstalled = reinstalled
+
+
+class PooledEnvironment:
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.venv = VirtualEnvironment(os.path.join(self.directory, "venv"))
+        self._state_path = os.path.join(self.directory, INSTALLED_STATE_FILE)
+        self.installed: t.Optional[dict[str, str]] = None
+        self._replaced: set[tuple[str, str]] = set()
+
+    def load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if not self.venv.exists():
+            self.venv.create()
+            self._save({})
+            return
+        try:
+            with open(self._state_path, "r") as f:
+                self.installed = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._save(self._freeze())
+
+    def _freeze(self) -> dict[str, str]:
+        result = subprocess.run(
+            [self.venv.python, "-m", "pip", "freeze", "--exclude-editable"],
+            capture_output=True,
+            check=True,
+            env=self.venv.environ(),
+        )
+        return parse_lock_pins(result.stdout.decode("utf-8"))
+
+    def _save(self, installed: t.Optional[dict[str, str]]):
+        self.installed = installed
+        if installed is None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._state_path)
+            return
+        with open(self._state_path, "w") as f:
+            json.dump(installed, f, indent=1, sort_keys=True)
+
+    def sync(
+        self, target: dict[str, str], pip_args: t.Sequence[str] = (), timeout: t.Optional[float] = None
+    ) -> SyncStats:
+        started = time.time()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        def remaining() -> t.Optional[float]:
+            return max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+
+        installed = self.installed or {}
+        target = {name: version for name, version in target.items() if name not in PACKAGES_TO_IGNORE}
+        to_remove = sorted(name for name in installed if name not in target and name not in PACKAGES_TO_IGNORE)
+        changed = sorted((name, version) for name, version in target.items() if installed.get(name) != version)
+        to_install = [f"{name}=={version}" for name, version in changed]
+        reinstalled = sum(1 for pin in changed if pin in self._replaced)
+        self._replaced |= {(name, version) for name, version in installed.items() if target.get(name) != version}
+        # forget the recorded state until the sync has completed, so a failure forces a re-freeze
+        self._save(None)
+        if to_remove:
+            subprocess.run(
+                [self.venv.python, "-m", "pip", "uninstall", "--yes", "--quiet", *to_remove],
+                check=True,
+                env=self.venv.environ(),
+                timeout=remaining(),
+            )
+        if to_install:
+            # lock files are complete, so dependency resolution has already been done by pip-compile
+            subprocess.run(
+                [self.venv.python, "-m", "pip", "install", "--no-deps", "--quiet", *pip_args, *to_install],
+                check=True,
+                env=self.venv.environ(),
+                timeout=remaining(),
+            )
+        self._save(dict(target))
+        return SyncStats(
+            os.path.basename(self.directory),
+            len(to_install),
+            len(to_remove),
+            time.time() - started,
+            _bytes_written_since(self.venv.venv_dir, started),
+            reinstalled,
+        )
+
+
+class _Waiter:
+    def __init__(self, target: dict[str, str]):
+        self.target = target
+        self.environment: t.Optional[PooledEnvironment] = None
+        self.passed_over = 0
+
+
+class EnvironmentPool:
+    def __init__(self, root: str, size: int):
+        self.environments = [PooledEnvironment(os.path.join(root, f"env-{idx}")) for idx in range(size)]
+        self.stats: list[SyncStats] = []
+        self._free = list(self.environments)
+        self._waiting: list[_Waiter] = []
+        self._condition = threading.Condition()
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            for environment in self.environments:
+                environment.load()
+            self._loaded = True
+
+    @contextlib.contextmanager
+    def checkout(self, target: dict[str, str]) -> t.Iterator[PooledEnvironment]:
+        with self._condition:
+            self._load()
+            waiter = _Waiter(target)
+            self._waiting.append(waiter)
+            self._assign()
+            while waiter.environment is None:
+                self._condition.wait()
+            environment = waiter.environment
+        try:
+            if environment.installed is None:
+                environment.load()
+            yield environment
+        finally:
+            with self._condition:
+                self._free.append(environment)
+                self._assign()
+                self._condition.notify_all()
+
+    def _assign(self):
+        # When probes are waiting for an environment, the closest probe and environment pair goes first, so the
+        # pool as a whole makes the fewest package changes. Ties keep the order the probes arrived in, and a probe
+        # that has been passed over too often goes next regardless
+        while self._free and self._waiting:
+            starved = [waiter for waiter in self._waiting if waiter.passed_over >= MAX_PASSED_OVER]
+            waiter, environment = min(
+                ((waiter, environment) for waiter in starved[:1] or self._waiting for environment in self._free),
+                key=lambda pair: pin_distance(pair[1].installed or {}, pair[0].target),
+            )
+            self._waiting.remove(waiter)
+            self._free.remove(environment)
+            waiter.environment = environment
+            for other in self._waiting:
+                other.passed_over += 1
+
+    def sync(
+        self,
+        environment: PooledEnvironment,
+        target: dict[str, str],
+        pip_args: t.Sequence[str] = (),
+        timeout: t.Optional[float] = None,
+    ):
+        stats = environment.sync(target, pip_args, timeout)
+        with self._condition:
+            self.stats.append(stats)
+            total_reinstalled = sum(s.reinstalled for s in self.stats)
+        print(
+            f"Synced {stats.environment}: {stats.installed} installed, {stats.removed} removed,"
+            f" {stats.reinstalled} reinstalled ({total_reinstalled} so far),"
+            f" {stats.seconds:.1f}s, {stats.bytes_written / 1024 / 1024:.1f} MB written"
+        )
+        return stats
+
+    def summary(self) -> str:
+        if not self.stats:
+            return "Environment pool: no installs"
+        total_seconds = sum(s.seconds for s in self.stats)
+        total_bytes = sum(s.bytes_written for s in self.stats)
+        changed = sum(s.installed + s.removed for s in self.stats)
+        reinstalled = sum(s.reinstalled for s in self.stats)
+        return (
+            f"Environment pool: {len(self.stats)} syncs, {changed} package changes"
+            f" of which {reinstalled} reinstalled a version removed earlier,"
+            f" {total_seconds / len(self.stats):.1f}s average install time,"
+            f" {total_bytes / 1024 / 1024:.1f} MB written"
+        )
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+import typing as t
+
+from env_pool import canonical_name
+
+
+class TestImpactIndex:
+    # which requirements each test module uses, as recorded by impact_plugin
+    __test__ = False
+
+    def __init__(self, distributions_by_module: t.Mapping[str, t.Iterable[str]]):
+        self.distributions_by_module = {
+            module: {canonical_name(name) for name in names} for module, names in distributions_by_module.items()
+        }
+
+    @classmethod
+    def load(cls, path: str, run_id: str) -> t.Optional["TestImpactIndex"]:
+        # None when there is no index yet, or it was traced against different requirements
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("run_id") != run_id:
+            return None
+        return cls(data["modules"])
+
+    def save(self, path: str, run_id: str):
+        modules = {module: sorted(names) for module, names in self.distributions_by_module.items()}
+        with open(path, "w") as f:
+            json.dump({"run_id": run_id, "modules": modules}, f, indent=1, sort_keys=True)
+
+    def modules_for(self, changed: t.Iterable[str]) -> list[str]:
+        changed = {canonical_name(name) for name in changed}
+        return sorted(module for module, names in self.distributions_by_module.items() if names & changed)
+
+
+def changed_pins(old_pins: t.Mapping[str, str], new_pins: t.Mapping[str, str]) -> set[str]:
+    return {name for name in old_pins.keys() | new_pins.keys() if old_pins.get(name) != new_pins.get(name)}
+
+
+class TestImpactSelector:
+    # Picks the test modules that use a package whose pin differs from the last lock file that passed
+    __test__ = False
+
+    def __init__(self, index: TestImpactIndex, known_good_pins: t.Mapping[str, str]):
+        self.index = index
+        self._known_good_pins = dict(known_good_pins)
+        self._lock = threading.Lock()
+
+    def select(self, pins: t.Mapping[str, str]) -> list[str]:
+        # an empty list means no test can be affected, so the probe passes without running anything
+        with self._lock:
+            changed = changed_pins(self._known_good_pins, pins)
+        return self.index.modules_for(changed)
+
+    def record_good(self, pins: t.Mapping[str, str]):
+        with self._lock:
+            self._known_good_pins = dict(pins)
+
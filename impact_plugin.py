@@ -0,0 +1,87 @@
+# pytest plugin for the one-time test impact tracing pass, loaded with -p impact_plugin. It runs inside the
+# project's environment, so it only uses the standard library
+import collections
+import importlib.metadata
+import json
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--impact-index", help="Write the distributions each test module uses to this file")
+
+
+def pytest_configure(config):
+    path = config.getoption("impact_index")
+    if path:
+        config.pluginmanager.register(ImpactTracer(path), "impact-tracer")
+
+
+def _canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _distribution_files() -> dict[str, str]:
+    files = {}
+    for distribution in importlib.metadata.distributions():
+        name = distribution.metadata["Name"]
+        if not name:
+            continue
+        for path in distribution.files or ():
+            if path.suffix == ".py":
+                files[os.path.realpath(distribution.locate_file(path))] = _canonical_name(name)
+    return files
+
+
+class ImpactTracer:
+    # Records which source files run while each test module is collected (its imports) and while its tests run.
+    # A profile hook only sees function calls, which is enough to attribute the work to a distribution
+    def __init__(self, path: str):
+        self.path = path
+        self.files_by_module: dict[str, set[str]] = collections.defaultdict(set)
+        self._current: set[str] = set()
+
+    def _profile(self, frame, event, arg):
+        if event == "call":
+            self._current.add(frame.f_code.co_filename)
+
+    def _start(self, module: str):
+        self._current = self.files_by_module[module]
+        sys.setprofile(self._profile)
+        threading.setprofile(self._profile)
+
+    def _stop(self):
+        sys.setprofile(None)
+        threading.setprofile(None)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_make_collect_report(self, collector):
+        if isinstance(collector, pytest.Module):
+            self._start(collector.nodeid)
+            try:
+                yield
+            finally:
+                self._stop()
+        else:
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self._start(item.nodeid.split("::")[0])
+        try:
+            yield
+        finally:
+            self._stop()
+
+    def pytest_sessionfinish(self, session):
+        distribution_files = _distribution_files()
+        index = {}
+        for module, files in self.files_by_module.items():
+            distributions = {distribution_files.get(os.path.realpath(f)) for f in files}
+            index[module] = sorted(d for d in distributions if d)
+        with open(self.path, "w") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
@@ -0,0 +1,41 @@
+import collections
+import threading
+import typing as t
+
+from depgraph import DependencyGraph
+from resolution_cache import Resolution
+
+
+class LockHistory:
+    # Recent successful resolutions, keyed by which requirements were unpinned. A new compile starts from the
+    # closest one: pip-compile keeps the existing pins in its output file, so only the requirements whose pin
+    # status changed, and everything they depend on, need to be re-resolved
+    def __init__(self, graph: DependencyGraph, size: int = 16):
+        self.graph = graph
+        self.size = size
+        self._resolutions: collections.OrderedDict[frozenset[str], Resolution] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, unpinned: t.Iterable[str], resolution: Resolution):
+        if not resolution.succeeded:
+            return
+        key = frozenset(unpinned)
+        with self._lock:
+            self._resolutions[key] = resolution
+            self._resolutions.move_to_end(key)
+            while len(self._resolutions) > self.size:
+                self._resolutions.popitem(last=False)
+
+    def base_for(self, unpinned: t.Iterable[str]) -> t.Optional[tuple[frozenset[str], Resolution]]:
+        unpinned = frozenset(unpinned)
+        with self._lock:
+            if not self._resolutions:
+                return None
+            # ties go to the most recent resolution, whose metadata is most likely still cached
+            base = min(reversed(self._resolutions), key=lambda key: len(key ^ unpinned))
+            return base, self._resolutions[base]
+
+    def upgrade_packages(self, base_unpinned: frozenset[str], unpinned: t.Iterable[str]) -> set[str]:
+        changed = base_unpinned ^ frozenset(unpinned)
+        known = [name for name in changed if name in self.graph.ids]
+        return self.graph.names_for(self.graph.subtree_mask(known)) | (changed - set(known))
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import typing as t
+
+from env_pool import parse_lock_pins
+
+
+def hash_lock_file(lock_text: str) -> str:
+    # only the resolved pins matter, not the pip-compile header or "via" annotations
+    pins = parse_lock_pins(lock_text)
+    digest = hashlib.sha256()
+    for name, version in sorted(pins.items()):
+        digest.update(f"{name}=={version}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class JournalEntry:
+    def __init__(
+        self,
+        unpinned: t.Iterable[str],
+        lock_hash: t.Optional[str],
+        passed: bool,
+        compile_seconds: float = 0.0,
+        install_seconds: float = 0.0,
+        test_seconds: float = 0.0,
+        reused: bool = False,
+        timestamp: t.Optional[float] = None,
+        confidence: t.Optional[float] = None,
+    ):
+        self.unpinned = frozenset(unpinned)
+        self.lock_hash = lock_hash
+        self.passed = passed
+        self.compile_seconds = compile_seconds
+        self.install_seconds = install_seconds
+        self.test_seconds = test_seconds
+        self.reused = reused
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        # how sure a flakiness-aware test oracle was of the outcome, None when a single run decided it
+        self.confidence = confidence
+
+    def to_json(self) -> dict:
+        return {
+            "unpinned": sorted(self.unpinned),
+            "lock_hash": self.lock_hash,
+            "passed": self.passed,
+            "compile_seconds": round(self.compile_seconds, 3),
+            "install_seconds": round(self.install_seconds, 3),
+            "test_seconds": round(self.test_seconds, 3),
+            "reused": self.reused,
+            "timestamp": self.timestamp,
+            "confidence": self.confidence,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "JournalEntry":
+        return cls(**data)
+
+
+class ProbeJournal:
+    def __init__(self, path: str, run_id: str, resume: bool = False):
+        self.path = path
+        self.run_id = run_id
+        self.entries: list[JournalEntry] = []
+        self._by_unpinned: dict[frozenset[str], bool] = {}
+        self._by_lock_hash: dict[str, bool] = {}
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a")
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "w")
+            self._write({"run_id": run_id})
+
+    def _load(self):
+        with open(self.path, "r") as f:
+            lines = f.readlines()
+        if not lines or json.loads(lines[0]).get("run_id") != self.run_id:
+            raise Exception(f"Journal {self.path} was written for different requirements, cannot resume from it")
+        kept = lines[:1]
+        for line in lines[1:]:
+            try:
+                entry = JournalEntry.from_json(json.loads(line))
+            except (ValueError, TypeError):
+                # a crash part way through a write leaves a truncated last line
+                break
+            kept.append(line)
+            self._index(entry)
+        print(f"Resuming from {len(self.entries)} journalled probes")
+        with open(self.path, "r+") as f:
+            f.truncate(sum(len(line.encode("utf-8")) for line in kept))
+            if not kept[-1].endswith("\n"):
+                f.seek(0, os.SEEK_END)
+                f.write("\n")
+
+    def _index(self, entry: JournalEntry):
+        self.entries.append(entry)
+        self._by_unpinned[entry.unpinned] = entry.passed
+        if entry.lock_hash is not None:
+            self._by_lock_hash[entry.lock_hash] = entry.passed
+
+    def _write(self, data: dict):
+        self._file.write(json.dumps(data, sort_keys=True))
+        self._file.write("\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, entry: JournalEntry):
+        with self._lock:
+            self._write(entry.to_json())
+            self._index(entry)
+
+    def results(self) -> dict[frozenset[str], bool]:
+        with self._lock:
+            return dict(self._by_unpinned)
+
+    def lookup_lock(self, lock_hash: str) -> t.Optional[bool]:
+        with self._lock:
+            return self._by_lock_hash.get(lock_hash)
+
+    def close(self):
+        self._file.close()
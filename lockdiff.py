@@ -0,0 +1,57 @@
+import copy
+import typing as t
+
+from packaging.version import InvalidVersion, Version
+
+from depgraph import DependencyGraph
+from env_pool import canonical_name
+from reqparser import Requirement
+
+
+def pinned_version(requirement: Requirement) -> t.Optional[str]:
+    if len(requirement.specs) == 1 and requirement.specs[0][0] == "==":
+        return requirement.specs[0][1]
+    return None
+
+
+def same_version(old_version: t.Optional[str], new_version: t.Optional[str]) -> bool:
+    if old_version is None or new_version is None:
+        return False
+    try:
+        return Version(old_version) == Version(new_version)
+    except InvalidVersion:
+        return old_version == new_version
+
+
+class LockDiff:
+    # Compares the original lock file with the resolution of everything unpinned. A requirement that resolves to
+    # the version it was already pinned at cannot be what broke the tests, and neither can a subtree of them
+    def __init__(self, reqs: t.Sequence[Requirement], new_pins: t.Mapping[str, str]):
+        self.reqs = list(reqs)
+        self.changed = {
+            r.name for r in reqs if not same_version(pinned_version(r), new_pins.get(canonical_name(r.name)))
+        }
+        graph = DependencyGraph(self.reqs)
+        ancestors = 0
+        for name in self.changed:
+            ancestors |= graph.ancestors_mask(name)
+        # unchanged requirements are only kept to connect the changed ones below them to the tree
+        self.kept = self.changed | graph.names_for(ancestors)
+
+    def prune(self) -> list[Requirement]:
+        # copies of the kept requirements, linked only to each other, so the originals keep their full tree
+        copies = {r.name: copy.copy(r) for r in self.reqs if r.name in self.kept}
+        for r in self.reqs:
+            if r.name in copies:
+                copies[r.name].dependencies = [copies[d.name] for d in r.dependencies if d.name in copies]
+                copies[r.name].requirement_for = [copies[d.name] for d in r.requirement_for if d.name in copies]
+        return list(copies.values())
+
+    def summary(self) -> str:
+        roots = [r for r in self.reqs if r.is_primary_dependency]
+        kept_roots = [r for r in roots if r.name in self.kept]
+        return (
+            f"Lock diff: {len(self.changed)} of {len(self.reqs)} requirements change version when unpinned."
+            f" Pruned {len(self.reqs) - len(self.kept)} unchanged requirements and"
+            f" {len(roots) - len(kept_roots)} of {len(roots)} top-level subtrees"
+        )
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import threading
+import typing as t
+
+
+class Nogood:
+    # A conflict pip-compile reported: with these requirement lines pinned and these names unpinned, resolution
+    # fails until the pinned ones are unpinned too. Pins are stored as whole lines, so entries learned against
+    # an older requirements.txt stop matching once it changes
+    def __init__(self, pinned_lines: t.Iterable[str], unpinned: t.Iterable[str]):
+        self.pinned_lines = frozenset(pinned_lines)
+        self.unpinned = frozenset(unpinned)
+
+    def __eq__(self, other) -> bool:
+        return (self.pinned_lines, self.unpinned) == (other.pinned_lines, other.unpinned)
+
+    def __hash__(self) -> int:
+        return hash((self.pinned_lines, self.unpinned))
+
+    def to_json(self) -> dict:
+        return {"pinned": sorted(self.pinned_lines), "unpinned": sorted(self.unpinned)}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Nogood":
+        return cls(data["pinned"], data["unpinned"])
+
+
+class NogoodStore:
+    def __init__(self, path: t.Optional[str] = None):
+        self.path = path
+        self.nogoods: set[Nogood] = set()
+        self.expansions = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.nogoods = {Nogood.from_json(data) for data in json.load(f)}
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+            json.dump([nogood.to_json() for nogood in self.nogoods], f, indent=1, sort_keys=True)
+        os.replace(f.name, self.path)
+
+    def learn(
+        self, conflicts: t.Iterable[str], unversioned_requirements: t.Collection[str], lines: t.Mapping[str, str]
+    ):
+        # lines maps each requirement name to its pinned line
+        pinned = {name for name in conflicts if name not in unversioned_requirements and name in lines}
+        if not pinned:
+            return
+        # a conflict that names nothing unpinned could be caused by any of the unpinned requirements
+        unpinned = {name for name in conflicts if name in unversioned_requirements} or set(unversioned_requirements)
+        nogood = Nogood((lines[name] for name in pinned), unpinned)
+        with self._lock:
+            if nogood not in self.nogoods:
+                self.nogoods.add(nogood)
+                self._save()
+
+    def expand(
+        self, unversioned_requirements: set[str], lines: t.Mapping[str, str], keep_pinned: t.Collection[str] = ()
+    ) -> set[str]:
+        # unpins, in place, everything a known conflict would force to be unpinned, apart from keep_pinned.
+        # Returns the added names
+        names_by_line = {line: name for name, line in lines.items()}
+        with self._lock:
+            nogoods = list(self.nogoods)
+        added: set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for nogood in nogoods:
+                if not nogood.unpinned <= unversioned_requirements:
+                    continue
+                names = {names_by_line[line] for line in nogood.pinned_lines if line in names_by_line}
+                if len(names) < len(nogood.pinned_lines) or names <= unversioned_requirements:
+                    continue
+                names -= set(keep_pinned)
+                if names <= unversioned_requirements:
+                    continue
+                added |= names - unversioned_requirements
+                unversioned_requirements |= names
+                changed = True
+        if added:
+            with self._lock:
+                self.expansions += 1
+        return added
@@ -0,0 +1,130 @@
+import math
+import re
+import typing as t
+
+from searcher import EndNodeReached
+
+RELEASE_REGEX = re.compile(r"^(?:\d+!)?(\d+(?:\.\d+)*)")
+
+# how suspicious each kind of version change is, relative to a patch release
+JUMP_WEIGHTS = {"major": 8.0, "minor": 3.0, "patch": 1.0, "unchanged": 0.05}
+PRIMARY_DEPENDENCY_WEIGHT = 1.5
+
+
+def parse_release(version: str) -> tuple[int, ...]:
+    matches = RELEASE_REGEX.match(version.strip())
+    if matches is None:
+        return ()
+    return tuple(int(part) for part in matches.group(1).split("."))
+
+
+def version_jump(old_version: t.Optional[str], new_version: t.Optional[str]) -> str:
+    if old_version is None or new_version is None or old_version == new_version:
+        return "unchanged"
+    old_release, new_release = parse_release(old_version), parse_release(new_version)
+    if not old_release or not new_release:
+        return "major"
+    width = max(len(old_release), len(new_release), 3)
+    old_release += (0,) * (width - len(old_release))
+    new_release += (0,) * (width - len(new_release))
+    if old_release[0] != new_release[0]:
+        return "major"
+    if old_release[1] != new_release[1]:
+        return "minor"
+    return "patch"
+
+
+def prior_score(
+    old_version: t.Optional[str], new_version: t.Optional[str], is_primary_dependency: bool, dependents: int
+) -> float:
+    score = JUMP_WEIGHTS[version_jump(old_version, new_version)]
+    if is_primary_dependency:
+        score *= PRIMARY_DEPENDENCY_WEIGHT
+    # breakage in a widely used package has more ways to reach the tests
+    return score * (1 + math.log1p(dependents))
+
+
+class WeightedSearcher:
+    # Bayesian search for a single culprit. Each probe is the set of most likely candidates whose probability
+    # mass is closest to one half, which maximises the expected information from a pass/fail result.
+    # false_result_rate allows for probes that give the wrong answer, e.g. from flaky tests
+    def __init__(
+        self,
+        candidates: t.Sequence,
+        priors: t.Mapping[str, float],
+        false_result_rate: float = 0.0,
+        confidence: float = 0.95,
+    ):
+        self._candidates = list(candidates)
+        total = sum(priors[c.name] for c in self._candidates) or 1.0
+        self.probabilities: dict[str, float] = {c.name: priors[c.name] / total for c in self._candidates}
+        self._false_result_rate = false_result_rate
+        self._confidence = confidence
+        self._current: t.Optional[list] = None
+        self._started = False
+        self._finished = False
+        self.probe_count = 0
+
+    def _update(self, subset, failed: bool):
+        names = {c.name for c in subset}
+        likely, unlikely = 1 - self._false_result_rate, self._false_result_rate
+        for name in self.probabilities:
+            reproduces = (name in names) == failed
+            self.probabilities[name] *= likely if reproduces else unlikely
+        total = sum(self.probabilities.values())
+        if total == 0:
+            # results contradict every candidate, there is no single culprit to find
+            self._finished = True
+            return
+        for name in self.probabilities:
+            self.probabilities[name] /= total
+
+    def _ranked(self) -> list:
+        return sorted(
+            (c for c in self._candidates if self.probabilities[c.name] > 0),
+            key=lambda c: -self.probabilities[c.name],
+        )
+
+    def _next(self):
+        ranked = self._ranked()
+        if self._finished or not ranked:
+            self._current = None
+            return None
+        if len(ranked) == 1 or self.probabilities[ranked[0].name] >= self._confidence:
+            # confirm the most likely candidate on its own
+            self._current = [ranked[0]]
+        else:
+            subset = []
+            mass = 0.0
+            for candidate in ranked:
+                p = self.probabilities[candidate.name]
+                if subset and abs(mass + p - 0.5) >= abs(mass - 0.5):
+                    break
+                subset.append(candidate)
+                mass += p
+            if len(subset) == len(ranked):
+                subset.pop()
+            self._current = subset
+        self.probe_count += 1
+        return self._current
+
+    def passed(self):
+        if self._current is None:
+            return None
+        self._update(self._current, failed=False)
+        return self._next()
+
+    def failed(self):
+        if not self._started:
+            self._started = True
+            return self._next()
+        if self._current is None:
+            return None
+        confirmed = len(self._current) == 1 and len(self._ranked()) == 1
+        self._update(self._current, failed=True)
+        culprit = self._current[0]
+        if len(self._current) == 1 and (confirmed or self.probabilities[culprit.name] >= self._confidence):
+            self._finished = True
+            self._current = None
+            raise EndNodeReached(culprit)
+        return self._next()
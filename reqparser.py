@@ -1,4 +1,5 @@
 import collections
+import re
 import typing as t
 
 from requirements import requirement
@@ -6,15 +7,41 @@ from requirements import requirement
 PIPTOOLS_VIA_MULTILINE_PREFIX = "    #   "
 PIPTOOLS_VIA_PREFIX = "    # via"
 
+# pip-compile writes almost every entry as a plain "name==version", optionally with extras and markers
+PINNED_REQUIREMENT_REGEX = re.compile(
+    r"([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)(?:\[([^\]]*)\])?\s*==\s*([^\s;\\]+)\s*(;[^\\]*?)?\s*(\\)?\s*$"
+)
+VIA_INLINE_REGEX = re.compile(r"\s+# via (\S.*?)\s*$")
+VIA_HEADER_REGEX = re.compile(r"\s+# via\s*$")
+VIA_ITEM_REGEX = re.compile(r"\s+#   (\S.*?)\s*$")
+
 
 class Requirement(requirement.Requirement):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.is_primary_dependency: bool = False
         self.requirement_for: t.List["Requirement"] = []
+        self.dependencies: t.List["Requirement"] = []
 
     def get_children(self):
-        return [r for r in self.is_requirement_for]
+        return list(self.dependencies)
+
+
+class ViaEdge(t.NamedTuple):
+    requirement: str
+    required_by: str
+
+
+def _link_requirements(
+    requirements_by_name: dict[str, Requirement], requirements_dependent_on: dict[str, t.Set[str]]
+):
+    for dependency_target, dependent_packages in requirements_dependent_on.items():
+        for pkg in sorted(dependent_packages):
+            # "via" annotations can name packages that are not in the file, e.g. unsafe packages
+            if dependency_target not in requirements_by_name or pkg not in requirements_by_name:
+                continue
+            requirements_by_name[dependency_target].requirement_for.append(requirements_by_name[pkg])
+            requirements_by_name[pkg].dependencies.append(requirements_by_name[dependency_target])
 
 
 class RequirementsParser:
@@ -97,10 +124,111 @@ class RequirementsParser:
                 self._parse_requirement()
         except StopIteration:
             pass
-        for dependency_target, dependent_packages in self._requirements_dependent_on.items():
-            for pkg in dependent_packages:
-                self._requirements_by_name[dependency_target].requirement_for.append(
-                    self._requirements_by_name[pkg]
-                )
+        _link_requirements(self._requirements_by_name, self._requirements_dependent_on)
 
         return list(self._requirements_by_name.values())
+
+
+H = t.TypeVar("H", bound=t.Hashable)
+
+
+class Interner:
+    # Hands out one shared copy of each equal value, so the lock files of many projects that pin the same packages
+    # don't each hold their own names, versions and lines. Requirement objects themselves are not shared, as every
+    # lock file links them into its own tree
+    def __init__(self):
+        self._values: dict[t.Hashable, t.Hashable] = {}
+        self.lookups = 0
+
+    def __call__(self, value: H) -> H:
+        self.lookups += 1
+        return t.cast(H, self._values.setdefault(value, value))
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class LockfileParser:
+    def __init__(self, src: t.Iterable[str], interner: t.Optional[Interner] = None):
+        self._src = src
+        self._intern: t.Callable = interner if interner is not None else (lambda value: value)
+
+    def _make_requirement(self, line: str) -> Requirement:
+        matches = PINNED_REQUIREMENT_REGEX.match(line)
+        if matches is None:
+            return Requirement.parse(line.rstrip(" \\"))
+        name, extras, version, markers, _ = matches.groups()
+        req_line = f"{name}[{extras}]=={version}" if extras else f"{name}=={version}"
+        if markers:
+            req_line = f"{req_line} {markers.strip()}"
+        req = Requirement(self._intern(req_line))
+        req.specifier = True
+        req.name = self._intern(name)
+        req.specs = [self._intern(("==", self._intern(version)))]
+        req.extras = [e.strip() for e in extras.split(",")] if extras else []
+        return req
+
+    def iter_entries(self) -> t.Iterator[t.Union[Requirement, ViaEdge]]:
+        # each requirement is yielded once its annotations have been read, followed by its "via" edges
+        req: t.Optional[Requirement] = None
+        edges: list[ViaEdge] = []
+        in_via_block = False
+        continued = False
+        for line in self._src:
+            first = line[:1]
+            if first == " " or first == "\t":
+                if continued:
+                    # "--hash" options belonging to the previous line
+                    continued = line.rstrip().endswith("\\")
+                    continue
+                if req is None:
+                    continue
+                via = None
+                if in_via_block:
+                    matches = VIA_ITEM_REGEX.match(line)
+                    if matches:
+                        via = matches.group(1)
+                    else:
+                        in_via_block = False
+                if via is None and not in_via_block:
+                    matches = VIA_INLINE_REGEX.match(line)
+                    if matches:
+                        via = matches.group(1)
+                    elif VIA_HEADER_REGEX.match(line):
+                        in_via_block = True
+                        continue
+                if via is None:
+                    continue
+                if via.startswith("-r"):
+                    req.is_primary_dependency = True
+                elif not via.startswith("-c"):
+                    edges.append(ViaEdge(req.name, self._intern(via)))
+                continue
+
+            in_via_block = False
+            if req is not None:
+                yield req
+                yield from edges
+                req = None
+                edges = []
+            stripped = line.strip()
+            continued = stripped.endswith("\\")
+            if not stripped or first == "#" or first == "-":
+                # comments, blank lines and pip options such as --index-url
+                continue
+            req = self._make_requirement(stripped)
+
+        if req is not None:
+            yield req
+            yield from edges
+
+    def parse(self) -> t.List[Requirement]:
+        requirements_by_name: dict[str, Requirement] = {}
+        requirements_dependent_on: dict[str, t.Set[str]] = collections.defaultdict(set)
+        for entry in self.iter_entries():
+            if isinstance(entry, ViaEdge):
+                requirements_dependent_on[entry.requirement].add(entry.required_by)
+            else:
+                requirements_by_name[entry.name] = entry
+        _link_requirements(requirements_by_name, requirements_dependent_on)
+        return list(requirements_by_name.values())
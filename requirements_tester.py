@@ -1,21 +1,54 @@
 #!/usr/bin/env python
+import argparse
 import collections
+import concurrent.futures
 import contextlib
+import copy
+import hashlib
+import json
 import os
 import re
-import subprocess
+import shutil
 import sys
+import tempfile
+import time
 import typing as t
 
-from reqparser import Requirement, RequirementsParser
-from searcher import BinarySearcher, EndNodeReached
+from reqparser import LockfileParser, Requirement, RequirementsParser
+from depgraph import DependencyGraph
+from env_pool import EnvironmentPool, canonical_name, parse_lock_pins
+from lockdiff import LockDiff
+from journal import JournalEntry, ProbeJournal, hash_lock_file
+from resolution_cache import Resolution, ResolutionCache
+from resolver import InProcessResolver, create_resolver
+from impact import TestImpactIndex, TestImpactSelector
+from incremental import LockHistory
+from nogoods import NogoodStore
+from planner import WeightedSearcher, prior_score
+from searcher import DeltaDebugger, EndNodeReached, SpeculativeSearcher
+from streaming import run_streaming
+from versions import find_first_bad_version, list_available_versions, versions_between
+import tracing
+from tracing import ProgressLine, estimate_remaining_probes
+from testrunner import FailureFirstSelector, FailureWatcher, FlakyTestOracle, TestRun, Verdict, parse_failed_node_ids
+from wheelhouse import Wheelhouse
+from work_queue import QueueCoordinator, WorkQueue, default_worker_id, run_worker
+from workspace import ProbePool, ProbeWorkspace
 
 PIPTOOLS_VIA_MULTILINE_PREFIX = "    #   "
 PIPTOOLS_VIA_PREFIX = "    # via"
 
+INCOMPATIBLE_VERSIONS_HEADER = "There are incompatible versions in the resolved dependencies:"
 PIP_COMPILE_ERROR_REGEX = "Could not find a version that matches ([^<>=\^~]+)"
 PIP_COMPILE_INCOMPATIBLE_VERSION_REGEX = ".*\(from ([^<>=\^~]+)[<>=\^~]"
 
+# probes compile requirements.test.in into requirements.txt, and both pip-compile and the in-process resolver name it
+# in the header or "via" annotations, which a project's own lock file never does
+PROBE_LOCK_MARKER = "requirements.test.in"
+
+# these learn from earlier probes, e.g. the baseline failures or the last lock file, which queue workers don't see
+QUEUE_UNSUPPORTED_OPTIONS = ("failure_first", "flaky_tests", "test_impact", "incremental")
+
 
 def get_problem_requirements_from_pip_compile_output(pip_compile_output: str) -> set[str]:
     problem_requirements: set[str] = set()
@@ -34,8 +67,29 @@ def get_problem_requirements_from_pip_compile_output(pip_compile_output: str) ->
     return problem_requirements
 
 
-def generate_requirements_in_file(unversioned_requirements, versioned_requirements):
-    with open("requirements.test.in", "w") as f:
+class ConflictScanner:
+    # stops pip-compile once its conflict message has been read, the exit status adds nothing after that. What
+    # asked for the conflicting versions is only named in the indented block under INCOMPATIBLE_VERSIONS_HEADER,
+    # so the scan goes on until that block has ended
+    def __init__(self):
+        self.conflicts: set[str] = set()
+        self._in_block = False
+
+    def __call__(self, line: str) -> bool:
+        if self._in_block:
+            if not line.startswith(" "):
+                return True
+            self.conflicts |= get_problem_requirements_from_pip_compile_output(line)
+        elif re.match(PIP_COMPILE_ERROR_REGEX, line):
+            # only this line, as e.g. the "Tried:" list can hold pip links that look like a parent's "(from ...)"
+            self.conflicts |= get_problem_requirements_from_pip_compile_output(line)
+        elif line.strip() == INCOMPATIBLE_VERSIONS_HEADER:
+            self._in_block = True
+        return False
+
+
+def generate_requirements_in_file(unversioned_requirements, versioned_requirements, directory: str = "."):
+    with open(os.path.join(directory, "requirements.test.in"), "w") as f:
         for req_line in unversioned_requirements:
             f.write(req_line)
             f.write("\n")
@@ -44,122 +98,1003 @@ def generate_requirements_in_file(unversioned_requirements, versioned_requiremen
             f.write("\n")
 
 
-def generate_requirements_txt_file(unversioned_requirements, all_requirements):
+def compile_requirements(
+    directory: str = ".",
+    pip_args: t.Sequence[str] = (),
+    upgrade_packages: t.Optional[t.Collection[str]] = None,
+    timeout: t.Optional[float] = None,
+) -> Resolution:
+    # with upgrade_packages, pip-compile keeps every pin already in the output files except for those packages
+    pip_args = [*pip_args, *(arg for name in sorted(upgrade_packages or ()) for arg in ("--upgrade-package", name))]
+    if "--no-index" in pip_args:
+        # unlike pip-sync and pip install, pip-compile has no --no-index of its own, so it goes through to pip
+        pip_args = [arg for arg in pip_args if arg != "--no-index"] + ["--pip-args", "--no-index"]
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def remaining() -> t.Optional[float]:
+        return max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+
+    command = ["pip-compile", "requirements.test.in", "--output-file=requirements.txt", *pip_args]
+    scanner = ConflictScanner()
+    result = run_streaming(command, cwd=directory, on_stderr=scanner, timeout=remaining())
+    if scanner.conflicts:
+        return Resolution(conflicts=scanner.conflicts, stderr=result.stderr)
+    result.check(command)
+
+    command = ["pip-compile", "requirements.dev.in", "--output-file=requirements.dev.txt", *pip_args]
+    scanner = ConflictScanner()
+    result = run_streaming(command, cwd=directory, on_stderr=scanner, timeout=remaining())
+    if scanner.conflicts:
+        return Resolution(conflicts=scanner.conflicts, stderr=result.stderr)
+    # anything else, e.g. a network or index error, is not a property of the requirements and must not be cached
+    result.check(command)
+
+    with open(os.path.join(directory, "requirements.txt"), "r") as f:
+        requirements_txt = f.read()
+    with open(os.path.join(directory, "requirements.dev.txt"), "r") as f:
+        requirements_dev_txt = f.read()
+    return Resolution(requirements_txt, requirements_dev_txt)
+
+
+def resolve_requirements(
+    directory: str = ".",
+    pip_args: t.Sequence[str] = (),
+    resolver: t.Optional[InProcessResolver] = None,
+    upgrade_packages: t.Optional[t.Collection[str]] = None,
+    timeout: t.Optional[float] = None,
+) -> Resolution:
+    if resolver is not None:
+        try:
+            return resolver.compile(directory, pip_args, upgrade_packages)
+        except Exception as e:
+            # pip-tools internals change between releases, pip-compile itself is the stable interface
+            print("In-process resolution failed, falling back to pip-compile:", e)
+    return compile_requirements(directory, pip_args, upgrade_packages, timeout)
+
+
+class PinnedVersionConflict(Exception):
+    def __init__(self, names: t.Collection[str]):
+        super().__init__("Version conflicts would unpin " + ", ".join(sorted(names)))
+        self.names = set(names)
+
+
+def generate_requirements_txt_file(
+    unversioned_requirements,
+    all_requirements,
+    cache: t.Optional[ResolutionCache] = None,
+    directory: str = ".",
+    pip_args: t.Sequence[str] = (),
+    resolver: t.Optional[InProcessResolver] = None,
+    history: t.Optional[LockHistory] = None,
+    timeout: t.Optional[float] = None,
+    nogoods: t.Optional[NogoodStore] = None,
+    keep_pinned: t.Collection[str] = (),
+):
+    # keep_pinned are requirements whose pin is the point of the probe. Conflicts only unpin the other requirements
+    # involved, and raise PinnedVersionConflict once nothing else is left to unpin
+    lines = {r.name: r.line for r in all_requirements}
+    if nogoods is not None:
+        known_conflicts = nogoods.expand(unversioned_requirements, lines, keep_pinned)
+        if known_conflicts:
+            print("Unpinning", ", ".join(sorted(known_conflicts)), "to avoid known version conflicts")
+    if unversioned_requirements.intersection(keep_pinned):
+        raise PinnedVersionConflict(unversioned_requirements.intersection(keep_pinned))
+    attempt = 0
     while True:
         versioned_requirements = {
             r.line for r in all_requirements if r.name not in unversioned_requirements
         }
 
-        generate_requirements_in_file(unversioned_requirements, versioned_requirements)
+        generate_requirements_in_file(unversioned_requirements, versioned_requirements, directory)
 
         with contextlib.suppress(FileNotFoundError):
-            os.remove("requirements.dev.txt")
+            os.remove(os.path.join(directory, "requirements.dev.txt"))
         with contextlib.suppress(FileNotFoundError):
-            os.remove("requirements.txt")
+            os.remove(os.path.join(directory, "requirements.txt"))
 
-        subprocess.run(
-            ["pip-compile", "requirements.test.in", "--output-file=requirements.txt"],
-            capture_output=True,
-            check=True,
-        )
-        result = subprocess.run(
-            ["pip-compile", "requirements.dev.in", "--output-file=requirements.dev.txt"],
-            capture_output=True,
-        )
-        if result.returncode != 0:
+        attempt += 1
+        with tracing.span("compile attempt", attempt=attempt, unpinned=len(unversioned_requirements)) as attempt_span:
+            resolution = None
+            if cache is not None:
+                cache_key = cache.key_for_files(
+                    os.path.join(directory, "requirements.test.in"),
+                    os.path.join(directory, "requirements.dev.in"),
+                    pip_args,
+                )
+                resolution = cache.get(cache_key)
+                if resolution is not None:
+                    print("Using cached resolution", cache_key[:12])
+                    attempt_span["cached"] = True
+                    if resolution.succeeded:
+                        resolution.write_lock_files(directory)
+            if resolution is None:
+                upgrade_packages = None
+                base = history.base_for(unversioned_requirements) if history is not None else None
+                if base is not None:
+                    base_unpinned, base_resolution = base
+                    base_resolution.write_lock_files(directory)
+                    upgrade_packages = history.upgrade_packages(base_unpinned, unversioned_requirements)
+                    print(f"Re-resolving {len(upgrade_packages)} of {len(all_requirements)} requirements")
+                resolution = resolve_requirements(directory, pip_args, resolver, upgrade_packages, timeout)
+                if cache is not None:
+                    cache.put(cache_key, resolution)
+            if history is not None:
+                history.record(unversioned_requirements, resolution)
+            attempt_span["outcome"] = "resolved" if resolution.succeeded else "conflict"
+
+        if not resolution.succeeded:
             print("Failed to compile requirements")
-            problem_requirements = get_problem_requirements_from_pip_compile_output(
-                result.stderr.decode("utf-8")
-            )
+            problem_requirements = resolution.conflicts
+            if nogoods is not None:
+                nogoods.learn(problem_requirements, unversioned_requirements, lines)
             if unversioned_requirements.intersection(problem_requirements) == problem_requirements:
-                print(result.stderr)
-                raise Exception("Cannot resolve version conflicts")
-            for r in problem_requirements:
+                if resolution.stderr:
+                    print(resolution.stderr)
+                raise Exception(
+                    "Cannot resolve version conflicts: " + ", ".join(sorted(problem_requirements))
+                )
+            unpinnable = problem_requirements.difference(keep_pinned)
+            if unpinnable <= unversioned_requirements:
+                raise PinnedVersionConflict(problem_requirements.intersection(keep_pinned))
+            for r in unpinnable:
                 unversioned_requirements.add(r)
             continue
         print("Requirements successfully compiled")
         return
 
 
-def install_requirements_txt_file():
-    subprocess.run(["pip-sync", "requirements.dev.txt"], check=True)
+def install_requirements_txt_file(
+    workspace: t.Optional[ProbeWorkspace] = None, pip_args: t.Sequence[str] = (), timeout: t.Optional[float] = None
+):
+    with tracing.span("install"):
+        if workspace is None:
+            command = ["pip-sync", "requirements.dev.txt", *pip_args]
+            run_streaming(command, timeout=timeout, echo=True).check(command)
+            return
+        # a workspace virtualenv starts out empty, so a plain install is equivalent to a sync
+        command = [workspace.venv.python, "-m", "pip", "install", "--quiet", *pip_args, "-r", "requirements.dev.txt"]
+        run_streaming(
+            command, cwd=workspace.directory, env=workspace.venv.environ(), timeout=timeout, echo=True
+        ).check(command)
+
+
+def run_pytest(
+    workspace: t.Optional[ProbeWorkspace] = None,
+    pytest_args: t.Sequence[str] = (),
+    timeout: t.Optional[float] = None,
+    abort_on: t.Sequence[str] = (),
+    pythonpath: t.Sequence[str] = (),
+) -> TestRun:
+    # abort_on lists tests whose failure decides the run, pytest is stopped as soon as one of them is reported
+    watcher = None
+    if abort_on:
+        watcher = FailureWatcher(abort_on)
+        pytest_args = ["-v", *pytest_args]
+    if workspace is None:
+        command = ["pytest", "--reuse-db", "-rfE", *pytest_args]
+        cwd, env = None, None
+    else:
+        command = [
+            workspace.venv.python,
+            "-m",
+            "pytest",
+            "--reuse-db",
+            "-rfE",
+            "-o",
+            f"cache_dir={workspace.path('.pytest_cache')}",
+            *pytest_args,
+        ]
+        cwd, env = workspace.project_dir, workspace.venv.environ()
+    if pythonpath:
+        env = dict(env if env is not None else os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([*pythonpath, *filter(None, [env.get("PYTHONPATH")])])
+    with tracing.span("pytest", selected=len(pytest_args)) as pytest_span:
+        result = run_streaming(command, cwd=cwd, env=env, on_stdout=watcher, timeout=timeout, echo=True)
+        pytest_span["outcome"] = result.outcome
+    if result.timed_out:
+        # a hung test run counts as a failure, like any other test that does not finish
+        print(f"Tests did not finish within {timeout} seconds")
+    failed_node_ids = parse_failed_node_ids(result.stdout)
+    if watcher is not None:
+        failed_node_ids = [n for n in watcher.failed_node_ids if n not in failed_node_ids] + failed_node_ids
+    return TestRun(result.succeeded, failed_node_ids)
 
 
-def run_tests():
-    return subprocess.run(["pytest", "--reuse-db"]).returncode == 0
+def run_test_suite(
+    workspace: t.Optional[ProbeWorkspace] = None,
+    selector: t.Optional[FailureFirstSelector] = None,
+    timeout: t.Optional[float] = None,
+    test_paths: t.Sequence[str] = (),
+) -> TestRun:
+    # test_paths limits the run to the test modules a probe can affect, by default everything runs
+    if selector is None:
+        return run_pytest(workspace, test_paths, timeout=timeout)
+    if selector.baseline_failures is None:
+        test_run = run_pytest(workspace, test_paths, timeout=timeout)
+        if not test_run.passed:
+            selector.record_baseline(test_run.failed_node_ids)
+        return test_run
+    baseline_failures = [
+        node_id for node_id in selector.baseline_failures if not test_paths or node_id.split("::")[0] in test_paths
+    ]
+    if baseline_failures:
+        test_run = run_pytest(workspace, ["-x", *baseline_failures], timeout=timeout, abort_on=baseline_failures)
+        if not test_run.passed:
+            print("Known failure reproduced, not running the rest of the suite")
+            return test_run
+    # only a full run can be trusted to declare a probe as passing
+    return run_pytest(workspace, test_paths, timeout=timeout)
 
 
-class EndNodeReached(Exception):
-    def __init__(self, requirement: Requirement):
-        self.requirement = requirement
+def run_tests(
+    workspace: t.Optional[ProbeWorkspace] = None,
+    selector: t.Optional[FailureFirstSelector] = None,
+    timeout: t.Optional[float] = None,
+    test_paths: t.Sequence[str] = (),
+) -> bool:
+    return run_test_suite(workspace, selector, timeout, test_paths).passed
 
 
-class BinarySearcher:
-    def __init__(self, initial_tree):
-        self._initial_tree = initial_tree
-        self._traversal = [[initial_tree, initial_tree[: len(initial_tree // 2)]]]
+def judge_tests(
+    workspace: t.Optional[ProbeWorkspace],
+    oracle: FlakyTestOracle,
+    selector: t.Optional[FailureFirstSelector] = None,
+    timeout: t.Optional[float] = None,
+    test_paths: t.Sequence[str] = (),
+) -> Verdict:
+    def rerun() -> TestRun:
+        # only the signature decides the verdict, so a rerun doesn't need the rest of the suite
+        signature = [
+            node_id for node_id in oracle.signature or () if not test_paths or node_id.split("::")[0] in test_paths
+        ]
+        return run_pytest(workspace, signature or test_paths, timeout=timeout)
 
-    def passed(self):
-        # if this is the first half, go to the second half
-        if self._traversal[-1][-2][0] == self._traversal[-1][-1][0]:
-            self._traversal[-1][-1] = self._traversal[-1][-2][len(self._traversal[-1]) :]
-            return self._traversal[-1][-1]
+    verdict = oracle.judge(run_test_suite(workspace, selector, timeout, test_paths), rerun)
+    print(
+        f"Tests {'passed' if verdict.passed else 'failed'} with {verdict.confidence:.1%} confidence"
+        f" after {verdict.runs} runs"
+    )
+    return verdict
 
-        # otherwise this must already be the second half of the current subset
-        # possibilities are:
-        #  - there are parents within the current traversal subset
-        #  - there are no more parents within the current traversal subset, but there are parent subsets
-        #  - there are no more parents within the current traversal subset, and there are no more parent subsets - we're finished
 
-        # go up a level in the current subset and try again
-        self._traversal[-1].pop()
+class StageTimeouts:
+    def __init__(
+        self,
+        compile_timeout: t.Optional[float] = None,
+        install_timeout: t.Optional[float] = None,
+        test_timeout: t.Optional[float] = None,
+    ):
+        self.compile_timeout = compile_timeout
+        self.install_timeout = install_timeout
+        self.test_timeout = test_timeout
 
-        # if there isn't another level inside the current subset, move to the parent subset then try again
-        if not len(self._traversal[-1]) > 1:
-            self._traversal.pop()
-            if not len(self._traversal) > 1:
-                # Ok, that's the end of the pile
-                return
-            self._traversal.pop()
-        return self.passed()
 
-    def failed(self):
-        # if there is more than a single item, then bisect it
-        if len(self._traversal[-1][-1]) > 1:
-            self._traversal.push(self._traversal[-1][-1][: len(self._traversal[-1][-1] // 2)])
-            return self._traversal[-1][-1]
-        # if there is only a single item, see if it has children. If it has children, bisect them
-        children = self._traversal[-1][-1].get_children()
-        if children:
-            self._traversal.push([children, children[: len(children // 2)]])
-            return self._traversal[-1][-1]
-        raise EndNodeReached(self._traversal[-1][-1])
+class ProbeOptions:
+    def __init__(
+        self,
+        cache: t.Optional[ResolutionCache] = None,
+        env_pool: t.Optional[EnvironmentPool] = None,
+        wheelhouse: t.Optional[Wheelhouse] = None,
+        journal: t.Optional[ProbeJournal] = None,
+        test_selector: t.Optional[FailureFirstSelector] = None,
+        resolver: t.Optional[InProcessResolver] = None,
+        lock_history: t.Optional[LockHistory] = None,
+        timeouts: t.Optional[StageTimeouts] = None,
+        nogoods: t.Optional[NogoodStore] = None,
+        test_impact: t.Optional[TestImpactSelector] = None,
+        project_dir: str = ".",
+        test_oracle: t.Optional[FlakyTestOracle] = None,
+        keep_pinned: t.Collection[str] = (),
+    ):
+        self.cache = cache
+        self.env_pool = env_pool
+        self.wheelhouse = wheelhouse
+        self.journal = journal
+        self.test_selector = test_selector
+        self.resolver = resolver
+        self.lock_history = lock_history
+        self.timeouts = timeouts or StageTimeouts()
+        self.nogoods = nogoods
+        self.test_impact = test_impact
+        # where requirements.dev.in is read from for resolutions outside a probe workspace
+        self.project_dir = project_dir
+        self.test_oracle = test_oracle
+        self.keep_pinned = keep_pinned
 
-    # if first item of current bottom level == first item of parent level, then you're doing the first half
+    @property
+    def pip_args(self) -> list[str]:
+        return self.wheelhouse.pip_args() if self.wheelhouse is not None else []
 
-    # start with half of the top level of the unpinned. If that passes, get the next half of that level of the tree.
-    # if it fails, test with half of that top level.
-    # If we're down to one in the top level, go to half the children of that. IF it passes, go to the next half. If it fails, split the current half.
-    # if the current half is 'one', then see if it has children. If it has children, test pinning them.
 
-    # test with none pinned; if fails, pin half and all descendents of that half; if p
+def build_test_impact_index(path: str, run_id: str, reqs: list[Requirement]) -> TestImpactIndex:
+    # one traced run of the whole suite, in the current environment with the original pins installed
+    print("Tracing which requirements each test module uses")
+    traced_path = path + ".traced"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    run_pytest(
+        None,
+        ["-p", "impact_plugin", f"--impact-index={traced_path}"],
+        pythonpath=[os.path.dirname(os.path.abspath(__file__))],
+    )
+    with open(traced_path, "r") as f:
+        traced = json.load(f)
+    os.remove(traced_path)
+    # test tooling from requirements.dev.in is re-resolved on every probe, only the searched requirements count
+    names = {canonical_name(r.name) for r in reqs}
+    index = TestImpactIndex({module: set(distributions) & names for module, distributions in traced.items()})
+    index.save(path, run_id)
+    return index
 
-    # if something fails when unpinned, but passes when pinned, that thing being pinned is contributing
-    # then try to isolate the smallest group that can be pinned
 
-    # start with nothing pinned
+def run_probe(
+    unversioned_requirements,
+    all_requirements,
+    options: t.Optional[ProbeOptions] = None,
+    workspace: t.Optional[ProbeWorkspace] = None,
+) -> bool:
+    with tracing.span(
+        "probe", probe_id=tracing.TRACER.next_probe_id(), subset_size=len(unversioned_requirements)
+    ) as probe_span:
+        options = options or ProbeOptions()
+        directory = workspace.directory if workspace is not None else "."
+        started = time.monotonic()
+        generate_requirements_txt_file(
+            set(unversioned_requirements),
+            all_requirements,
+            options.cache,
+            directory,
+            options.pip_args,
+            options.resolver,
+            options.lock_history,
+            options.timeouts.compile_timeout,
+            options.nogoods,
+            options.keep_pinned,
+        )
+        compile_seconds = time.monotonic() - started
+
+        lock_hash = None
+        if options.journal is not None:
+            with open(os.path.join(directory, "requirements.dev.txt"), "r") as f:
+                lock_hash = hash_lock_file(f.read())
+            known = options.journal.lookup_lock(lock_hash)
+            if known is not None:
+                print("These resolved requirements were already tested, reusing the result")
+                probe_span["outcome"] = "reused"
+                options.journal.record(
+                    JournalEntry(unversioned_requirements, lock_hash, known, compile_seconds, reused=True)
+                )
+                return known
 
-    # failure can be because top level version changes, or because children change - need to be able to differentiate
-    # if fully pinned passes, unpin half of tree all the way down. If that passes, unpin half that tree all the way down. If it fails, pin the other half.
+        test_paths: t.Sequence[str] = ()
+        if options.test_impact is not None:
+            with open(os.path.join(directory, "requirements.dev.txt"), "r") as f:
+                pins = parse_lock_pins(f.read())
+            test_paths = options.test_impact.select(pins)
+            print("Tests affected by the changed pins:", ", ".join(test_paths) or "none")
+
+        confidence = None
+
+        def test() -> bool:
+            nonlocal confidence
+            if options.test_oracle is None:
+                return run_tests(workspace, options.test_selector, options.timeouts.test_timeout, test_paths)
+            verdict = judge_tests(
+                workspace, options.test_oracle, options.test_selector, options.timeouts.test_timeout, test_paths
+            )
+            confidence = verdict.confidence
+            return verdict.passed
+
+        started = time.monotonic()
+        install_seconds = 0.0
+        if options.test_impact is not None and not test_paths:
+            passed = True
+        elif options.env_pool is None or workspace is None:
+            install_requirements_txt_file(workspace, options.pip_args, options.timeouts.install_timeout)
+            install_seconds = time.monotonic() - started
+            started = time.monotonic()
+            passed = test()
+        else:
+            with open(workspace.path("requirements.dev.txt"), "r") as f:
+                target = parse_lock_pins(f.read())
+            with options.env_pool.checkout(target) as environment:
+                with tracing.span("install", pooled=True):
+                    options.env_pool.sync(environment, target, options.pip_args, options.timeouts.install_timeout)
+                install_seconds = time.monotonic() - started
+                started = time.monotonic()
+                workspace.venv = environment.venv
+                passed = test()
+        test_seconds = time.monotonic() - started
+
+        if options.journal is not None:
+            options.journal.record(
+                JournalEntry(
+                    unversioned_requirements,
+                    lock_hash,
+                    passed,
+                    compile_seconds,
+                    install_seconds,
+                    test_seconds,
+                    confidence=confidence,
+                )
+            )
+        if passed and options.test_impact is not None:
+            options.test_impact.record_good(pins)
+        probe_span["outcome"] = "passed" if passed else "failed"
+        if confidence is not None:
+            probe_span["confidence"] = round(confidence, 3)
+        return passed
+
+
+def prefetch_wheelhouse(
+    wheelhouse: Wheelhouse, reqs: list[Requirement], unversioned_requirements: set[str], project_dir: str = "."
+):
+    # covers the original pins and the fully unpinned resolution. A probe in between may resolve other versions
+    # of their shared dependencies, those come from the index, or fail to resolve when running offline
+    wheelhouse.download_build_requirements()
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(os.path.join(project_dir, "requirements.dev.in"), directory)
+        for unpinned in (set(), set(unversioned_requirements)):
+            generate_requirements_txt_file(unpinned, reqs, directory=directory)
+            wheelhouse.download_lock_file(os.path.join(directory, "requirements.dev.txt"))
+
+
+def resolve_pins(unversioned_requirements, reqs: list[Requirement], options: ProbeOptions) -> dict[str, str]:
+    # resolves in a scratch directory; the resolution cache usually already has the answer
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(os.path.join(options.project_dir, "requirements.dev.in"), directory)
+        generate_requirements_txt_file(
+            set(unversioned_requirements),
+            reqs,
+            options.cache,
+            directory,
+            options.pip_args,
+            options.resolver,
+            options.lock_history,
+            options.timeouts.compile_timeout,
+            options.nogoods,
+        )
+        with open(os.path.join(directory, "requirements.txt"), "r") as f:
+            return parse_lock_pins(f.read())
+
+
+def get_prior_scores(reqs: list[Requirement], new_pins: dict[str, str]) -> dict[str, float]:
+    graph = DependencyGraph(reqs)
+    priors = {}
+    for r in reqs:
+        old_version = r.specs[0][1] if len(r.specs) == 1 and r.specs[0][0] == "==" else None
+        priors[r.name] = prior_score(
+            old_version,
+            new_pins.get(canonical_name(r.name)),
+            r.is_primary_dependency,
+            len(graph.all_dependents(r.name)),
+        )
+    return priors
+
+
+def bisect_versions(
+    culprit: Requirement,
+    reqs: list[Requirement],
+    old_version: str,
+    new_version: str,
+    options: t.Optional[ProbeOptions] = None,
+    pool: t.Optional[ProbePool] = None,
+) -> t.Optional[str]:
+    options = copy.copy(options or ProbeOptions())
+    # these probes change a pin rather than the unpinned set, which is what the journal records
+    options.journal = None
+    # a probe whose compile retries unpinned the culprit would test whatever version the resolver picked
+    options.keep_pinned = {culprit.name}
+    candidates = versions_between(list_available_versions(culprit.name, options.pip_args), old_version, new_version)
+    print(f"Bisecting {len(candidates)} releases of {culprit.name} between {old_version} and {new_version}")
+    probes = 0
+
+    def pinned_at(version: str) -> list[Requirement]:
+        # every other requirement keeps its original pin
+        return [Requirement.parse(f"{r.name}=={version}") if r.name == culprit.name else r for r in reqs]
+
+    def probe_in_workspace(version: str, workspace: ProbeWorkspace) -> bool:
+        return run_probe(set(), pinned_at(version), options, workspace)
+
+    untestable: set[str] = set()
+
+    def is_good(version: str) -> t.Optional[bool]:
+        nonlocal probes
+        probes += 1
+        with tracing.span("version probe", requirement=culprit.name, version=version) as version_span:
+            try:
+                if pool is None:
+                    passed = run_probe(set(), pinned_at(version), options)
+                else:
+                    passed = pool.submit(probe_in_workspace, version).result()
+            except PinnedVersionConflict:
+                # neither verdict would be about that release, so the bisection steps over it
+                version_span["outcome"] = "conflict"
+                print(f"{culprit.name}=={version} conflicts with the other pins, skipping it")
+                untestable.add(version)
+                return None
+            version_span["outcome"] = "passed" if passed else "failed"
+        print(f"{culprit.name}=={version}", "passed" if passed else "failed")
+        return passed
+
+    first_bad = find_first_bad_version(candidates, is_good)
+    if first_bad is None:
+        return None
+    end = candidates.index(first_bad)
+    start = end
+    while start > 0 and candidates[start - 1] in untestable:
+        start -= 1
+    if start < end:
+        print(
+            f"First bad release of {culprit.name} is one of {', '.join(candidates[start : end + 1])}, found in"
+            f" {probes} probes. The earlier ones could not be tested"
+        )
+        return None
+    print(f"First bad release of {culprit.name} is {first_bad}, found in {probes} probes")
+    return first_bad
 
 
-def main(args: list[str]) -> None:
+def search(
+    reqs: list[Requirement],
+    unversioned_requirements: set[str],
+    options: t.Optional[ProbeOptions] = None,
+    pool: t.Optional[ProbePool] = None,
+    lookahead: int = 1,
+    strategy: str = "binary",
+    tree: t.Optional[list[Requirement]] = None,
+) -> list[Requirement]:
+    # tree replaces reqs as the forest the binary search walks, e.g. with unchanged subtrees pruned. Probes still
+    # pin everything else from reqs
+    results: dict[frozenset[str], bool] = {}
+    probes_run = 0
+    if options is not None and options.journal is not None:
+        # replaying journalled results through the searcher rebuilds its state after a restart
+        results.update(options.journal.results())
+
+    graph = DependencyGraph(reqs)
+    progress = ProgressLine()
+
+    def unpinned_for(subset) -> frozenset[str]:
+        return frozenset(graph.names_for(graph.subtree_mask(r.name for r in subset)) & unversioned_requirements)
+
+    def probe_in_workspace(unpinned: frozenset[str], workspace: ProbeWorkspace) -> bool:
+        return run_probe(unpinned, reqs, options, workspace)
+
+    def store_result(unpinned: frozenset[str], passed: bool):
+        nonlocal probes_run
+        probes_run += 1
+        results[unpinned] = passed
+        print("Unpinned", ", ".join(sorted(unpinned)), "passed" if passed else "failed")
+        print(progress.format(probes_run, estimate_remaining_probes(len(unpinned))))
+
+    def probe(unpinned: frozenset[str]) -> bool:
+        if unpinned not in results:
+            if pool is None:
+                store_result(unpinned, run_probe(unpinned, reqs, options))
+            else:
+                store_result(unpinned, pool.submit(probe_in_workspace, unpinned).result())
+        return results[unpinned]
+
+    if probe(frozenset(unversioned_requirements)):
+        print("Tests pass with every requirement unpinned")
+        return []
+
+    if strategy == "ddmin":
+        debugger = DeltaDebugger([r for r in reqs if r.name in unversioned_requirements])
+        subset = debugger.failed()
+        while subset is not None:
+            passed = probe(frozenset(r.name for r in subset))
+            with tracing.span("search decision", strategy=strategy, subset_size=len(subset), passed=passed):
+                subset = debugger.passed() if passed else debugger.failed()
+        print(f"Delta debugging used {debugger.probe_count} probes ({probes_run} run)")
+        print("Minimal failing combination:", ", ".join(r.name for r in debugger.result))
+        return debugger.result
+
+    if strategy == "weighted":
+        new_pins = resolve_pins(unversioned_requirements, reqs, options or ProbeOptions())
+        weighted_searcher = WeightedSearcher(
+            [r for r in reqs if r.name in unversioned_requirements], get_prior_scores(reqs, new_pins)
+        )
+        culprits = []
+        subset = weighted_searcher.failed()
+        while subset is not None:
+            passed = probe(frozenset(r.name for r in subset))
+            with tracing.span("search decision", strategy=strategy, subset_size=len(subset), passed=passed):
+                if passed:
+                    subset = weighted_searcher.passed()
+                    continue
+                try:
+                    subset = weighted_searcher.failed()
+                except EndNodeReached as e:
+                    print("Found failure cause", e.requirement.name)
+                    culprits.append(e.requirement)
+                    subset = weighted_searcher.passed()
+        print(f"Weighted search used {weighted_searcher.probe_count} probes ({probes_run} run)")
+        return culprits
+
+    searcher = SpeculativeSearcher(
+        [r for r in tree or reqs if r.is_primary_dependency], lookahead=lookahead if pool is not None else 0
+    )
+    in_flight: dict[frozenset[str], concurrent.futures.Future] = {}
+    while True:
+        while True:
+            for subset in searcher.candidates():
+                unpinned = unpinned_for(subset)
+                if unpinned in results:
+                    searcher.record(subset, results[unpinned])
+            with tracing.span("search decision", strategy=strategy, subset_size=len(searcher.current or [])):
+                for culprit in searcher.advance():
+                    print("Found failure cause", culprit.name)
+            if searcher.finished or unpinned_for(searcher.current) not in results:
+                break
+        if searcher.finished:
+            break
+
+        if pool is None:
+            unpinned = unpinned_for(searcher.current)
+            store_result(unpinned, run_probe(unpinned, reqs, options))
+            continue
+
+        candidates = [unpinned_for(subset) for subset in searcher.candidates()]
+        for unpinned in candidates:
+            if len(in_flight) >= pool.jobs:
+                break
+            if unpinned not in results and unpinned not in in_flight:
+                in_flight[unpinned] = pool.submit(probe_in_workspace, unpinned)
+        # speculative probes that have not started yet are dropped once their branch is ruled out
+        for unpinned, future in list(in_flight.items()):
+            if unpinned not in candidates and future.cancel():
+                del in_flight[unpinned]
+        done, _ = concurrent.futures.wait(in_flight.values(), return_when=concurrent.futures.FIRST_COMPLETED)
+        for unpinned, future in list(in_flight.items()):
+            if future in done:
+                del in_flight[unpinned]
+                store_result(unpinned, future.result())
+
+    for future in in_flight.values():
+        future.cancel()
+    print(f"Binary search used {probes_run} probes")
+    by_name = {r.name: r for r in reqs}
+    culprits = []
+    for culprit in searcher.culprits:
+        if by_name[culprit.name] not in culprits:
+            culprits.append(by_name[culprit.name])
+    return culprits
+
+
+def serve_queue(queue_dir: str, options: ProbeOptions, pool: ProbePool, poll_interval: float = 1.0) -> int:
+    # a worker gets the requirements.txt to search from the coordinator, and only needs the same checkout
+    queue = WorkQueue(queue_dir)
+    worker_id = default_worker_id()
+    run = queue.run()
+    while run is None:
+        time.sleep(poll_interval)
+        run = queue.run()
+    if run["run_id"] != get_run_id():
+        raise Exception(f"The queue in {queue_dir} was started for different requirements than this checkout")
+    reqs = LockfileParser(run["requirements_txt"].splitlines(keepends=True)).parse()
+    # the worker's own journal provides the timings to report back, and lets it reuse results between probes
+    options.journal = ProbeJournal(queue.path("workers", f"{worker_id}.journal.jsonl"), run["run_id"])
+
+    def probe_in_workspace(unpinned: frozenset[str], workspace: ProbeWorkspace) -> bool:
+        return run_probe(unpinned, reqs, options, workspace)
+
+    def probe(unpinned: frozenset[str]) -> dict:
+        passed = pool.submit(probe_in_workspace, unpinned).result()
+        return {"passed": passed, "entry": options.journal.entries[-1].to_json()}
+
+    print(f"Worker {worker_id} waiting for probes in {queue.root}")
     try:
-        with open("requirements.txt", "r") as f:
-            requirements_txt_original = f.read()
+        return run_worker(queue, probe, worker_id, poll_interval)
+    finally:
+        options.journal.close()
+
+
+def get_run_id(project_dir: str = ".") -> str:
+    # a journal is only valid for the requirements it was recorded against
+    digest = hashlib.sha256()
+    for filename in ("requirements.in", "requirements.txt", "requirements.dev.in"):
+        with open(os.path.join(project_dir, filename), "rb") as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def keep_original_requirements_txt(saved_path: str, resume: bool = False) -> str:
+    # Probes that run in the project directory compile into ./requirements.txt, and main only puts the original
+    # back if it gets to exit. A copy is kept next to the journal until then. A copy left behind by a run that was
+    # killed is only restored over a probe's lock file, or with --resume, so edits made since are never lost
+    if os.path.exists(saved_path):
+        try:
+            with open("requirements.txt", "r") as f:
+                current: t.Optional[str] = f.read()
+        except FileNotFoundError:
+            # a probe removes it before compiling
+            current = None
+        with open(saved_path, "r") as f:
+            saved = f.read()
+        if current != saved:
+            if not resume and current is not None and PROBE_LOCK_MARKER not in current:
+                raise Exception(
+                    f"{saved_path} holds the requirements.txt of an interrupted run, but requirements.txt has been"
+                    " changed since. Pass --resume to restore the copy, or delete it to keep the current file"
+                )
+            print("Restoring requirements.txt from", saved_path, "left behind by an interrupted run")
+            shutil.copy(saved_path, "requirements.txt")
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(saved_path)), exist_ok=True)
+        temporary = f"{saved_path}.tmp"
+        shutil.copy("requirements.txt", temporary)
+        os.replace(temporary, saved_path)
+    with open(saved_path, "r") as f:
+        return f.read()
+
+
+def parse_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Find the requirement updates that cause tests to fail")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(".requirements-tester-cache", "resolutions"),
+        help="Directory for cached pip-compile resolutions",
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=256, help="Maximum size of the resolution cache in megabytes"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always run pip-compile from scratch")
+    parser.add_argument(
+        "--resolver",
+        choices=("auto", "in-process", "subprocess"),
+        default="auto",
+        help="in-process runs pip-tools' resolver in this process and keeps its caches warm between probes,"
+        " subprocess runs pip-compile for every compile. auto uses in-process when pip-tools is importable",
+    )
+    parser.add_argument(
+        "--nogood-file",
+        default=os.path.join(".requirements-tester-cache", "nogoods.json"),
+        help="Version conflicts learned from earlier compiles, used to unpin conflicting requirements up front",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Start each compile from the closest earlier lock file and only re-resolve the requirements whose"
+        " pin changed, plus their dependencies",
+    )
+    parser.add_argument(
+        "--resolver-cache-dir",
+        default=os.path.join(".requirements-tester-cache", "pip-tools"),
+        help="Directory for the in-process resolver's package metadata cache",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of probes to run at once, each in its own scratch directory and virtualenv",
+    )
+    parser.add_argument(
+        "--workspace-dir",
+        default=os.path.join(".requirements-tester-cache", "workspaces"),
+        help="Directory for per-probe scratch directories when running with --jobs",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=("binary", "ddmin", "weighted"),
+        default="binary",
+        help="binary bisects the dependency tree assuming a single culprit, ddmin finds a minimal failing"
+        " combination of unpinned requirements, weighted probes the most suspicious upgrades first",
+    )
+    parser.add_argument(
+        "--lookahead",
+        type=int,
+        default=1,
+        help="How many levels of the search to evaluate speculatively when running with --jobs",
+    )
+    parser.add_argument(
+        "--env-pool",
+        type=int,
+        default=0,
+        metavar="SIZE",
+        help="Install probes into a pool of persistent virtualenvs, applying only the package changes. With --jobs"
+        " above SIZE, compiled probes queue for an environment and the closest probe and environment go first",
+    )
+    parser.add_argument(
+        "--env-pool-dir",
+        default=os.path.join(".requirements-tester-cache", "environments"),
+        help="Directory for the persistent virtualenv pool",
+    )
+    parser.add_argument(
+        "--wheelhouse",
+        help="Prefetch the original pins and the fully unpinned resolution into this directory, and look there before"
+        " the index for every compile and install",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use the existing --wheelhouse as-is without prefetching anything, and never fall back to the index",
+    )
+    parser.add_argument(
+        "--journal",
+        default=os.path.join(".requirements-tester-cache", "journal.jsonl"),
+        help="Append-only record of every probe, used by --resume",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continue the search from the probes recorded in --journal"
+    )
+    parser.add_argument(
+        "--failure-first",
+        action="store_true",
+        help="Run the tests that fail with everything unpinned first, and stop a probe as soon as one fails",
+    )
+    for stage, description in (
+        ("compile", "resolving a probe's requirements"),
+        ("install", "installing a probe's lock file"),
+        ("test", "a probe's test run, which then counts as failed"),
+    ):
+        parser.add_argument(
+            f"--{stage}-timeout", type=float, metavar="SECONDS", help=f"Time limit for {description}"
+        )
+    parser.add_argument(
+        "--flaky-tests",
+        action="store_true",
+        help="Only count a probe as failed when the tests that failed with everything unpinned fail again, and"
+        " rerun them while the verdict is uncertain. Each probe's confidence is printed and journalled",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.9,
+        help="How sure --flaky-tests has to be of a verdict before it stops rerunning the failure signature",
+    )
+    parser.add_argument(
+        "--max-test-runs", type=int, default=5, help="Most test runs --flaky-tests spends on a single probe"
+    )
+    parser.add_argument(
+        "--test-impact",
+        action="store_true",
+        help="Only run the test modules that use a requirement whose pin changed since the last passing lock file."
+        " The first run traces the test suite in the current environment to build --test-impact-index",
+    )
+    parser.add_argument(
+        "--test-impact-index",
+        default=os.path.join(".requirements-tester-cache", "test-impact.json"),
+        help="Which requirements each test module uses, rebuilt when the requirements change",
+    )
+    parser.add_argument(
+        "--prune-unchanged",
+        action="store_true",
+        help="Resolve everything unpinned once, and leave the requirements that keep their version, and subtrees"
+        " made up only of them, out of the search",
+    )
+    parser.add_argument(
+        "--bisect-versions",
+        action="store_true",
+        help="For each culprit, find the first release between its old pin and the new version that fails",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a Chrome trace of every probe, compile attempt, install, test run and search decision."
+        " Open it in chrome://tracing or https://ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--queue-dir",
+        help="Hand probes out through a work queue in this directory instead of running them here. Put it on a"
+        " filesystem shared with the workers, and set --jobs to how many probes may be queued at once",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run probes from --queue-dir until the coordinator finishes. Start workers from the same checkout",
+    )
+    parser.add_argument("--keep-workspaces", action="store_true", help="Do not delete probe scratch directories")
+    options = parser.parse_args(args)
+    if options.offline and not options.wheelhouse:
+        parser.error("--offline needs a --wheelhouse to install from")
+    if options.worker and not options.queue_dir:
+        parser.error("--worker needs the --queue-dir to take probes from")
+    if options.queue_dir:
+        for name in QUEUE_UNSUPPORTED_OPTIONS:
+            if getattr(options, name):
+                parser.error(f"--{name.replace('_', '-')} is not supported with --queue-dir")
+    if options.compile_timeout is not None and options.resolver == "in-process":
+        parser.error("--compile-timeout cannot interrupt the in-process resolver, use --resolver subprocess")
+    return options
+
+
+def build_shared_probe_options(options: argparse.Namespace) -> ProbeOptions:
+    # what can be shared between the searches of several projects, and is all a queue worker needs
+    cache = None
+    if not options.no_cache:
+        cache = ResolutionCache(options.cache_dir, max_bytes=options.cache_max_mb * 1024 * 1024)
+    env_pool = None
+    if options.env_pool:
+        env_pool = EnvironmentPool(options.env_pool_dir, options.env_pool)
+    return ProbeOptions(
+        cache=cache,
+        env_pool=env_pool,
+        wheelhouse=Wheelhouse(options.wheelhouse, options.offline) if options.wheelhouse else None,
+        # an in-process resolve cannot be interrupted, so a compile time limit needs pip-compile subprocesses
+        resolver=create_resolver(
+            "subprocess" if options.compile_timeout is not None else options.resolver, options.resolver_cache_dir
+        ),
+        timeouts=StageTimeouts(options.compile_timeout, options.install_timeout, options.test_timeout),
+        nogoods=NogoodStore(options.nogood_file),
+    )
+
 
+def build_probe_options(
+    options: argparse.Namespace,
+    reqs: list[Requirement],
+    project_dir: str = ".",
+    shared: t.Optional[ProbeOptions] = None,
+    journal: t.Optional[ProbeJournal] = None,
+    test_impact: t.Optional[TestImpactSelector] = None,
+) -> ProbeOptions:
+    # one project's probe options, on top of the shared ones. What learns from earlier probes is kept next to
+    # the project's journal, and relative journal paths are relative to the project
+    shared = shared or build_shared_probe_options(options)
+    state_dir = os.path.dirname(os.path.abspath(os.path.join(project_dir, options.journal)))
+    test_selector = None
+    if options.failure_first:
+        test_selector = FailureFirstSelector(os.path.join(state_dir, "baseline-failures.json"), resume=options.resume)
+    test_oracle = None
+    if options.flaky_tests:
+        test_oracle = FlakyTestOracle(
+            os.path.join(state_dir, "failure-signature.json"),
+            resume=options.resume,
+            confidence=options.confidence,
+            max_runs=options.max_test_runs,
+        )
+    return ProbeOptions(
+        cache=shared.cache,
+        env_pool=shared.env_pool,
+        wheelhouse=shared.wheelhouse,
+        journal=journal,
+        test_selector=test_selector,
+        resolver=shared.resolver,
+        lock_history=LockHistory(DependencyGraph(reqs)) if options.incremental else None,
+        timeouts=shared.timeouts,
+        nogoods=shared.nogoods,
+        test_impact=test_impact,
+        project_dir=project_dir,
+        test_oracle=test_oracle,
+    )
+
+
+def main(args: list[str]) -> list[Requirement]:
+    options = parse_args(args[1:])
+    shared_options = build_shared_probe_options(options)
+    cache, env_pool, nogoods = shared_options.cache, shared_options.env_pool, shared_options.nogoods
+    if options.worker:
+        # every probe runs in its own workspace, so several local workers can share a checkout
+        pool = ProbePool(
+            1,
+            options.workspace_dir,
+            keep_workspaces=options.keep_workspaces,
+            create_virtualenvs=env_pool is None,
+        )
+        try:
+            print(f"Worker ran {serve_queue(options.queue_dir, shared_options, pool)} probes")
+        finally:
+            pool.shutdown()
+            if env_pool is not None:
+                print(env_pool.summary())
+            if cache is not None:
+                print(cache.stats())
+        return []
+    saved_requirements_txt = f"{options.journal}.requirements.txt"
+    requirements_txt_original = keep_original_requirements_txt(saved_requirements_txt, options.resume)
+    pool = None
+    if not options.queue_dir and (options.jobs > 1 or env_pool is not None):
+        pool = ProbePool(
+            options.jobs,
+            options.workspace_dir,
+            keep_workspaces=options.keep_workspaces,
+            create_virtualenvs=env_pool is None,
+        )
+    tracing.TRACER.enabled = True
+    journal = None
+    try:
         with open("requirements.txt", "r") as f:
-            reqs = RequirementsParser(f).parse()
+            reqs = LockfileParser(f).parse()
 
         with open("requirements.in", "r") as f:
             reqs_in = RequirementsParser(f).parse()
@@ -170,30 +1105,94 @@ def main(args: list[str]) -> None:
             r.name for r in reqs if r.name not in force_versioned_requirements
         }
 
-        primary_dependencies = [r for r in reqs if r.is_primary_dependency]
-        possible_failure_causes = set(unversioned_requirements)
         passes_with_versions = collections.defaultdict(list)
         for r in reqs:
             passes_with_versions[r.name].append(r.specs)
         # fails_when_unversioned = {r.name: False for r in reqs}
 
-        while True:
-            generate_requirements_txt_file(unversioned_requirements, reqs)
-            install_requirements_txt_file()
-            # subprocess.run(["pip", "install", "pip-tools"], check=True)
-            if not run_tests():
-                pass
-
-                # some logic to fiddle with the requirements and try again
-                # for r in possible_failure_causes:
-                # fails_when_unversioned[r] = True
+        wheelhouse = shared_options.wheelhouse
+        if wheelhouse is not None:
+            if not options.offline:
+                prefetch_wheelhouse(wheelhouse, reqs, unversioned_requirements)
+            elif not wheelhouse.exists():
+                raise Exception(f"Wheelhouse {wheelhouse.directory} is empty, cannot run offline")
 
-                # Unpin half the tree?
-                # for idx in range(len(primary_dependencies)//2):
+        run_id = get_run_id()
+        journal = ProbeJournal(options.journal, run_id, resume=options.resume)
+        test_impact = None
+        if options.test_impact:
+            index = TestImpactIndex.load(options.test_impact_index, run_id)
+            if index is None:
+                index = build_test_impact_index(options.test_impact_index, run_id, reqs)
+            test_impact = TestImpactSelector(index, parse_lock_pins(requirements_txt_original))
+        probe_options = build_probe_options(
+            options, reqs, shared=shared_options, journal=journal, test_impact=test_impact
+        )
+        if options.queue_dir:
+            pool = QueueCoordinator(
+                options.queue_dir,
+                options.jobs,
+                {"run_id": run_id, "requirements_txt": requirements_txt_original},
+                on_result=lambda unpinned, result: journal.record(JournalEntry.from_json(result["entry"])),
+            )
+        search_tree = None
+        if options.prune_unchanged:
+            lock_diff = LockDiff(reqs, resolve_pins(unversioned_requirements, reqs, probe_options))
+            print(lock_diff.summary())
+            search_tree = lock_diff.prune()
+            unversioned_requirements &= lock_diff.changed
+        culprits = search(
+            reqs,
+            unversioned_requirements,
+            probe_options,
+            pool=pool,
+            lookahead=options.lookahead,
+            strategy=options.strategy,
+            tree=search_tree,
+        )
+        if culprits:
+            print("Requirements causing test failures:", ", ".join(r.name for r in culprits))
+        if culprits and options.bisect_versions:
+            new_pins = resolve_pins(unversioned_requirements, reqs, probe_options)
+            bisect_pool = pool
+            if options.queue_dir:
+                # workers only take unpinned sets, so version probes run here, still each in its own workspace
+                bisect_pool = ProbePool(
+                    1,
+                    options.workspace_dir,
+                    keep_workspaces=options.keep_workspaces,
+                    create_virtualenvs=env_pool is None,
+                )
+            try:
+                for culprit in culprits:
+                    old_specs = passes_with_versions[culprit.name][0]
+                    new_version = new_pins.get(canonical_name(culprit.name))
+                    if len(old_specs) != 1 or old_specs[0][0] != "==" or new_version is None:
+                        print("Cannot bisect the versions of", culprit.name, "without an old and a new pin")
+                        continue
+                    bisect_versions(culprit, reqs, old_specs[0][1], new_version, probe_options, bisect_pool)
+            finally:
+                if bisect_pool is not pool:
+                    bisect_pool.shutdown()
+        return culprits
 
     finally:
+        if pool is not None:
+            pool.shutdown()
+        if journal is not None:
+            journal.close()
+        if env_pool is not None:
+            print(env_pool.summary())
+        if cache is not None:
+            print(cache.stats())
+        print(tracing.TRACER.summary())
+        if options.trace:
+            tracing.TRACER.write_chrome_trace(options.trace)
+        if nogoods.expansions:
+            print(f"Known version conflicts unpinned up front on {nogoods.expansions} compiles")
         with open("requirements.txt", "w") as f:
             f.write(requirements_txt_original)
+        os.remove(saved_requirements_txt)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import typing as t
+
+REQUIREMENTS_TXT = "requirements.txt"
+REQUIREMENTS_DEV_TXT = "requirements.dev.txt"
+CONFLICTS_JSON = "conflicts.json"
+
+
+class Resolution:
+    def __init__(
+        self,
+        requirements_txt: t.Optional[str] = None,
+        requirements_dev_txt: t.Optional[str] = None,
+        conflicts: t.Optional[set[str]] = None,
+        stderr: str = "",
+    ):
+        self.requirements_txt = requirements_txt
+        self.requirements_dev_txt = requirements_dev_txt
+        self.conflicts = conflicts
+        # only available for fresh resolutions, it is not persisted in the cache
+        self.stderr = stderr
+
+    @property
+    def succeeded(self) -> bool:
+        return self.conflicts is None
+
+    def write_lock_files(self, directory: str = "."):
+        with open(os.path.join(directory, REQUIREMENTS_TXT), "w") as f:
+            f.write(self.requirements_txt)
+        with open(os.path.join(directory, REQUIREMENTS_DEV_TXT), "w") as f:
+            f.write(self.requirements_dev_txt)
+
+
+def _canonical_lines(content: str) -> list[str]:
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+
+class ResolutionCache:
+    # Shared by every probe thread, and by every project in batch mode. Writes and eviction hold a lock, and an
+    # entry that disappears while it is read or scanned, e.g. evicted by another process, counts as missing
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(requirements_test_in: str, requirements_dev_in: str, pip_args: t.Sequence[str] = ()) -> str:
+        # requirements.test.in is generated from sets, so its line order is not stable between runs
+        digest = hashlib.sha256()
+        for line in sorted(set(_canonical_lines(requirements_test_in))):
+            digest.update(line.encode("utf-8"))
+            digest.update(b"\n")
+        digest.update(b"\0")
+        for line in _canonical_lines(requirements_dev_in):
+            digest.update(line.encode("utf-8"))
+            digest.update(b"\n")
+        # resolving against a local wheelhouse can give a different answer to resolving against the index
+        digest.update(b"\0")
+        for arg in pip_args:
+            digest.update(arg.encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    @classmethod
+    def key_for_files(
+        cls, requirements_test_in_path: str, requirements_dev_in_path: str, pip_args: t.Sequence[str] = ()
+    ) -> str:
+        with open(requirements_test_in_path, "r") as f:
+            requirements_test_in = f.read()
+        with open(requirements_dev_in_path, "r") as f:
+            requirements_dev_in = f.read()
+        return cls.key_for(requirements_test_in, requirements_dev_in, pip_args)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> t.Optional[Resolution]:
+        entry_path = self._entry_path(key)
+        try:
+            resolution = self._read_entry(entry_path)
+            # the entry directory mtime doubles as the last-used time for LRU eviction
+            os.utime(entry_path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return resolution
+
+    def _read_entry(self, entry_path: str) -> Resolution:
+        conflicts_path = os.path.join(entry_path, CONFLICTS_JSON)
+        if os.path.exists(conflicts_path):
+            with open(conflicts_path, "r") as f:
+                conflicts = set(json.load(f))
+            if not conflicts:
+                # written by earlier versions for errors that were not conflicts
+                raise FileNotFoundError(conflicts_path)
+            return Resolution(conflicts=conflicts)
+        with open(os.path.join(entry_path, REQUIREMENTS_TXT), "r") as f:
+            requirements_txt = f.read()
+        with open(os.path.join(entry_path, REQUIREMENTS_DEV_TXT), "r") as f:
+            requirements_dev_txt = f.read()
+        return Resolution(requirements_txt, requirements_dev_txt)
+
+    def put(self, key: str, resolution: Resolution):
+        if not resolution.succeeded and not resolution.conflicts:
+            # a failure without a conflict says nothing about the inputs, and can't be retried around
+            return
+        staging_path = tempfile.mkdtemp(dir=self.directory, prefix=".staging-")
+        try:
+            if resolution.succeeded:
+                resolution.write_lock_files(staging_path)
+            else:
+                with open(os.path.join(staging_path, CONFLICTS_JSON), "w") as f:
+                    json.dump(sorted(resolution.conflicts), f)
+            entry_path = self._entry_path(key)
+            with self._lock:
+                shutil.rmtree(entry_path, ignore_errors=True)
+                os.replace(staging_path, entry_path)
+                self._evict()
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            entry_path = self._entry_path(name)
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_path) if entry.is_file())
+                entries.append((os.stat(entry_path).st_mtime, size, entry_path))
+            except FileNotFoundError:
+                # evicted or replaced since it was listed
+                continue
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if total_size <= self.max_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+    def stats(self) -> str:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        hit_rate = (hits / lookups * 100) if lookups else 0.0
+        return f"Resolution cache: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate)"
@@ -0,0 +1,174 @@
+import os
+import threading
+import typing as t
+
+from env_pool import canonical_name
+from resolution_cache import REQUIREMENTS_DEV_TXT, REQUIREMENTS_TXT, Resolution
+
+LOCK_FILE_HEADER = """#
+# This file is autogenerated by requirements-tester's in-process pip-compile
+#
+"""
+
+
+class Conflict(t.NamedTuple):
+    requirement: str
+    specifier: str
+    required_by: t.Optional[str]
+
+
+def conflicts_from_causes(causes: t.Iterable) -> list[Conflict]:
+    # causes are resolvelib RequirementInformation pairs, the parent is None for top level requirements
+    conflicts = []
+    for cause in causes:
+        requirement, parent = cause
+        specifier = str(getattr(requirement, "specifier", "") or "")
+        conflicts.append(Conflict(requirement.name, specifier, parent.name if parent is not None else None))
+    return conflicts
+
+
+def conflicting_names(conflicts: t.Iterable[Conflict]) -> set[str]:
+    # the same names the pip-compile stderr scraping finds: what could not be matched, and what asked for it
+    names = set()
+    for conflict in conflicts:
+        print(
+            "Version conflict issue for requirement",
+            conflict.requirement + conflict.specifier,
+            f"(required by {conflict.required_by})" if conflict.required_by else "",
+        )
+        names.add(conflict.requirement)
+        if conflict.required_by:
+            names.add(conflict.required_by)
+    return names
+
+
+class ResolutionConflict(Exception):
+    def __init__(self, message: str, conflicts: list[Conflict]):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
+class InProcessResolver:
+    # Runs pip-tools' resolver inside this process. The package repository (with its HTTP session and link
+    # cache) and the dependency cache outlive a single compile, so later probes only fetch metadata for
+    # versions that no earlier probe has seen. pip is not thread safe, so compiles are serialised
+    def __init__(self, cache_dir: str):
+        # fails with ImportError when pip-tools is not installed in this interpreter, or is older than 6.8
+        from piptools.cache import DependencyCache
+        from piptools.resolver import BacktrackingResolver  # noqa: F401
+
+        self.cache_dir = os.path.abspath(cache_dir)
+        self._dependency_cache = DependencyCache(self.cache_dir)
+        self._repositories: dict[tuple[str, ...], t.Any] = {}
+        self._lock = threading.Lock()
+
+    def _repository(self, pip_args: t.Sequence[str]):
+        from piptools.repositories import PyPIRepository
+
+        key = tuple(pip_args)
+        if key not in self._repositories:
+            self._repositories[key] = PyPIRepository(list(pip_args), cache_dir=self.cache_dir)
+        return self._repositories[key]
+
+    def _resolve(
+        self,
+        in_file: str,
+        out_file: str,
+        pip_args: t.Sequence[str],
+        upgrade_packages: t.Optional[t.Collection[str]] = None,
+    ):
+        from pip._internal.exceptions import DistributionNotFound
+        from piptools._compat import parse_requirements
+        from piptools.resolver import BacktrackingResolver
+        from piptools.utils import format_requirement, is_pinned_requirement, key_from_ireq
+
+        repository = self._repository(pip_args)
+        constraints = list(
+            parse_requirements(
+                in_file, finder=repository.finder, session=repository.session, options=repository.options
+            )
+        )
+        existing_constraints = {}
+        if upgrade_packages is not None and os.path.exists(out_file):
+            # the same as pip-compile with --upgrade-package: prefer the existing pins of everything else
+            upgrade = {canonical_name(name) for name in upgrade_packages}
+            for ireq in parse_requirements(
+                out_file, finder=repository.finder, session=repository.session, options=repository.options
+            ):
+                if is_pinned_requirement(ireq) and canonical_name(key_from_ireq(ireq)) not in upgrade:
+                    existing_constraints[key_from_ireq(ireq)] = ireq
+        resolver = BacktrackingResolver(
+            constraints,
+            existing_constraints=existing_constraints,
+            repository=repository,
+            cache=self._dependency_cache,
+            prereleases=False,
+            clear_caches=False,
+            allow_unsafe=False,
+        )
+        try:
+            results = resolver.resolve()
+        except DistributionNotFound as e:
+            # pip raises this from resolvelib's ResolutionImpossible, which carries the conflicting pairs
+            causes = getattr(e.__cause__, "causes", None)
+            if causes is None:
+                raise
+            raise ResolutionConflict(str(e), conflicts_from_causes(causes)) from e
+
+        top_level = {key_from_ireq(ireq) for ireq in constraints if ireq.name}
+        lines = [LOCK_FILE_HEADER]
+        for ireq in sorted(results, key=key_from_ireq):
+            lines.append(format_requirement(ireq) + "\n")
+            via = sorted(getattr(ireq, "_required_by", ()))
+            if key_from_ireq(ireq) in top_level:
+                via.insert(0, f"-r {os.path.basename(in_file)}")
+            if len(via) == 1:
+                lines.append(f"    # via {via[0]}\n")
+            elif via:
+                lines.append("    # via\n")
+                lines.extend(f"    #   {name}\n" for name in via)
+        with open(out_file, "w") as f:
+            f.writelines(lines)
+
+    def compile(
+        self,
+        directory: str = ".",
+        pip_args: t.Sequence[str] = (),
+        upgrade_packages: t.Optional[t.Collection[str]] = None,
+    ) -> Resolution:
+        directory = os.path.abspath(directory)
+        with self._lock:
+            try:
+                self._resolve(
+                    os.path.join(directory, "requirements.test.in"),
+                    os.path.join(directory, REQUIREMENTS_TXT),
+                    pip_args,
+                    upgrade_packages,
+                )
+                self._resolve(
+                    os.path.join(directory, "requirements.dev.in"),
+                    os.path.join(directory, REQUIREMENTS_DEV_TXT),
+                    pip_args,
+                    upgrade_packages,
+                )
+            except ResolutionConflict as e:
+                return Resolution(conflicts=conflicting_names(e.conflicts), stderr=str(e))
+
+        with open(os.path.join(directory, REQUIREMENTS_TXT), "r") as f:
+            requirements_txt = f.read()
+        with open(os.path.join(directory, REQUIREMENTS_DEV_TXT), "r") as f:
+            requirements_dev_txt = f.read()
+        return Resolution(requirements_txt, requirements_dev_txt)
+
+
+def create_resolver(backend: str, cache_dir: str) -> t.Optional[InProcessResolver]:
+    # None means compiling with pip-compile subprocesses
+    if backend == "subprocess":
+        return None
+    try:
+        return InProcessResolver(cache_dir)
+    except ImportError:
+        if backend == "in-process":
+            raise
+        print("pip-tools 6.8 or later is not importable, resolving with pip-compile subprocesses")
+        return None
@@ -12,8 +12,27 @@ class BinarySearcher:
         self._initial_tree = initial_tree
         self._traversal = [[initial_tree]]
         self._initial_split_children = initial_split_children
+        # set when a culprit has just been reported, so the next passed() only moves on from it
+        self._reported = False
+
+    def copy(self) -> "BinarySearcher":
+        # subsets are never mutated in place, so copying each traversal level is enough
+        clone = BinarySearcher(self._initial_tree, self._initial_split_children)
+        clone._traversal = [list(level) for level in self._traversal]
+        clone._reported = self._reported
+        return clone
 
     def passed(self):
+        reported, self._reported = self._reported, False
+        # A level holding only the full list of a failing requirement's children means that list was just probed
+        # on its own. If it passes, the requirement itself caused the failure, not anything below it
+        if not reported and len(self._traversal) > 1 and len(self._traversal[-1]) == 1:
+            self._traversal.pop()
+            self._reported = True
+            raise EndNodeReached(self._traversal[-1][-1][0])
+        return self._move_on()
+
+    def _move_on(self):
         # if there is no parent list, we're done
         if not len(self._traversal) > 0:
             return None
@@ -21,7 +40,7 @@ class BinarySearcher:
             # if the parent list is only one item, skip past it as it has already been traversed downward
         if not len(self._traversal[-1]) > 1:
             self._traversal.pop()
-            return self.passed()
+            return self._move_on()
 
         # if this is the first half, go to the second half
         if self._traversal[-1][-2][0] == self._traversal[-1][-1][0]:
@@ -36,7 +55,7 @@ class BinarySearcher:
 
         # go up a level in the current subset and try again
         self._traversal[-1].pop()
-        return self.passed()
+        return self._move_on()
 
     def failed(self):
         # if there is more than a single item, then bisect it
@@ -54,4 +73,153 @@ class BinarySearcher:
                 #  so each should be independently represented when traversing the tree
                 self._traversal.append([children])
             return self._traversal[-1][-1]
+        self._reported = True
         raise EndNodeReached(self._traversal[-1][-1][0])
+
+
+class SpeculativeSearcher:
+    def __init__(self, initial_tree, initial_split_children=False, lookahead=1):
+        self._searcher = BinarySearcher(initial_tree, initial_split_children)
+        self._lookahead = lookahead
+        self._results: dict[tuple[int, ...], bool] = {}
+        self.culprits: list = []
+        self.discarded = 0
+        # the search only starts once the whole tree is known to fail
+        self.current = self._searcher.failed()
+
+    @property
+    def finished(self) -> bool:
+        return self.current is None
+
+    @staticmethod
+    def _key(subset) -> tuple[int, ...]:
+        return tuple(id(item) for item in subset)
+
+    @staticmethod
+    def _step(searcher: BinarySearcher, passed: bool):
+        try:
+            return searcher.passed() if passed else searcher.failed(), None
+        except EndNodeReached as e:
+            return searcher.passed(), e.requirement
+
+    def _reachable(self) -> list[tuple[list, t.Optional[bool]]]:
+        # breadth first, so subsets closest to the current one come first
+        reachable = []
+        frontier = [(self._searcher, self.current)]
+        for _ in range(self._lookahead + 1):
+            next_frontier = []
+            for searcher, subset in frontier:
+                if subset is None:
+                    continue
+                known = self._results.get(self._key(subset))
+                reachable.append((subset, known))
+                for passed in (True, False) if known is None else (known,):
+                    clone = searcher.copy()
+                    next_subset, _ = self._step(clone, passed)
+                    next_frontier.append((clone, next_subset))
+            frontier = next_frontier
+        return reachable
+
+    def candidates(self) -> list[list]:
+        candidates = []
+        seen = set()
+        for subset, known in self._reachable():
+            key = self._key(subset)
+            if known is None and key not in seen:
+                seen.add(key)
+                candidates.append(subset)
+        return candidates
+
+    def record(self, subset, passed: bool):
+        self._results[self._key(subset)] = passed
+
+    def advance(self) -> list:
+        found = []
+        while self.current is not None and self._key(self.current) in self._results:
+            passed = self._results.pop(self._key(self.current))
+            self.current, culprit = self._step(self._searcher, passed)
+            if culprit is not None:
+                self.culprits.append(culprit)
+                found.append(culprit)
+
+        # forget results for branches the search did not take
+        relevant = {self._key(subset) for subset, _ in self._reachable()}
+        for key in [k for k in self._results if k not in relevant]:
+            del self._results[key]
+            self.discarded += 1
+        return found
+
+
+def _split(items: list, parts: int) -> list[list]:
+    chunks = []
+    start = 0
+    for idx in range(parts):
+        end = start + (len(items) - start) // (parts - idx)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+class DeltaDebugger:
+    # Zeller's ddmin over a flat list. failed() means the probed subset reproduces the failure, and the
+    # first failed() call stands for the whole list failing, as with BinarySearcher
+    def __init__(self, items):
+        self._items = list(items)
+        self._outcomes: dict[frozenset[int], bool] = {}
+        self._steps: t.Optional[t.Generator] = None
+        self._current = None
+        self.probe_count = 0
+        self.result: t.Optional[list] = None
+
+    def _ddmin(self) -> t.Generator[list, bool, None]:
+        failing = self._items
+        granularity = 2
+        while len(failing) >= 2:
+            chunks = _split(failing, granularity)
+            reduced = False
+            for chunk in chunks:
+                if not (yield chunk):
+                    failing, granularity, reduced = chunk, 2, True
+                    break
+            # with two chunks the complements are the chunks themselves
+            if not reduced and granularity > 2:
+                for idx in range(len(chunks)):
+                    complement = [item for chunk in chunks[:idx] + chunks[idx + 1 :] for item in chunk]
+                    if not (yield complement):
+                        failing, granularity, reduced = complement, max(granularity - 1, 2), True
+                        break
+            if not reduced:
+                if granularity >= len(failing):
+                    break
+                granularity = min(granularity * 2, len(failing))
+        self.result = failing
+
+    def _key(self, subset) -> frozenset[int]:
+        return frozenset(id(item) for item in subset)
+
+    def _advance(self, passed: t.Optional[bool]):
+        try:
+            subset = next(self._steps) if passed is None else self._steps.send(passed)
+            # a subset that has already been probed is answered without asking for it again
+            while self._key(subset) in self._outcomes:
+                subset = self._steps.send(self._outcomes[self._key(subset)])
+        except StopIteration:
+            self._current = None
+            return None
+        self._current = subset
+        self.probe_count += 1
+        return subset
+
+    def _record(self, passed: bool):
+        self._outcomes[self._key(self._current)] = passed
+        return self._advance(passed)
+
+    def passed(self):
+        return self._record(True)
+
+    def failed(self):
+        if self._steps is None:
+            self._steps = self._ddmin()
+            self._outcomes[self._key(self._items)] = False
+            return self._advance(None)
+        return self._record(False)
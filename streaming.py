@@ -0,0 +1,136 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import typing as t
+
+# called with each line of output, returns True once the result of the process is known
+LineCallback = t.Callable[[str], bool]
+
+READ_SIZE = 64 * 1024
+
+
+class StreamResult:
+    def __init__(self, returncode: t.Optional[int], stdout: str, stderr: str, aborted: bool, timed_out: bool):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.aborted = aborted
+        self.timed_out = timed_out
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0 and not self.aborted and not self.timed_out
+
+    @property
+    def outcome(self) -> str:
+        if self.timed_out:
+            return "timed out"
+        if self.aborted:
+            return "aborted"
+        return "succeeded" if self.returncode == 0 else "failed"
+
+    def check(self, args: t.Sequence[str]):
+        # the same contract as subprocess.run(check=True), plus timeouts
+        if self.timed_out:
+            raise subprocess.TimeoutExpired(list(args), 0, self.stdout, self.stderr)
+        if self.returncode != 0:
+            raise subprocess.CalledProcessError(self.returncode or 1, list(args), self.stdout, self.stderr)
+
+
+async def _pump(
+    stream: asyncio.StreamReader, lines: list[str], on_line: t.Optional[LineCallback], echo: t.Optional[t.TextIO]
+) -> bool:
+    # read in chunks and split here, as readline() fails on lines longer than the stream's 64 KiB limit, e.g. a
+    # pytest failure printing a large value
+    pending = b""
+    while True:
+        chunk = await stream.read(READ_SIZE)
+        if chunk:
+            *complete, pending = (pending + chunk).split(b"\n")
+            raw_lines = [raw + b"\n" for raw in complete]
+        else:
+            # the last line may not end in a newline
+            raw_lines = [pending] if pending else []
+        for raw in raw_lines:
+            line = raw.decode("utf-8", errors="replace")
+            lines.append(line)
+            if echo is not None:
+                echo.write(line)
+            if on_line is not None and on_line(line.rstrip("\n")):
+                return True
+        if not chunk:
+            return False
+
+
+async def _kill(process: asyncio.subprocess.Process):
+    # the process group goes too, so that pytest-xdist workers or pip's build backends don't linger
+    if process.returncode is None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+    await process.wait()
+
+
+async def stream_process(
+    args: t.Sequence[str],
+    cwd: t.Optional[str] = None,
+    env: t.Optional[t.Mapping[str, str]] = None,
+    on_stdout: t.Optional[LineCallback] = None,
+    on_stderr: t.Optional[LineCallback] = None,
+    timeout: t.Optional[float] = None,
+    echo: bool = False,
+) -> StreamResult:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        env=dict(env) if env is not None else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    stdout: list[str] = []
+    stderr: list[str] = []
+    pumps = [
+        asyncio.ensure_future(_pump(process.stdout, stdout, on_stdout, sys.stdout if echo else None)),
+        asyncio.ensure_future(_pump(process.stderr, stderr, on_stderr, sys.stdout if echo else None)),
+    ]
+    aborted = timed_out = False
+    try:
+        pending = set(pumps)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        while pending:
+            remaining = deadline - loop.time() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if any(task.result() for task in done):
+                aborted = True
+                break
+    finally:
+        if aborted or timed_out:
+            await _kill(process)
+        for task in pumps:
+            task.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+    returncode = await process.wait()
+    return StreamResult(
+        None if aborted or timed_out else returncode, "".join(stdout), "".join(stderr), aborted, timed_out
+    )
+
+
+def run_streaming(
+    args: t.Sequence[str],
+    cwd: t.Optional[str] = None,
+    env: t.Optional[t.Mapping[str, str]] = None,
+    on_stdout: t.Optional[LineCallback] = None,
+    on_stderr: t.Optional[LineCallback] = None,
+    timeout: t.Optional[float] = None,
+    echo: bool = False,
+) -> StreamResult:
+    # each probe thread gets its own event loop
+    return asyncio.run(stream_process(args, cwd, env, on_stdout, on_stderr, timeout, echo))
@@ -0,0 +1,58 @@
+import shutil
+
+import pytest
+
+import batch
+import requirements_tester
+from reqparser import Interner
+from workspace import ProbePool
+
+
+@pytest.fixture
+def projects(tmp_path):
+    directories = []
+    for name in ("service-a", "service-b"):
+        directory = tmp_path / name
+        directory.mkdir()
+        shutil.copy("testfiles/requirements_all.txt", directory / "requirements.txt")
+        (directory / "requirements.in").write_text("django>=3.2\ngraphene-django\n")
+        (directory / "requirements.dev.in").write_text("-r requirements.txt\n\npytest\n")
+        directories.append(str(directory))
+    return directories
+
+
+def test_projects_share_interned_values(projects):
+    interner = Interner()
+    first, second = (batch.Project(directory, interner) for directory in projects)
+    assert "django" not in first.unversioned_requirements
+    assert all(
+        a.name is b.name and a.line is b.line and a.specs[0] is b.specs[0] for a, b in zip(first.reqs, second.reqs)
+    )
+    # the trees themselves stay separate
+    assert all(a is not b for a, b in zip(first.reqs, second.reqs))
+
+
+def test_searches_share_a_pool(projects, monkeypatch, tmp_path):
+    culprits = {projects[0]: "pytz", projects[1]: "sqlparse"}
+    probed_in = set()
+
+    def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+        probed_in.add(workspace.project_dir)
+        return culprits[options.project_dir] not in unversioned_requirements
+
+    monkeypatch.setattr(requirements_tester, "run_probe", run_probe)
+    pool = ProbePool(2, str(tmp_path / "workspaces"), create_virtualenvs=False)
+    try:
+        results = batch.search_projects(
+            [batch.Project(directory) for directory in projects],
+            pool,
+            lambda project: requirements_tester.ProbeOptions(project_dir=project.directory),
+            parallel_projects=2,
+        )
+    finally:
+        pool.shutdown()
+    assert {directory: [r.name for r in found] for directory, found in results.items()} == {
+        projects[0]: ["pytz"],
+        projects[1]: ["sqlparse"],
+    }
+    assert probed_in == set(projects)
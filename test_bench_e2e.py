@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+import bench_e2e
+from reqparser import LockfileParser
+
+DEPENDENCIES = [[1, 2], [2], []]
+
+
+def pip_install(wheelhouse, target, *args):
+    command = [sys.executable, "-m", "pip", "install", "--quiet", "--no-index", "--find-links", wheelhouse]
+    subprocess.run([*command, "--target", target, *args], check=True)
+
+
+def installed_value(target, idx):
+    with open(target / bench_e2e.module_name(idx) / "__init__.py", "r") as f:
+        return f.read()
+
+
+def test_generated_project_installs_from_generated_index(tmp_path):
+    wheelhouse, project = str(tmp_path / "wheelhouse"), tmp_path / "project"
+    bench_e2e.build_index(wheelhouse, DEPENDENCIES, culprit=2)
+    bench_e2e.build_project(str(project), DEPENDENCIES)
+
+    assert (project / "requirements.in").read_text() == "benchpkg-000\n"
+    with open(project / "requirements.txt", "r") as f:
+        reqs = {r.name: r for r in LockfileParser(f).parse()}
+    assert [d.name for d in reqs["benchpkg-002"].requirement_for] == ["benchpkg-000", "benchpkg-001"]
+
+    pinned = tmp_path / "pinned"
+    pip_install(wheelhouse, str(pinned), "-r", str(project / "requirements.txt"))
+    assert all(installed_value(pinned, idx) == "VALUE = 'ok'\n" for idx in range(len(DEPENDENCIES)))
+
+    # unpinned, pip picks the newest version of everything, including the planted breaking one
+    unpinned = tmp_path / "unpinned"
+    pip_install(wheelhouse, str(unpinned), "-r", str(project / "requirements.in"))
+    assert installed_value(unpinned, 1) == "VALUE = 'ok'\n"
+    assert installed_value(unpinned, 2) == "VALUE = 'broken'\n"
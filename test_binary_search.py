@@ -1,4 +1,4 @@
-from searcher import BinarySearcher, EndNodeReached
+from searcher import BinarySearcher, EndNodeReached, SpeculativeSearcher
 import pytest
 
 import typing as t
@@ -206,3 +206,94 @@ class TestBinarySearcher:
             subset = binary_searcher.failed()
         excinfo.value.requirement.name = "A.D.A.B"
         subset = binary_searcher.passed()
+
+    def test_parent_whose_children_pass_is_reported(self):
+        things_to_be_searched = [ThingToBeSearched("A", [ThingToBeSearched("A.A"), ThingToBeSearched("A.B")])]
+
+        binary_searcher = BinarySearcher(things_to_be_searched)
+        subset = binary_searcher.failed()
+        assert [r.name for r in subset] == ["A.A", "A.B"]
+        with pytest.raises(EndNodeReached) as excinfo:
+            binary_searcher.passed()
+        assert excinfo.value.requirement.name == "A"
+        assert binary_searcher.passed() is None
+
+    def test_copy_is_independent(self):
+        things_to_be_searched = [ThingToBeSearched("A"), ThingToBeSearched("B"), ThingToBeSearched("C")]
+
+        binary_searcher = BinarySearcher(things_to_be_searched)
+        subset = binary_searcher.failed()
+        assert [r.name for r in subset] == ["A"]
+        clone = binary_searcher.copy()
+        subset = clone.passed()
+        assert [r.name for r in subset] == ["B", "C"]
+        with pytest.raises(EndNodeReached) as excinfo:
+            binary_searcher.failed()
+        assert excinfo.value.requirement.name == "A"
+        subset = clone.failed()
+        assert [r.name for r in subset] == ["B"]
+
+
+class TestSpeculativeSearcher:
+    def test_candidates_include_both_outcomes(self):
+        things_to_be_searched = [ThingToBeSearched("A"), ThingToBeSearched("B"), ThingToBeSearched("C")]
+
+        searcher = SpeculativeSearcher(things_to_be_searched)
+        assert [r.name for r in searcher.current] == ["A"]
+        assert [[r.name for r in subset] for subset in searcher.candidates()] == [["A"], ["B", "C"]]
+
+    def test_lookahead_includes_children(self):
+        things_to_be_searched = [
+            ThingToBeSearched("A", [ThingToBeSearched("A.A"), ThingToBeSearched("A.B")]),
+            ThingToBeSearched("B"),
+        ]
+
+        searcher = SpeculativeSearcher(things_to_be_searched)
+        assert [[r.name for r in subset] for subset in searcher.candidates()] == [
+            ["A"],
+            ["B"],
+            ["A.A", "A.B"],
+        ]
+
+        searcher = SpeculativeSearcher(things_to_be_searched, lookahead=2)
+        assert [[r.name for r in subset] for subset in searcher.candidates()] == [
+            ["A"],
+            ["B"],
+            ["A.A", "A.B"],
+            ["A.A"],
+        ]
+
+    def test_results_out_of_order(self):
+        a, b, c = ThingToBeSearched("A"), ThingToBeSearched("B"), ThingToBeSearched("C")
+
+        searcher = SpeculativeSearcher([a, b, c])
+        second_half = searcher.candidates()[1]
+        searcher.record(second_half, False)
+        assert searcher.advance() == []
+        assert [r.name for r in searcher.current] == ["A"]
+
+        searcher.record(searcher.current, True)
+        searcher.advance()
+        assert [r.name for r in searcher.current] == ["B"]
+        searcher.record(searcher.current, False)
+        assert [r.name for r in searcher.advance()] == ["B"]
+        assert [r.name for r in searcher.current] == ["C"]
+        searcher.record(searcher.current, True)
+        searcher.advance()
+        assert searcher.finished
+        assert [r.name for r in searcher.culprits] == ["B"]
+
+    def test_discards_irrelevant_branches(self):
+        things_to_be_searched = [
+            ThingToBeSearched("A", [ThingToBeSearched("A.A"), ThingToBeSearched("A.B")]),
+            ThingToBeSearched("B"),
+        ]
+
+        searcher = SpeculativeSearcher(things_to_be_searched)
+        children = searcher.candidates()[2]
+        assert [r.name for r in children] == ["A.A", "A.B"]
+        searcher.record(children, True)
+        searcher.record(searcher.current, True)
+        assert searcher.advance() == []
+        assert [r.name for r in searcher.current] == ["B"]
+        assert searcher.discarded == 1
@@ -0,0 +1,46 @@
+import pytest
+
+from searcher import DeltaDebugger
+
+
+def run(items, fails):
+    debugger = DeltaDebugger(items)
+    subset = debugger.failed()
+    while subset is not None:
+        subset = debugger.failed() if fails(set(subset)) else debugger.passed()
+    return debugger
+
+
+class TestDeltaDebugger:
+    def test_single_culprit(self):
+        debugger = run(list("ABCDEFGH"), lambda s: "F" in s)
+        assert debugger.result == ["F"]
+        assert debugger.probe_count == 5
+
+    def test_interacting_pair(self):
+        debugger = run(list("ABCDEFGH"), lambda s: {"B", "G"} <= s)
+        assert sorted(debugger.result) == ["B", "G"]
+
+    def test_interacting_triple_is_one_minimal(self):
+        culprits = {"A", "D", "H"}
+        debugger = run(list("ABCDEFGHIJ"), lambda s: culprits <= s)
+        assert set(debugger.result) == culprits
+        for item in debugger.result:
+            assert not culprits <= set(debugger.result) - {item}
+
+    def test_single_item(self):
+        debugger = run(["A"], lambda s: True)
+        assert debugger.result == ["A"]
+        assert debugger.probe_count == 0
+
+    @pytest.mark.parametrize("size", [2, 3, 7, 16])
+    def test_never_probes_the_same_subset_twice(self, size):
+        probed = []
+
+        def fails(subset):
+            probed.append(frozenset(subset))
+            return {0, size - 1} <= subset
+
+        debugger = run(list(range(size)), fails)
+        assert sorted(debugger.result) == sorted({0, size - 1})
+        assert len(probed) == len(set(probed)) == debugger.probe_count
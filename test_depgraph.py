@@ -0,0 +1,64 @@
+import pathlib
+
+import pytest
+
+from depgraph import DependencyGraph
+from reqparser import LockfileParser
+
+
+@pytest.fixture
+def graph():
+    with open(pathlib.Path("./testfiles") / "requirements_all.txt", "r") as f:
+        return DependencyGraph(LockfileParser(f).parse())
+
+
+class TestDependencyGraph:
+    def test_adjacency(self, graph):
+        assert graph.dependencies("graphql-relay") == ["graphql-core", "promise", "six"]
+        assert graph.dependents("django") == ["django-filter", "django-health-check", "graphene-django"]
+        assert graph.dependencies("six") == []
+
+    def test_closures(self, graph):
+        assert graph.all_dependencies("django-filter") == {"django", "asgiref", "pytz", "sqlparse"}
+        assert graph.all_dependents("rx") == {"graphql-core", "graphene", "graphene-django", "graphql-relay"}
+        assert graph.all_dependents("django-filter") == set()
+        assert graph.subtree_size("django") == 4
+        assert graph.subtree_size("six") == 1
+
+    def test_subtree_mask(self, graph):
+        names = graph.names_for(graph.subtree_mask(["django-filter", "graphql-relay"]))
+        assert names == {
+            "django-filter",
+            "django",
+            "asgiref",
+            "pytz",
+            "sqlparse",
+            "graphql-relay",
+            "graphql-core",
+            "promise",
+            "rx",
+            "six",
+        }
+
+    def test_topological_order_puts_dependencies_first(self, graph):
+        order = graph.topological_order()
+        assert sorted(order) == sorted(graph.names)
+        for name in graph.names:
+            for dependency in graph.dependencies(name):
+                assert order.index(dependency) < order.index(name)
+
+    def test_cycles(self):
+        lines = [
+            "a==1\n",
+            "    # via c\n",
+            "b==1\n",
+            "    # via a\n",
+            "c==1\n",
+            "    # via\n",
+            "    #   b\n",
+            "    #   -r x.in\n",
+        ]
+        graph = DependencyGraph(LockfileParser(lines).parse())
+        assert graph.all_dependencies("c") == {"a", "b", "c"}
+        assert graph.all_dependents("a") == {"a", "b", "c"}
+        assert len(graph.topological_order()) == 3
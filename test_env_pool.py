@@ -0,0 +1,97 @@
+import pathlib
+import subprocess
+import threading
+import time
+
+from env_pool import MAX_PASSED_OVER, EnvironmentPool, PooledEnvironment, _Waiter, parse_lock_pins, pin_distance
+
+
+def test_parse_lock_pins():
+    with open(pathlib.Path("./testfiles") / "requirements_all.txt", "r") as f:
+        pins = parse_lock_pins(f.read())
+
+    assert len(pins) == 16
+    assert pins["django"] == "3.2.6"
+    assert pins["django-filter"] == "2.3.0"
+
+
+def test_parse_lock_pins_canonicalises_names():
+    pins = parse_lock_pins("Django_Filter==2.3.0 \\\n    --hash=sha256:abc\nzope.interface[test]==5.4.0\n")
+    assert pins == {"django-filter": "2.3.0", "zope-interface": "5.4.0"}
+
+
+def test_pin_distance():
+    assert pin_distance({"django": "3.2.6", "pytz": "2021.1"}, {"django": "3.2.6", "pytz": "2021.1"}) == 0
+    assert pin_distance({"django": "3.2.6", "pytz": "2021.1"}, {"django": "4.0.0", "pytz": "2021.1"}) == 1
+    assert pin_distance({}, {"django": "3.2.6"}) == 1
+
+
+class TestEnvironmentPool:
+    def test_checks_out_closest_environment(self, tmp_path):
+        pool = EnvironmentPool(str(tmp_path), 3)
+        pool._loaded = True
+        pool.environments[0].installed = {}
+        pool.environments[1].installed = {"django": "3.2.6", "pytz": "2021.1"}
+        pool.environments[2].installed = {"django": "4.0.0", "pytz": "2021.1"}
+
+        with pool.checkout({"django": "4.0.0", "pytz": "2021.3"}) as environment:
+            assert environment is pool.environments[2]
+            with pool.checkout({"django": "4.0.0", "pytz": "2021.3"}) as second_environment:
+                assert second_environment is pool.environments[0]
+        assert len(pool._free) == 3
+
+    def test_freed_environment_goes_to_closest_waiting_probe(self, tmp_path):
+        pool = EnvironmentPool(str(tmp_path), 1)
+        pool._loaded = True
+        pool.environments[0].installed = {"django": "3.2.6", "pytz": "2021.1"}
+        far = {"django": "4.0.0", "pytz": "2021.3"}
+        near = {"django": "3.2.6", "pytz": "2021.3"}
+        assigned = []
+
+        def probe(target):
+            with pool.checkout(target) as environment:
+                assigned.append(target)
+                environment.installed = target
+
+        with pool.checkout({"django": "3.2.6", "pytz": "2021.1"}):
+            threads = [threading.Thread(target=probe, args=(target,)) for target in (far, near)]
+            for thread in threads:
+                thread.start()
+                while len(pool._waiting) < threads.index(thread) + 1:
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join()
+        assert assigned == [near, far]
+
+    def test_passed_over_probe_goes_next(self, tmp_path):
+        pool = EnvironmentPool(str(tmp_path), 1)
+        pool._loaded = True
+        pool.environments[0].installed = {}
+        starved = _Waiter({"django": "4.0.0"})
+        starved.passed_over = MAX_PASSED_OVER
+        pool._waiting = [_Waiter({}), starved]
+        pool._assign()
+        assert starved.environment is pool.environments[0]
+
+
+def test_sync_counts_reinstalls(tmp_path, monkeypatch):
+    (tmp_path / "env").mkdir()
+    environment = PooledEnvironment(str(tmp_path / "env"))
+    environment.installed = {"django": "3.2.6", "pytz": "2021.1"}
+    monkeypatch.setattr(subprocess, "run", lambda *args, **kwargs: None)
+
+    assert environment.sync({"django": "4.0.0", "pytz": "2021.1"}).reinstalled == 0
+    stats = environment.sync({"django": "3.2.6"})
+    assert (stats.installed, stats.removed, stats.reinstalled) == (1, 1, 1)
+    assert environment.sync({"django": "3.2.6", "pytz": "2021.1"}).reinstalled == 1
+
+
+def test_sync_gives_each_pip_call_what_is_left_of_the_timeout(tmp_path, monkeypatch):
+    (tmp_path / "env").mkdir()
+    environment = PooledEnvironment(str(tmp_path / "env"))
+    environment.installed = {"pytz": "2021.1"}
+    timeouts = []
+    monkeypatch.setattr(subprocess, "run", lambda *args, **kwargs: timeouts.append(kwargs["timeout"]))
+
+    environment.sync({"django": "4.0.0"}, timeout=60)
+    assert len(timeouts) == 2 and all(0 < timeout <= 60 for timeout in timeouts)
@@ -0,0 +1,79 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import requirements_tester
+from impact import TestImpactIndex, TestImpactSelector, changed_pins
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestTestImpactIndex:
+    def test_modules_for(self):
+        index = TestImpactIndex({"tests/test_a.py": ["Django", "pytz"], "tests/test_b.py": ["graphql_core"]})
+        assert index.modules_for({"graphql-core"}) == ["tests/test_b.py"]
+        assert index.modules_for({"pytz", "graphql-core"}) == ["tests/test_a.py", "tests/test_b.py"]
+        assert index.modules_for({"six"}) == []
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / "index.json")
+        TestImpactIndex({"tests/test_a.py": ["django"]}).save(path, "run-1")
+        assert TestImpactIndex.load(path, "run-1").modules_for({"django"}) == ["tests/test_a.py"]
+        assert TestImpactIndex.load(path, "run-2") is None
+        assert TestImpactIndex.load(str(tmp_path / "missing.json"), "run-1") is None
+
+
+class TestTestImpactSelector:
+    def test_changed_pins(self):
+        assert changed_pins({"a": "1", "b": "1", "c": "1"}, {"a": "1", "b": "2", "d": "1"}) == {"b", "c", "d"}
+
+    def test_selects_against_last_good_lock(self):
+        index = TestImpactIndex({"test_a.py": ["django"], "test_b.py": ["pytz"]})
+        selector = TestImpactSelector(index, {"django": "3.2", "pytz": "2021.1"})
+        assert selector.select({"django": "3.2", "pytz": "2021.1"}) == []
+        assert selector.select({"django": "4.0", "pytz": "2021.1"}) == ["test_a.py"]
+        selector.record_good({"django": "4.0", "pytz": "2021.1"})
+        assert selector.select({"django": "4.0", "pytz": "2022.1"}) == ["test_b.py"]
+
+
+class TestImpactPlugin:
+    def test_traces_distributions_per_module(self, tmp_path):
+        (tmp_path / "test_uses_iniconfig.py").write_text(
+            "def test_parse(tmp_path):\n"
+            "    import iniconfig\n"
+            "    (tmp_path / 'a.ini').write_text('[s]\\nk = v\\n')\n"
+            "    assert iniconfig.IniConfig(tmp_path / 'a.ini')['s']['k'] == 'v'\n"
+        )
+        (tmp_path / "test_plain.py").write_text("def test_nothing():\n    assert True\n")
+        index_path = tmp_path / "index.json"
+        env = dict(os.environ, PYTHONPATH=PLUGIN_DIR)
+        subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "-p", "impact_plugin", f"--impact-index={index_path}"],
+            cwd=tmp_path,
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+        index = json.loads(index_path.read_text())
+        assert "iniconfig" in index["test_uses_iniconfig.py"]
+        assert "iniconfig" not in index["test_plain.py"]
+
+
+class TestRunProbeWithImpact:
+    def test_skips_install_and_tests_when_nothing_relevant_changed(self, monkeypatch, tmp_path):
+        def generate_requirements_txt_file(unversioned, all_reqs, cache, directory, *args):
+            pathlib.Path(directory, "requirements.dev.txt").write_text("six==1.16.0\npytest==7.0\n")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("should not run")
+
+        monkeypatch.setattr(requirements_tester, "generate_requirements_txt_file", generate_requirements_txt_file)
+        monkeypatch.setattr(requirements_tester, "install_requirements_txt_file", fail)
+        monkeypatch.setattr(requirements_tester, "run_tests", fail)
+        monkeypatch.chdir(tmp_path)
+
+        selector = TestImpactSelector(TestImpactIndex({"test_a.py": ["six"]}), {"six": "1.16.0", "pytest": "6.2"})
+        options = requirements_tester.ProbeOptions(test_impact=selector)
+        assert requirements_tester.run_probe({"pytest"}, [], options)
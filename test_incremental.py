@@ -0,0 +1,66 @@
+import pathlib
+
+import pytest
+
+import requirements_tester
+from depgraph import DependencyGraph
+from incremental import LockHistory
+from reqparser import LockfileParser
+from resolution_cache import Resolution
+
+
+@pytest.fixture
+def reqs():
+    with open(pathlib.Path("./testfiles") / "requirements_all.txt", "r") as f:
+        return LockfileParser(f).parse()
+
+
+@pytest.fixture
+def history(reqs):
+    return LockHistory(DependencyGraph(reqs), size=2)
+
+
+class TestLockHistory:
+    def test_empty(self, history):
+        assert history.base_for({"django"}) is None
+
+    def test_closest_base(self, history):
+        near, far = Resolution("near\n", "near\n"), Resolution("far\n", "far\n")
+        history.record({"django", "pytz"}, near)
+        history.record({"rx", "six", "promise"}, far)
+        assert history.base_for({"django"}) == (frozenset({"django", "pytz"}), near)
+
+    def test_failed_resolutions_are_not_bases(self, history):
+        history.record({"django"}, Resolution(conflicts={"django"}))
+        assert history.base_for({"django"}) is None
+
+    def test_evicts_oldest(self, history):
+        for unpinned in ({"django"}, {"rx"}, {"six"}):
+            history.record(unpinned, Resolution("a==1\n", "a==1\n"))
+        assert history.base_for({"django"})[0] != frozenset({"django"})
+
+    def test_upgrade_packages_cover_changed_subtrees(self, history):
+        upgrade = history.upgrade_packages(frozenset({"pytz"}), {"pytz", "django-filter"})
+        assert upgrade == {"django-filter", "django", "asgiref", "pytz", "sqlparse"}
+        assert history.upgrade_packages(frozenset({"six"}), set()) == {"six"}
+        assert history.upgrade_packages(frozenset(), {"not-in-lock"}) == {"not-in-lock"}
+
+
+class TestIncrementalCompile:
+    def test_seeds_from_previous_lock(self, reqs, history, tmp_path, monkeypatch):
+        calls = []
+
+        def resolve_requirements(directory, pip_args, resolver, upgrade_packages, timeout):
+            seed = tmp_path / "requirements.txt"
+            calls.append((upgrade_packages, seed.read_text() if seed.exists() else None))
+            return Resolution("six==1.0\n", "six==1.0\n")
+
+        monkeypatch.setattr(requirements_tester, "resolve_requirements", resolve_requirements)
+        (tmp_path / "requirements.dev.in").write_text("-r requirements.txt\n")
+
+        requirements_tester.generate_requirements_txt_file({"six"}, reqs, directory=str(tmp_path), history=history)
+        requirements_tester.generate_requirements_txt_file(
+            {"six", "rx"}, reqs, directory=str(tmp_path), history=history
+        )
+        assert calls[0] == (None, None)
+        assert calls[1] == ({"rx"}, "six==1.0\n")
@@ -0,0 +1,55 @@
+import pytest
+
+from journal import JournalEntry, ProbeJournal, hash_lock_file
+
+
+def test_lock_hash_ignores_annotations():
+    annotated = "#\n# autogenerated\n#\ndjango==3.2.6\n    # via graphene-django\npytz==2021.1\n"
+    plain = "pytz==2021.1\ndjango==3.2.6\n"
+    assert hash_lock_file(annotated) == hash_lock_file(plain)
+    assert hash_lock_file(plain) != hash_lock_file("pytz==2021.3\ndjango==3.2.6\n")
+
+
+class TestProbeJournal:
+    def test_resume_restores_results(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        journal = ProbeJournal(path, "run")
+        journal.record(JournalEntry({"django", "pytz"}, "abc", False, 1.0, 2.0, 3.0))
+        journal.record(JournalEntry({"pytz"}, "def", True))
+        journal.close()
+
+        journal = ProbeJournal(path, "run", resume=True)
+        assert journal.results() == {frozenset({"django", "pytz"}): False, frozenset({"pytz"}): True}
+        assert journal.lookup_lock("abc") is False
+        assert journal.lookup_lock("xyz") is None
+        assert journal.entries[0].test_seconds == 3.0
+
+    def test_resume_drops_truncated_entry(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        journal = ProbeJournal(path, "run")
+        journal.record(JournalEntry({"pytz"}, "def", True))
+        journal.close()
+        with open(path, "a") as f:
+            f.write('{"unpinned": ["dja')
+
+        journal = ProbeJournal(path, "run", resume=True)
+        journal.record(JournalEntry({"django"}, "abc", False))
+        journal.close()
+
+        journal = ProbeJournal(path, "run", resume=True)
+        assert journal.results() == {frozenset({"pytz"}): True, frozenset({"django"}): False}
+
+    def test_without_resume_starts_over(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        journal = ProbeJournal(path, "run")
+        journal.record(JournalEntry({"pytz"}, "def", True))
+        journal.close()
+
+        assert ProbeJournal(path, "run").results() == {}
+
+    def test_refuses_to_resume_different_run(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        ProbeJournal(path, "run").close()
+
+        with pytest.raises(Exception):
+            ProbeJournal(path, "other-run", resume=True)
@@ -0,0 +1,70 @@
+import pathlib
+
+import pytest
+
+import requirements_tester
+from lockdiff import LockDiff, same_version
+from reqparser import LockfileParser
+
+
+@pytest.fixture
+def reqs():
+    with open(pathlib.Path("./testfiles") / "requirements_all.txt", "r") as f:
+        return LockfileParser(f).parse()
+
+
+def pins_with(reqs, **new_versions):
+    pins = {r.name: r.specs[0][1] for r in reqs}
+    pins.update({name.replace("_", "-"): version for name, version in new_versions.items()})
+    return pins
+
+
+def test_same_version():
+    assert same_version("1.0", "1.0.0")
+    assert not same_version("1.0", "1.1")
+    assert not same_version("1.0", None)
+
+
+class TestLockDiff:
+    def test_keeps_changed_requirements_and_their_dependents(self, reqs):
+        lock_diff = LockDiff(reqs, pins_with(reqs, pytz="2021.3"))
+        assert lock_diff.changed == {"pytz"}
+        assert lock_diff.kept == {"pytz", "django", "django-filter", "django-health-check", "graphene-django"}
+
+    def test_removed_requirement_counts_as_changed(self, reqs):
+        pins = pins_with(reqs)
+        del pins["sqlparse"]
+        assert LockDiff(reqs, pins).changed == {"sqlparse"}
+
+    def test_prune_leaves_originals_intact(self, reqs):
+        django = next(r for r in reqs if r.name == "django")
+        dependencies = list(django.dependencies)
+        pruned = {r.name: r for r in LockDiff(reqs, pins_with(reqs, pytz="2021.3")).prune()}
+        assert [d.name for d in pruned["django"].dependencies] == ["pytz"]
+        assert pruned["django"].dependencies[0] is pruned["pytz"]
+        assert django.dependencies == dependencies
+
+    def test_summary(self, reqs):
+        summary = LockDiff(reqs, pins_with(reqs, pytz="2021.3")).summary()
+        assert "1 of" in summary and f"Pruned {len(reqs) - 5} unchanged requirements" in summary
+
+
+def test_search_over_pruned_tree(reqs, monkeypatch):
+    def fake_run_probe(probes):
+        def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+            probes.append(frozenset(unversioned_requirements))
+            return "pytz" not in unversioned_requirements
+
+        return run_probe
+
+    full_probes = []
+    monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe(full_probes))
+    requirements_tester.search(reqs, {r.name for r in reqs})
+
+    lock_diff = LockDiff(reqs, pins_with(reqs, pytz="2021.3", graphene="3.0"))
+    pruned_probes = []
+    monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe(pruned_probes))
+    culprits = requirements_tester.search(reqs, lock_diff.changed, tree=lock_diff.prune())
+    assert culprits == [r for r in reqs if r.name == "pytz"]
+    assert len(pruned_probes) < len(full_probes)
+    assert all(probe <= {"pytz", "graphene"} for probe in pruned_probes)
@@ -0,0 +1,51 @@
+from nogoods import NogoodStore
+
+LINES = {"django": "django==3.2", "pytz": "pytz==2020.1", "asgiref": "asgiref==3.4", "rx": "rx==1.6"}
+
+
+class TestNogoodStore:
+    def test_learns_and_expands(self):
+        store = NogoodStore()
+        store.learn({"django", "pytz"}, {"django"}, LINES)
+
+        unpinned = {"django", "rx"}
+        assert store.expand(unpinned, LINES) == {"pytz"}
+        assert unpinned == {"django", "rx", "pytz"}
+        assert store.expansions == 1
+
+    def test_only_applies_when_trigger_is_unpinned(self):
+        store = NogoodStore()
+        store.learn({"django", "pytz"}, {"django"}, LINES)
+        unpinned = {"rx"}
+        assert store.expand(unpinned, LINES) == set()
+        assert unpinned == {"rx"}
+
+    def test_chained_conflicts(self):
+        store = NogoodStore()
+        store.learn({"django", "pytz"}, {"django"}, LINES)
+        store.learn({"pytz", "asgiref"}, {"pytz"}, LINES)
+        unpinned = {"django"}
+        assert store.expand(unpinned, LINES) == {"pytz", "asgiref"}
+
+    def test_changed_pins_no_longer_match(self):
+        store = NogoodStore()
+        store.learn({"django", "pytz"}, {"django"}, LINES)
+        assert store.expand({"django"}, {**LINES, "pytz": "pytz==2021.3"}) == set()
+
+    def test_conflict_without_unpinned_names_uses_whole_unpinned_set(self):
+        store = NogoodStore()
+        store.learn({"pytz"}, {"django", "rx"}, LINES)
+        assert store.expand({"django"}, LINES) == set()
+        assert store.expand({"django", "rx"}, LINES) == {"pytz"}
+
+    def test_keep_pinned_stays_pinned(self):
+        store = NogoodStore()
+        store.learn({"django", "pytz", "asgiref"}, {"rx"}, LINES)
+        unpinned = {"rx"}
+        assert store.expand(unpinned, LINES, keep_pinned={"django"}) == {"pytz", "asgiref"}
+        assert store.expand({"rx", "pytz", "asgiref"}, LINES, keep_pinned={"django"}) == set()
+
+    def test_persists(self, tmp_path):
+        path = str(tmp_path / "nogoods.json")
+        NogoodStore(path).learn({"django", "pytz"}, {"django"}, LINES)
+        assert NogoodStore(path).expand({"django"}, LINES) == {"pytz"}
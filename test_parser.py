@@ -1,7 +1,7 @@
 import pytest
 import pathlib
 
-from reqparser import Requirement, RequirementsParser
+from reqparser import LockfileParser, Requirement, RequirementsParser, ViaEdge
 
 
 @pytest.fixture
@@ -161,3 +161,57 @@ class TestRequirementsParsing:
         assert r.specs == [("==", "1.2.0")]
         assert r.is_primary_dependency == False
         assert {reqfor.name for reqfor in r.requirement_for} == {"graphene-django"}
+
+    def test_children_are_dependencies(self, testfile):
+        parsed = {r.name: r for r in RequirementsParser(testfile("requirements_all.txt")).parse()}
+
+        assert [r.name for r in parsed["graphene-django"].get_children()] == [
+            "django",
+            "graphene",
+            "graphql-core",
+            "promise",
+            "singledispatch",
+            "six",
+            "unidecode",
+        ]
+        assert [r.name for r in parsed["graphql-relay"].get_children()] == ["graphql-core", "promise", "six"]
+        assert parsed["six"].get_children() == []
+
+
+class TestLockfileParsing:
+    @pytest.mark.parametrize(
+        "filename", ["requirements_all.txt", "requirements_header.txt", "requirements_footer.txt"]
+    )
+    def test_matches_requirements_parser(self, testfile, filename):
+        expected = RequirementsParser(testfile(filename)).parse()
+        parsed = LockfileParser(testfile(filename)).parse()
+
+        assert [r.name for r in parsed] == [r.name for r in expected]
+        for r, e in zip(parsed, expected):
+            assert r.line == e.line
+            assert r.specs == e.specs
+            assert r.is_primary_dependency == e.is_primary_dependency
+            assert [reqfor.name for reqfor in r.requirement_for] == [reqfor.name for reqfor in e.requirement_for]
+            assert [dep.name for dep in r.get_children()] == [dep.name for dep in e.get_children()]
+
+    def test_handles_hashes_extras_and_markers(self, testfile):
+        parsed = LockfileParser(testfile("requirements_hashes.txt")).parse()
+        assert [r.name for r in parsed] == ["graphene", "graphene-django", "typing-extensions", "setuptools"]
+
+        r = parsed[2]
+        assert r.line == 'typing-extensions[test]==3.10.0.0 ; python_version < "3.8"'
+        assert r.specs == [("==", "3.10.0.0")]
+        assert r.extras == ["test"]
+        assert {reqfor.name for reqfor in r.requirement_for} == {"graphene", "graphene-django"}
+        assert parsed[1].is_primary_dependency
+        assert {dep.name for dep in parsed[1].get_children()} == {"graphene", "typing-extensions"}
+
+    def test_iter_entries_streams_edges(self, testfile):
+        entries = list(LockfileParser(testfile("requirements_header.txt")).iter_entries())
+        assert [type(e).__name__ for e in entries] == ["Requirement", "ViaEdge", "Requirement"]
+        assert entries[1] == ViaEdge("graphene", "graphene-django")
+        assert entries[2].is_primary_dependency
+
+    def test_falls_back_for_unpinned_lines(self):
+        parsed = LockfileParser(["django>=3.2,<4\n", "pytz\n"]).parse()
+        assert [(r.name, sorted(r.specs)) for r in parsed] == [("django", [("<", "4"), (">=", "3.2")]), ("pytz", [])]
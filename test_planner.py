@@ -0,0 +1,83 @@
+import pytest
+
+from planner import WeightedSearcher, prior_score, version_jump
+from searcher import EndNodeReached
+
+
+class Candidate:
+    def __init__(self, name: str):
+        self.name = name
+
+
+def run(searcher, culprit):
+    found = []
+    subset = searcher.failed()
+    while subset is not None:
+        if culprit in {c.name for c in subset}:
+            try:
+                subset = searcher.failed()
+            except EndNodeReached as e:
+                found.append(e.requirement.name)
+                subset = searcher.passed()
+        else:
+            subset = searcher.passed()
+    return found
+
+
+class TestVersionJump:
+    @pytest.mark.parametrize(
+        "old, new, expected",
+        [
+            ("1.2.3", "2.0.0", "major"),
+            ("1.2.3", "1.3.0", "minor"),
+            ("1.2.3", "1.2.4", "patch"),
+            ("1.2", "1.2.0.post1", "patch"),
+            ("1.2.3", "1.2.3", "unchanged"),
+            (None, "1.0", "unchanged"),
+            ("1.0", "not-a-version", "major"),
+        ],
+    )
+    def test_jumps(self, old, new, expected):
+        assert version_jump(old, new) == expected
+
+    def test_prior_score_ordering(self):
+        assert prior_score("1.0", "2.0", False, 0) > prior_score("1.0", "1.1", False, 0)
+        assert prior_score("1.0", "1.1", False, 0) > prior_score("1.0", "1.0.1", False, 0)
+        assert prior_score("1.0", "1.0.1", True, 0) > prior_score("1.0", "1.0.1", False, 0)
+        assert prior_score("1.0", "1.0.1", False, 5) > prior_score("1.0", "1.0.1", False, 0)
+
+
+class TestWeightedSearcher:
+    names = [f"p{idx}" for idx in range(16)]
+
+    @pytest.mark.parametrize("culprit", ["p0", "p7", "p15"])
+    def test_finds_culprit_with_uniform_priors(self, culprit):
+        searcher = WeightedSearcher([Candidate(n) for n in self.names], {n: 1.0 for n in self.names})
+        assert run(searcher, culprit) == [culprit]
+
+    def test_skewed_prior_finds_likely_culprit_quickly(self):
+        priors = {n: 1.0 for n in self.names}
+        priors["p9"] = 100.0
+        weighted = WeightedSearcher([Candidate(n) for n in self.names], priors)
+        uniform = WeightedSearcher([Candidate(n) for n in self.names], {n: 1.0 for n in self.names})
+        assert run(weighted, "p9") == run(uniform, "p9") == ["p9"]
+        assert weighted.probe_count < uniform.probe_count
+
+    def test_single_candidate(self):
+        searcher = WeightedSearcher([Candidate("A")], {"A": 1.0})
+        assert [c.name for c in searcher.failed()] == ["A"]
+        with pytest.raises(EndNodeReached) as excinfo:
+            searcher.failed()
+        assert excinfo.value.requirement.name == "A"
+        assert searcher.passed() is None
+
+    def test_no_culprit(self):
+        searcher = WeightedSearcher([Candidate(n) for n in "ABCD"], {n: 1.0 for n in "ABCD"})
+        assert run(searcher, "Z") == []
+
+    def test_false_results_are_retested(self):
+        searcher = WeightedSearcher(
+            [Candidate(n) for n in self.names], {n: 1.0 for n in self.names}, false_result_rate=0.1
+        )
+        assert run(searcher, "p3") == ["p3"]
+        assert searcher.probabilities["p3"] >= 0.95
@@ -0,0 +1,248 @@
+import concurrent.futures
+import pathlib
+import subprocess
+
+import pytest
+
+import requirements_tester
+from journal import JournalEntry, ProbeJournal
+from nogoods import NogoodStore
+from reqparser import RequirementsParser
+from resolution_cache import Resolution
+from streaming import StreamResult
+from wheelhouse import Wheelhouse
+
+
+@pytest.fixture
+def reqs():
+    with open(pathlib.Path("./testfiles") / "requirements_all.txt", "r") as f:
+        return RequirementsParser(f).parse()
+
+
+def fake_run_probe(failing_requirements, probes):
+    def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+        probes.append(frozenset(unversioned_requirements))
+        return not failing_requirements & set(unversioned_requirements)
+
+    return run_probe
+
+
+class TestSearch:
+    def test_passes_when_everything_unpinned(self, reqs, monkeypatch):
+        probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe(set(), probes))
+
+        assert requirements_tester.search(reqs, {r.name for r in reqs}) == []
+        assert len(probes) == 1
+
+    def test_finds_leaf_culprit(self, reqs, monkeypatch):
+        probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, probes))
+
+        culprits = requirements_tester.search(reqs, {r.name for r in reqs})
+        assert [r.name for r in culprits] == ["pytz"]
+        assert len(probes) == len(set(probes))
+
+    def test_finds_culprit_with_dependencies(self, reqs, monkeypatch):
+        probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"django"}, probes))
+
+        culprits = requirements_tester.search(reqs, {r.name for r in reqs})
+        assert [r.name for r in culprits] == ["django"]
+        assert len(probes) == len(set(probes))
+
+    def test_forced_versions_are_never_unpinned(self, reqs, monkeypatch):
+        probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, probes))
+
+        requirements_tester.search(reqs, {r.name for r in reqs} - {"django"})
+        assert all("django" not in probe for probe in probes)
+
+    def test_speculative_probes_find_same_culprit(self, reqs, monkeypatch):
+        class InlinePool:
+            jobs = 3
+
+            def __init__(self):
+                self.submitted = []
+
+            def submit(self, probe, spec):
+                self.submitted.append(spec)
+                future = concurrent.futures.Future()
+                future.set_result(probe(spec, None))
+                return future
+
+        sequential_probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, sequential_probes))
+        requirements_tester.search(reqs, {r.name for r in reqs})
+
+        probes = []
+        pool = InlinePool()
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, probes))
+        culprits = requirements_tester.search(reqs, {r.name for r in reqs}, pool=pool)
+        assert [r.name for r in culprits] == ["pytz"]
+        assert set(sequential_probes) <= set(probes)
+        assert len(pool.submitted) == len(set(pool.submitted))
+
+    def test_resumes_from_journal(self, reqs, monkeypatch, tmp_path):
+        probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, probes))
+        first_run = requirements_tester.search(reqs, {r.name for r in reqs})
+
+        journal = ProbeJournal(str(tmp_path / "journal.jsonl"), "run")
+        for unpinned in probes[: len(probes) // 2]:
+            journal.record(JournalEntry(unpinned, None, "pytz" not in unpinned))
+        resumed_probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, resumed_probes))
+
+        options = requirements_tester.ProbeOptions(journal=journal)
+        resumed_run = requirements_tester.search(reqs, {r.name for r in reqs}, options)
+        assert resumed_run == first_run
+        assert resumed_probes == probes[len(probes) // 2 :]
+
+    def test_ddmin_finds_interacting_pair(self, reqs, monkeypatch):
+        probes = []
+
+        def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+            probes.append(frozenset(unversioned_requirements))
+            return not {"pytz", "rx"} <= set(unversioned_requirements)
+
+        monkeypatch.setattr(requirements_tester, "run_probe", run_probe)
+
+        culprits = requirements_tester.search(reqs, {r.name for r in reqs}, strategy="ddmin")
+        assert sorted(r.name for r in culprits) == ["pytz", "rx"]
+        assert len(probes) == len(set(probes))
+
+    def test_weighted_finds_culprit(self, reqs, monkeypatch):
+        probes = []
+        monkeypatch.setattr(requirements_tester, "run_probe", fake_run_probe({"pytz"}, probes))
+        monkeypatch.setattr(requirements_tester, "resolve_pins", lambda unversioned, all_reqs, options: {})
+
+        culprits = requirements_tester.search(reqs, {r.name for r in reqs}, strategy="weighted")
+        assert [r.name for r in culprits] == ["pytz"]
+        assert len(probes) == len(set(probes))
+
+
+class TestConflictScanner:
+    def test_stops_after_conflict_block(self):
+        scanner = requirements_tester.ConflictScanner()
+        # pip-compile 6.2.0's output for a pin that conflicts with what a parent requires
+        for line in [
+            "Could not find a version that matches pytz==2020.1,>=2021",
+            "Tried: 2019.3, 2020.1, 2021.1",
+            "There are incompatible versions in the resolved dependencies:",
+            "  pytz==2020.1 (from -r requirements.test.in (line 10))",
+            "  pytz>=2021 (from django==4.0->-r requirements.test.in (line 3))",
+        ]:
+            assert not scanner(line)
+        assert scanner("")
+        assert scanner.conflicts == {"pytz", "django"}
+
+    def test_parents_only_come_from_conflict_block(self):
+        scanner = requirements_tester.ConflictScanner()
+        assert not scanner("Could not find a version that matches urllib3<1.27,==2.0.0,>=1.21.1")
+        assert not scanner("Tried: 1.26.5, 2.0.0 (from https://pypi.org/simple/urllib3/) (requires-python:>=3.7)")
+        assert scanner.conflicts == {"urllib3"}
+
+
+class TestCompileRequirements:
+    def test_failure_without_conflicts_raises(self, monkeypatch, tmp_path):
+        failed = StreamResult(1, "", "ERROR: Could not connect to the index\n", False, False)
+        monkeypatch.setattr(requirements_tester, "run_streaming", lambda *args, **kwargs: failed)
+        with pytest.raises(subprocess.CalledProcessError):
+            requirements_tester.compile_requirements(str(tmp_path))
+
+    def test_no_index_goes_through_pip_args(self, monkeypatch, tmp_path):
+        commands = []
+
+        def run_streaming(command, **kwargs):
+            commands.append(command)
+            return StreamResult(1, "", "", False, False)
+
+        monkeypatch.setattr(requirements_tester, "run_streaming", run_streaming)
+        with pytest.raises(subprocess.CalledProcessError):
+            requirements_tester.compile_requirements(str(tmp_path), Wheelhouse(str(tmp_path), offline=True).pip_args())
+        assert commands[0][3:] == ["--find-links", str(tmp_path), "--pip-args", "--no-index"]
+
+
+class TestNogoods:
+    def test_second_compile_resolves_first_time(self, reqs, monkeypatch, tmp_path):
+        attempts = []
+
+        def resolve_requirements(directory, pip_args, resolver, upgrade_packages, timeout):
+            with open(tmp_path / "requirements.test.in") as f:
+                unpinned_pytz = "pytz\n" in f.read()
+            attempts.append(unpinned_pytz)
+            if unpinned_pytz:
+                return Resolution("pytz==2021.1\n", "pytz==2021.1\n")
+            return Resolution(conflicts={"django", "pytz"})
+
+        monkeypatch.setattr(requirements_tester, "resolve_requirements", resolve_requirements)
+        store = NogoodStore(str(tmp_path / "nogoods.json"))
+        for _ in range(2):
+            requirements_tester.generate_requirements_txt_file(
+                {"django"}, reqs, directory=str(tmp_path), nogoods=store
+            )
+        assert attempts == [False, True, True]
+
+
+class TestWheelhouse:
+    def test_index_is_fallback_unless_offline(self, tmp_path):
+        assert "--no-index" not in Wheelhouse(str(tmp_path)).pip_args()
+        assert Wheelhouse(str(tmp_path), offline=True).pip_args() == ["--no-index", "--find-links", str(tmp_path)]
+
+    def test_offline_needs_wheelhouse(self):
+        with pytest.raises(SystemExit):
+            requirements_tester.parse_args(["--offline"])
+
+
+class TestCompileTimeout:
+    def test_uses_pip_compile_which_can_be_stopped(self, tmp_path):
+        options = requirements_tester.parse_args(["--cache-dir", str(tmp_path / "cache"), "--compile-timeout", "60"])
+        shared = requirements_tester.build_shared_probe_options(options)
+        assert shared.resolver is None
+        assert shared.timeouts.compile_timeout == 60
+
+    def test_rejected_with_in_process_resolver(self):
+        with pytest.raises(SystemExit):
+            requirements_tester.parse_args(["--compile-timeout", "60", "--resolver", "in-process"])
+
+
+class TestKeepOriginalRequirementsTxt:
+    def test_restores_copy_left_by_killed_run(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        saved_path = str(tmp_path / "cache" / "journal.jsonl.requirements.txt")
+        (tmp_path / "requirements.txt").write_text("pytz==2020.1\n")
+        assert requirements_tester.keep_original_requirements_txt(saved_path) == "pytz==2020.1\n"
+        # a probe compiled into the project directory, then the run was killed before it could clean up
+        (tmp_path / "requirements.txt").write_text("pytz==2021.1\n    # via -r requirements.test.in\n")
+        assert requirements_tester.keep_original_requirements_txt(saved_path) == "pytz==2020.1\n"
+        assert (tmp_path / "requirements.txt").read_text() == "pytz==2020.1\n"
+
+    def test_keeps_edits_made_since(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        saved_path = str(tmp_path / "journal.jsonl.requirements.txt")
+        (tmp_path / "requirements.txt").write_text("pytz==2020.1\n")
+        requirements_tester.keep_original_requirements_txt(saved_path)
+        (tmp_path / "requirements.txt").write_text("pytz==2021.3\n")
+        with pytest.raises(Exception, match="--resume"):
+            requirements_tester.keep_original_requirements_txt(saved_path)
+        assert (tmp_path / "requirements.txt").read_text() == "pytz==2021.3\n"
+        assert requirements_tester.keep_original_requirements_txt(saved_path, resume=True) == "pytz==2020.1\n"
+        assert (tmp_path / "requirements.txt").read_text() == "pytz==2020.1\n"
+
+
+class TestBuildProbeOptions:
+    def test_projects_share_caches_and_keep_their_own_state(self, reqs, tmp_path):
+        options = requirements_tester.parse_args(
+            ["--cache-dir", str(tmp_path / "cache"), "--flaky-tests", "--incremental", "--resolver", "subprocess"]
+        )
+        shared = requirements_tester.build_shared_probe_options(options)
+        first, second = (
+            requirements_tester.build_probe_options(options, reqs, str(tmp_path / name), shared=shared)
+            for name in ("first", "second")
+        )
+        assert first.cache is second.cache is shared.cache
+        assert first.nogoods is second.nogoods
+        assert first.lock_history is not second.lock_history
+        assert first.test_oracle.path.startswith(str(tmp_path / "first"))
+        assert second.test_oracle.path.startswith(str(tmp_path / "second"))
@@ -0,0 +1,79 @@
+import concurrent.futures
+import os
+import time
+
+from resolution_cache import Resolution, ResolutionCache
+
+
+class TestResolutionCache:
+    def test_key_ignores_requirements_test_in_line_order(self):
+        key_a = ResolutionCache.key_for("django\ngraphene==2.1.9\n", "-r requirements.txt\npytest\n")
+        key_b = ResolutionCache.key_for("graphene==2.1.9\n\ndjango\n", "-r requirements.txt\npytest\n")
+        assert key_a == key_b
+
+    def test_key_depends_on_dev_requirements(self):
+        key_a = ResolutionCache.key_for("django\n", "-r requirements.txt\npytest\n")
+        key_b = ResolutionCache.key_for("django\n", "-r requirements.txt\nblack\n")
+        assert key_a != key_b
+
+    def test_key_depends_on_pip_args(self):
+        key_a = ResolutionCache.key_for("django\n", "-r requirements.txt\n")
+        key_b = ResolutionCache.key_for("django\n", "-r requirements.txt\n", ["--no-index", "--find-links", "/w"])
+        assert key_a != key_b
+
+    def test_miss_then_hit(self, tmp_path):
+        cache = ResolutionCache(str(tmp_path))
+        key = ResolutionCache.key_for("django\n", "-r requirements.txt\n")
+        assert cache.get(key) is None
+        cache.put(key, Resolution("django==3.2.6\n", "django==3.2.6\npytest==6.2.4\n"))
+
+        resolution = cache.get(key)
+        assert resolution.succeeded
+        assert resolution.requirements_txt == "django==3.2.6\n"
+        assert resolution.requirements_dev_txt == "django==3.2.6\npytest==6.2.4\n"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_conflicts_are_cached(self, tmp_path):
+        cache = ResolutionCache(str(tmp_path))
+        cache.put("abc", Resolution(conflicts={"graphql-core", "graphene"}))
+
+        resolution = cache.get("abc")
+        assert not resolution.succeeded
+        assert resolution.conflicts == {"graphql-core", "graphene"}
+
+    def test_failure_without_conflicts_is_not_cached(self, tmp_path):
+        cache = ResolutionCache(str(tmp_path))
+        cache.put("abc", Resolution(conflicts=set()))
+
+        assert cache.get("abc") is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        lock_file = "x" * 100
+        cache = ResolutionCache(str(tmp_path), max_bytes=450)
+        cache.put("first", Resolution(lock_file, lock_file))
+        cache.put("second", Resolution(lock_file, lock_file))
+        old = time.time() - 60
+        os.utime(tmp_path / "first", (old, old))
+        os.utime(tmp_path / "second", (old + 1, old + 1))
+        assert cache.get("first") is not None
+
+        cache.put("third", Resolution(lock_file, lock_file))
+        assert cache.get("second") is None
+        assert cache.get("first") is not None
+        assert cache.get("third") is not None
+
+    def test_concurrent_puts_while_evicting(self, tmp_path):
+        lock_file = "x" * 100
+        cache = ResolutionCache(str(tmp_path), max_bytes=2000)
+
+        def put_and_get(thread: int):
+            for idx in range(100):
+                # half the keys are shared between threads, so the same entry is also replaced concurrently
+                key = f"{thread}-{idx}" if idx % 2 else str(idx)
+                cache.put(key, Resolution(lock_file, lock_file))
+                cache.get(key)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            for future in [executor.submit(put_and_get, thread) for thread in range(8)]:
+                future.result()
+        assert cache.hits + cache.misses == 800
@@ -0,0 +1,50 @@
+import importlib.util
+
+import pytest
+
+import requirements_tester
+from resolution_cache import Resolution
+from resolver import Conflict, conflicting_names, conflicts_from_causes, create_resolver
+
+HAS_PIPTOOLS = importlib.util.find_spec("piptools") is not None
+
+
+class Named:
+    def __init__(self, name: str, specifier: str = ""):
+        self.name = name
+        self.specifier = specifier
+
+
+class TestConflicts:
+    def test_conflicts_from_causes(self):
+        causes = [(Named("pytz", "==2020.1"), None), (Named("pytz", ">=2021"), Named("pandas"))]
+        assert conflicts_from_causes(causes) == [
+            Conflict("pytz", "==2020.1", None),
+            Conflict("pytz", ">=2021", "pandas"),
+        ]
+
+    def test_conflicting_names_include_parents(self):
+        conflicts = [Conflict("pytz", "==2020.1", None), Conflict("pytz", ">=2021", "pandas")]
+        assert conflicting_names(conflicts) == {"pytz", "pandas"}
+
+
+class TestCreateResolver:
+    def test_subprocess(self, tmp_path):
+        assert create_resolver("subprocess", str(tmp_path)) is None
+
+    @pytest.mark.skipif(HAS_PIPTOOLS, reason="pip-tools is installed")
+    def test_auto_falls_back_without_piptools(self, tmp_path):
+        assert create_resolver("auto", str(tmp_path)) is None
+        with pytest.raises(ImportError):
+            create_resolver("in-process", str(tmp_path))
+
+
+class TestResolveRequirements:
+    def test_falls_back_to_subprocess_on_unexpected_errors(self, monkeypatch):
+        class BrokenResolver:
+            def compile(self, directory, pip_args, upgrade_packages=None):
+                raise AttributeError("internal API changed")
+
+        fallback = Resolution("a==1\n", "a==1\n")
+        monkeypatch.setattr(requirements_tester, "compile_requirements", lambda directory, pip_args, upgrade_packages, timeout: fallback)
+        assert requirements_tester.resolve_requirements(".", [], BrokenResolver()) is fallback
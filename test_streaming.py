@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from streaming import run_streaming
+
+
+def python(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+class TestRunStreaming:
+    def test_collects_output(self):
+        result = run_streaming(python("import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"))
+        assert result.returncode == 3
+        assert result.stdout == "out\n"
+        assert result.stderr == "err\n"
+        assert not result.succeeded
+        with pytest.raises(subprocess.CalledProcessError):
+            result.check(["cmd"])
+
+    def test_aborts_once_result_is_known(self):
+        seen = []
+
+        def on_stdout(line):
+            seen.append(line)
+            return line == "conflict"
+
+        started = time.monotonic()
+        result = run_streaming(
+            python("import time; print('a'); print('conflict', flush=True); time.sleep(30); print('b')"),
+            on_stdout=on_stdout,
+        )
+        assert time.monotonic() - started < 10
+        assert result.aborted
+        assert result.returncode is None
+        assert seen == ["a", "conflict"]
+
+    def test_timeout(self):
+        started = time.monotonic()
+        result = run_streaming(python("import time; print('started', flush=True); time.sleep(30)"), timeout=0.5)
+        assert time.monotonic() - started < 10
+        assert result.timed_out
+        assert result.stdout == "started\n"
+        with pytest.raises(subprocess.TimeoutExpired):
+            result.check(["cmd"])
+
+    def test_success(self):
+        result = run_streaming(python("print('ok')"), timeout=30)
+        assert result.succeeded
+        result.check(["cmd"])
+
+    def test_lines_longer_than_the_stream_limit(self):
+        seen = []
+        result = run_streaming(
+            python("print('x' * 200000); print('end', end='')"), on_stdout=lambda line: seen.append(line) and False
+        )
+        assert result.succeeded
+        assert [len(line) for line in seen] == [200000, 3]
+        assert result.stdout == "x" * 200000 + "\nend"
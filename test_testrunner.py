@@ -0,0 +1,165 @@
+import pytest
+
+import requirements_tester
+from testrunner import FailureFirstSelector, FailureWatcher, FlakyTestOracle, TestRun, parse_failed_node_ids
+
+PYTEST_OUTPUT = """
+============================= test session starts ==============================
+collected 4 items
+
+tests/test_api.py .F.                                                    [ 75%]
+tests/test_models.py E                                                   [100%]
+
+=========================== short test summary info ============================
+FAILED tests/test_api.py::TestQuery::test_filter[a - b] - AssertionError: assert 1 == 2
+ERROR tests/test_models.py::test_migration - django.db.utils.OperationalError
+FAILED tests/test_api.py::test_no_message
+==================== 1 failed, 2 passed, 1 error in 0.12s =====================
+"""
+
+
+def test_parse_failed_node_ids():
+    assert parse_failed_node_ids(PYTEST_OUTPUT) == [
+        "tests/test_api.py::TestQuery::test_filter[a - b]",
+        "tests/test_models.py::test_migration",
+        "tests/test_api.py::test_no_message",
+    ]
+
+
+def fake_run_pytest(runs, results):
+    def run_pytest(workspace=None, pytest_args=(), timeout=None, abort_on=()):
+        runs.append(list(pytest_args))
+        return results.pop(0)
+
+    return run_pytest
+
+
+class TestFailureFirst:
+    def test_baseline_records_failures(self, monkeypatch, tmp_path):
+        runs = []
+        monkeypatch.setattr(
+            requirements_tester, "run_pytest", fake_run_pytest(runs, [TestRun(False, ["tests/test_a.py::test_a"])])
+        )
+        selector = FailureFirstSelector(str(tmp_path / "baseline.json"))
+
+        assert not requirements_tester.run_tests(None, selector)
+        assert runs == [[]]
+        assert selector.baseline_failures == ["tests/test_a.py::test_a"]
+        assert FailureFirstSelector(str(tmp_path / "baseline.json"), resume=True).baseline_failures == [
+            "tests/test_a.py::test_a"
+        ]
+
+    def test_known_failure_skips_full_suite(self, monkeypatch):
+        runs = []
+        monkeypatch.setattr(requirements_tester, "run_pytest", fake_run_pytest(runs, [TestRun(False)]))
+        selector = FailureFirstSelector()
+        selector.baseline_failures = ["tests/test_a.py::test_a"]
+
+        assert not requirements_tester.run_tests(None, selector)
+        assert runs == [["-x", "tests/test_a.py::test_a"]]
+
+    def test_full_suite_decides_pass(self, monkeypatch):
+        runs = []
+        monkeypatch.setattr(
+            requirements_tester, "run_pytest", fake_run_pytest(runs, [TestRun(True), TestRun(False, ["other"])])
+        )
+        selector = FailureFirstSelector()
+        selector.baseline_failures = ["tests/test_a.py::test_a"]
+
+        assert not requirements_tester.run_tests(None, selector)
+        assert runs == [["-x", "tests/test_a.py::test_a"], []]
+
+
+class TestFailureWatcher:
+    def test_stops_on_known_failure(self):
+        watcher = FailureWatcher(["test_a.py::test_one", "test_a.py::test_two[a - b]"])
+        assert not watcher("test_a.py::test_zero FAILED                      [ 10%]")
+        assert not watcher("test_a.py::test_one PASSED                       [ 20%]")
+        assert watcher("test_a.py::test_two[a - b] FAILED                   [ 30%]")
+        assert watcher.failed_node_ids == ["test_a.py::test_two[a - b]"]
+
+
+class TestFlakyTestOracle:
+    SIGNATURE = ["tests/test_a.py::test_a"]
+
+    def rerun_with(self, results):
+        runs = []
+
+        def rerun():
+            runs.append(None)
+            return results.pop(0)
+
+        return rerun, runs
+
+    def test_baseline_records_signature(self, tmp_path):
+        oracle = FlakyTestOracle(str(tmp_path / "signature.json"))
+        verdict = oracle.judge(TestRun(False, self.SIGNATURE), lambda: pytest.fail("no rerun expected"))
+        assert not verdict.passed
+        assert FlakyTestOracle(str(tmp_path / "signature.json"), resume=True).signature == self.SIGNATURE
+
+    def test_unrelated_failure_passes(self):
+        oracle = FlakyTestOracle()
+        oracle.signature = self.SIGNATURE
+        verdict = oracle.judge(TestRun(False, ["tests/test_b.py::test_b"]), lambda: pytest.fail("no rerun expected"))
+        assert verdict.passed
+        assert verdict.runs == 1 and verdict.confidence >= 0.9
+
+    def test_failure_without_node_ids_reproduces(self):
+        oracle = FlakyTestOracle()
+        oracle.signature = self.SIGNATURE
+        assert oracle.reproduces(TestRun(False))
+        assert not oracle.reproduces(TestRun(True))
+
+    def test_reruns_while_uncertain(self):
+        oracle = FlakyTestOracle()
+        oracle.signature = self.SIGNATURE
+        rerun, runs = self.rerun_with([TestRun(False, self.SIGNATURE)])
+        verdict = oracle.judge(TestRun(False, self.SIGNATURE), rerun)
+        assert not verdict.passed
+        assert verdict.runs == 2 and len(runs) == 1
+        assert verdict.confidence >= 0.9
+
+    def test_disagreeing_runs_are_decided_by_majority(self):
+        oracle = FlakyTestOracle()
+        oracle.signature = self.SIGNATURE
+        rerun, runs = self.rerun_with([TestRun(True), TestRun(True), TestRun(True)])
+        verdict = oracle.judge(TestRun(False, self.SIGNATURE), rerun)
+        assert verdict.passed
+        assert verdict.runs == 3
+
+    def test_single_flake_is_rerun_with_cli_defaults(self):
+        options = requirements_tester.parse_args([])
+        oracle = FlakyTestOracle(confidence=options.confidence, max_runs=options.max_test_runs)
+        oracle.signature = self.SIGNATURE
+        rerun, runs = self.rerun_with([TestRun(True), TestRun(True)])
+        verdict = oracle.judge(TestRun(False, self.SIGNATURE), rerun)
+        assert verdict.passed
+        assert verdict.runs == 3 and verdict.confidence >= options.confidence
+
+    def test_stops_at_max_runs(self):
+        oracle = FlakyTestOracle(flake_rate=0.5, miss_rate=0.5, max_runs=3)
+        oracle.signature = self.SIGNATURE
+        rerun, runs = self.rerun_with([TestRun(True), TestRun(False, self.SIGNATURE)])
+        assert oracle.judge(TestRun(False, self.SIGNATURE), rerun).runs == 3
+
+    def test_flakes_raise_the_flake_rate(self):
+        oracle = FlakyTestOracle()
+        oracle.signature = self.SIGNATURE
+        before = oracle.flake_rate
+        rerun, _ = self.rerun_with([TestRun(True)] * 5)
+        assert oracle.judge(TestRun(False, self.SIGNATURE), rerun).passed
+        assert oracle.flake_rate > before
+
+
+def test_judge_tests_reruns_only_the_signature(monkeypatch):
+    runs = []
+    monkeypatch.setattr(
+        requirements_tester,
+        "run_pytest",
+        fake_run_pytest(runs, [TestRun(False, ["tests/test_a.py::test_a"]) for _ in range(2)]),
+    )
+    oracle = FlakyTestOracle()
+    oracle.signature = ["tests/test_a.py::test_a"]
+    verdict = requirements_tester.judge_tests(None, oracle)
+    assert not verdict.passed
+    assert runs == [[], ["tests/test_a.py::test_a"]]
@@ -0,0 +1,69 @@
+import json
+import threading
+
+from tracing import ProgressLine, Tracer, estimate_remaining_probes, format_duration
+
+
+class TestTracer:
+    def test_nested_spans_inherit_probe_id(self):
+        tracer = Tracer(enabled=True)
+        with tracer.span("probe", probe_id=tracer.next_probe_id(), subset_size=3) as probe:
+            with tracer.span("compile attempt", attempt=1) as attempt:
+                attempt["outcome"] = "resolved"
+            probe["outcome"] = "passed"
+        with tracer.span("search decision"):
+            pass
+
+        compile_attempt, probe, decision = tracer.spans
+        assert compile_attempt.args == {"attempt": 1, "outcome": "resolved", "probe_id": 1}
+        assert probe.args == {"probe_id": 1, "subset_size": 3, "outcome": "passed"}
+        assert "probe_id" not in decision.args
+        assert probe.duration >= compile_attempt.duration
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer()
+        with tracer.span("probe"):
+            pass
+        assert tracer.spans == []
+
+    def test_chrome_trace(self, tmp_path):
+        tracer = Tracer(enabled=True)
+
+        def probe():
+            with tracer.span("probe", probe_id=tracer.next_probe_id(), unpinned={"rx"}):
+                pass
+
+        # one thread after the other, so the second may well reuse the first one's threading.get_ident()
+        for _ in range(2):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+
+        path = tmp_path / "trace.json"
+        tracer.write_chrome_trace(str(path))
+        events = json.loads(path.read_text())["traceEvents"]
+        assert [e["ph"] for e in events] == ["X", "X"]
+        assert sorted(e["args"]["probe_id"] for e in events) == [1, 2]
+        assert sorted(e["tid"] for e in events) == [0, 1]
+        assert events[0]["args"]["unpinned"] == "{'rx'}"
+
+    def test_summary(self):
+        tracer = Tracer(enabled=True)
+        for _ in range(3):
+            with tracer.span("pytest"):
+                pass
+        summary = tracer.summary().splitlines()
+        assert summary[0].split() == ["span", "count", "total", "s", "mean", "s", "max", "s"]
+        assert summary[1].split()[:2] == ["pytest", "3"]
+
+
+class TestProgress:
+    def test_estimate_remaining_probes(self):
+        assert estimate_remaining_probes(1) == 0
+        assert estimate_remaining_probes(2) == 1
+        assert estimate_remaining_probes(9) == 4
+
+    def test_format(self):
+        assert format_duration(75) == "1m15s"
+        assert format_duration(3725) == "1h02m05s"
+        assert ProgressLine().format(0, 3).endswith("about 3 left, ETA 0m00s")
@@ -0,0 +1,138 @@
+import math
+
+import pytest
+
+import requirements_tester
+from reqparser import Requirement
+from resolution_cache import Resolution
+from workspace import ProbePool
+from versions import find_first_bad_version, versions_between
+
+
+class TestVersionsBetween:
+    def test_range_is_sorted_and_exclusive_of_old(self):
+        versions = ["2.0.0", "1.10.0", "1.2.0", "1.9.0", "0.9", "not-a-version"]
+        assert versions_between(versions, "1.2.0", "1.10.0") == ["1.9.0", "1.10.0"]
+
+    def test_prereleases(self):
+        versions = ["1.1.0", "1.2.0rc1", "1.2.0"]
+        assert versions_between(versions, "1.0.0", "1.2.0") == ["1.1.0", "1.2.0"]
+        assert versions_between(versions, "1.0.0", "1.2.0rc1") == ["1.1.0", "1.2.0rc1"]
+
+
+class TestFindFirstBadVersion:
+    @pytest.mark.parametrize("size", [1, 2, 3, 15, 64])
+    def test_every_position(self, size):
+        candidates = [f"1.{idx}" for idx in range(size)]
+        for first_bad in range(size):
+            probed = []
+
+            def is_good(version):
+                probed.append(version)
+                return candidates.index(version) < first_bad
+
+            assert find_first_bad_version(candidates, is_good) == candidates[first_bad]
+            assert candidates[-1] not in probed
+            assert len(probed) == len(set(probed))
+            assert len(probed) <= 2 * math.ceil(math.log2(first_bad + 2))
+
+    def test_skips_untestable_releases(self):
+        candidates = [f"1.{idx}" for idx in range(16)]
+        for first_bad in range(len(candidates)):
+            for skipped in range(len(candidates) - 1):
+                if skipped == first_bad:
+                    continue
+
+                def is_good(version):
+                    idx = candidates.index(version)
+                    return None if idx == skipped else idx < first_bad
+
+                assert find_first_bad_version(candidates, is_good) == candidates[first_bad]
+
+    def test_empty(self):
+        assert find_first_bad_version([], lambda version: True) is None
+
+
+class TestBisectVersions:
+    def test_pins_only_the_culprit(self, monkeypatch):
+        reqs = [Requirement.parse("six==1.0.0"), Requirement.parse("rx==1.6.1")]
+        probes = []
+
+        def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+            pins = {r.name: r.specs[0][1] for r in all_requirements}
+            probes.append(pins)
+            assert not unversioned_requirements
+            assert options.journal is None
+            return pins["six"] < "1.4.0"
+
+        monkeypatch.setattr(requirements_tester, "run_probe", run_probe)
+        monkeypatch.setattr(
+            requirements_tester,
+            "list_available_versions",
+            lambda name, pip_args: [f"1.{idx}.0" for idx in range(8)],
+        )
+        assert requirements_tester.bisect_versions(reqs[0], reqs, "1.0.0", "1.7.0") == "1.4.0"
+        assert all(pins["rx"] == "1.6.1" for pins in probes)
+
+    def test_probes_run_in_pool_workspaces(self, monkeypatch, tmp_path):
+        reqs = [Requirement.parse("six==1.0.0")]
+        workspaces = []
+
+        def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+            workspaces.append(workspace)
+            return all_requirements[0].specs[0][1] < "1.2.0"
+
+        monkeypatch.setattr(requirements_tester, "run_probe", run_probe)
+        monkeypatch.setattr(
+            requirements_tester, "list_available_versions", lambda name, pip_args: ["1.1.0", "1.2.0", "1.3.0"]
+        )
+        (tmp_path / "requirements.dev.in").write_text("")
+        pool = ProbePool(1, str(tmp_path / "workspaces"), str(tmp_path), create_virtualenvs=False)
+        try:
+            assert requirements_tester.bisect_versions(reqs[0], reqs, "1.0.0", "1.3.0", pool=pool) == "1.2.0"
+        finally:
+            pool.shutdown()
+        assert workspaces and None not in workspaces
+
+    def test_untestable_releases_are_skipped(self, monkeypatch):
+        reqs = [Requirement.parse("six==1.0.0")]
+        untestable = {"1.2.0"}
+
+        def run_probe(unversioned_requirements, all_requirements, options=None, workspace=None):
+            version = all_requirements[0].specs[0][1]
+            if version in untestable:
+                raise requirements_tester.PinnedVersionConflict({"six"})
+            return version < "1.4.0"
+
+        monkeypatch.setattr(requirements_tester, "run_probe", run_probe)
+        monkeypatch.setattr(
+            requirements_tester,
+            "list_available_versions",
+            lambda name, pip_args: [f"1.{idx}.0" for idx in range(8)],
+        )
+        assert requirements_tester.bisect_versions(reqs[0], reqs, "1.0.0", "1.7.0") == "1.4.0"
+        # the first bad release could be the one that cannot be tested
+        untestable.add("1.3.0")
+        assert requirements_tester.bisect_versions(reqs[0], reqs, "1.0.0", "1.7.0") is None
+
+
+class TestKeepPinned:
+    def test_conflict_unpins_the_other_requirements(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        reqs = [Requirement.parse("six==1.1.0"), Requirement.parse("rx==1.6.1")]
+        resolutions = [Resolution(conflicts={"six", "rx"}), Resolution("", "")]
+        monkeypatch.setattr(requirements_tester, "resolve_requirements", lambda *args: resolutions.pop(0))
+        unversioned = set()
+        requirements_tester.generate_requirements_txt_file(unversioned, reqs, keep_pinned={"six"})
+        assert unversioned == {"rx"}
+
+    def test_conflict_with_nothing_else_to_unpin_raises(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        reqs = [Requirement.parse("six==1.1.0"), Requirement.parse("rx==1.6.1")]
+        monkeypatch.setattr(
+            requirements_tester, "resolve_requirements", lambda *args: Resolution(conflicts={"six", "rx"})
+        )
+        # retrying with six unpinned would test whichever six the resolver picks, not 1.1.0
+        with pytest.raises(requirements_tester.PinnedVersionConflict) as raised:
+            requirements_tester.generate_requirements_txt_file(set(), reqs, keep_pinned={"six"})
+        assert raised.value.names == {"six"}
@@ -0,0 +1,113 @@
+import os
+import pathlib
+import threading
+
+import pytest
+
+import requirements_tester
+from reqparser import RequirementsParser
+from work_queue import ProbeFailed, QueueCoordinator, WorkQueue, run_worker
+
+
+@pytest.fixture
+def reqs():
+    with open(pathlib.Path("./testfiles") / "requirements_all.txt", "r") as f:
+        return RequirementsParser(f).parse()
+
+
+def start_worker(root, probe, worker_id):
+    thread = threading.Thread(
+        target=run_worker, args=(WorkQueue(root), probe, worker_id, 0.01, 0.01), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def passes_without(culprit):
+    def probe(unpinned):
+        return {"passed": culprit not in unpinned}
+
+    return probe
+
+
+class TestQueueCoordinator:
+    def test_workers_report_results(self, tmp_path):
+        root = str(tmp_path / "queue")
+        reported = []
+        coordinator = QueueCoordinator(
+            root, 2, {}, on_result=lambda unpinned, result: reported.append((unpinned, result)), poll_interval=0.01
+        )
+        workers = [start_worker(root, passes_without("pytz"), f"worker-{idx}") for idx in range(2)]
+        futures = [coordinator.submit(None, {"pytz", "django"}), coordinator.submit(None, {"django"})]
+        assert [future.result(timeout=10) for future in futures] == [False, True]
+        coordinator.shutdown()
+        for worker in workers:
+            worker.join(timeout=10)
+            assert not worker.is_alive()
+        assert sorted(sorted(unpinned) for unpinned, _ in reported) == [["django"], ["django", "pytz"]]
+        assert {result["worker"] for _, result in reported} <= {"worker-0", "worker-1"}
+
+    def test_cancelled_probe_is_withdrawn(self, tmp_path):
+        root = str(tmp_path / "queue")
+        coordinator = QueueCoordinator(root, 1, {}, poll_interval=0.01)
+        future = coordinator.submit(None, {"pytz"})
+        assert future.cancel()
+        coordinator.poll()
+        assert os.listdir(coordinator.queue.path("pending")) == []
+        coordinator.shutdown()
+
+    def test_probe_of_dead_worker_is_reassigned(self, tmp_path):
+        root = str(tmp_path / "queue")
+        coordinator = QueueCoordinator(root, 1, {}, heartbeat_timeout=0.05, poll_interval=0.01)
+        future = coordinator.submit(None, {"pytz"})
+        # a worker that claimed the probe and then died without ever bumping its heartbeat again
+        queue = WorkQueue(root)
+        with open(queue.path("workers", "dead"), "w") as f:
+            f.write("0")
+        assert queue.claim("dead") is not None
+
+        start_worker(root, passes_without("pytz"), "alive")
+        assert future.result(timeout=10) is False
+        assert coordinator.reassigned == 1
+        coordinator.shutdown()
+
+
+def test_search_through_queue(reqs, tmp_path):
+    root = str(tmp_path / "queue")
+    coordinator = QueueCoordinator(root, 3, {}, poll_interval=0.01)
+    workers = [start_worker(root, passes_without("pytz"), f"worker-{idx}") for idx in range(3)]
+    try:
+        culprits = requirements_tester.search(reqs, {r.name for r in reqs}, pool=coordinator)
+    finally:
+        coordinator.shutdown()
+    assert [r.name for r in culprits] == ["pytz"]
+    for worker in workers:
+        worker.join(timeout=10)
+
+
+def test_probe_that_raises_fails_its_future(tmp_path):
+    root = str(tmp_path / "queue")
+    reported = []
+    coordinator = QueueCoordinator(
+        root, 1, {}, on_result=lambda unpinned, result: reported.append(result), poll_interval=0.01
+    )
+
+    def probe(unpinned):
+        if "pytz" in unpinned:
+            raise RuntimeError("pip-sync failed")
+        return {"passed": True}
+
+    worker = start_worker(root, probe, "worker-0")
+    failing, passing = coordinator.submit(None, {"pytz"}), coordinator.submit(None, {"django"})
+    with pytest.raises(ProbeFailed, match="pip-sync failed"):
+        failing.result(timeout=10)
+    # the worker carries on with the next probe
+    assert passing.result(timeout=10) is True
+    coordinator.shutdown()
+    worker.join(timeout=10)
+    assert [result["passed"] for result in reported] == [True]
+
+
+def test_options_workers_cannot_apply_are_rejected():
+    with pytest.raises(SystemExit):
+        requirements_tester.parse_args(["--queue-dir", "queue", "--flaky-tests"])
@@ -0,0 +1,160 @@
+import json
+import os
+import re
+import threading
+import typing as t
+
+# pytest's short test summary, enabled with -rfE. Parametrize ids can contain " - ", so they are matched separately
+FAILED_LINE_REGEX = re.compile(r"^(?:FAILED|ERROR) ([^\s\[]+(?:\[.*?\])?)(?: - .*)?$")
+
+
+def parse_failed_node_ids(pytest_output: str) -> list[str]:
+    node_ids = []
+    for line in pytest_output.splitlines():
+        matches = FAILED_LINE_REGEX.match(line.rstrip())
+        if matches and matches.group(1) not in node_ids:
+            node_ids.append(matches.group(1))
+    return node_ids
+
+
+class FailureWatcher:
+    # reads pytest -v output, where each result line starts with the node id
+    def __init__(self, node_ids: t.Iterable[str]):
+        self.node_ids = list(node_ids)
+        self.failed_node_ids: list[str] = []
+
+    def __call__(self, line: str) -> bool:
+        if " FAILED" not in line and " ERROR" not in line:
+            return False
+        for node_id in self.node_ids:
+            if line.startswith(node_id + " "):
+                self.failed_node_ids.append(node_id)
+                return True
+        return False
+
+
+class TestRun:
+    # not a test class, despite the name
+    __test__ = False
+
+    def __init__(self, passed: bool, failed_node_ids: t.Sequence[str] = ()):
+        self.passed = passed
+        self.failed_node_ids = list(failed_node_ids)
+
+
+class FailureFirstSelector:
+    def __init__(self, path: t.Optional[str] = None, resume: bool = False):
+        self.path = path
+        self.baseline_failures: t.Optional[list[str]] = None
+        if resume and path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.baseline_failures = json.load(f)
+
+    def record_baseline(self, failed_node_ids: t.Sequence[str]):
+        self.baseline_failures = list(failed_node_ids)
+        print("Recorded", len(self.baseline_failures), "failing tests to run first on every probe")
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.baseline_failures, f, indent=1)
+
+
+class Verdict:
+    def __init__(self, passed: bool, confidence: float, runs: int):
+        self.passed = passed
+        self.confidence = confidence
+        self.runs = runs
+
+
+class FlakyTestOracle:
+    # Decides probes by whether the failure signature, the tests that failed with everything unpinned, shows up
+    # again, rather than by pytest's exit status. A run where only other tests fail is unrelated noise. Each run is
+    # one observation, and the tests are run again while neither verdict has the required confidence. How often a
+    # good probe shows the signature anyway (flake_rate) and a bad one doesn't (miss_rate) start from the given
+    # priors and are updated from every decided probe, so a flakier suite gets more runs per probe. With low
+    # rates a single reproducing run would already be conclusive, and a flake would then blame a good probe, so
+    # a failed verdict also needs the signature to show up in REPRODUCTIONS_TO_FAIL runs
+    PRIOR_RUNS = 20
+    REPRODUCTIONS_TO_FAIL = 2
+
+    def __init__(
+        self,
+        path: t.Optional[str] = None,
+        resume: bool = False,
+        confidence: float = 0.9,
+        max_runs: int = 5,
+        flake_rate: float = 0.05,
+        miss_rate: float = 0.05,
+    ):
+        self.path = path
+        self.confidence = confidence
+        self.max_runs = max_runs
+        self.signature: t.Optional[list[str]] = None
+        # [signature seen, runs] on probes judged good, and [signature missing, runs] on probes judged bad
+        self._flakes = [flake_rate * self.PRIOR_RUNS, float(self.PRIOR_RUNS)]
+        self._misses = [miss_rate * self.PRIOR_RUNS, float(self.PRIOR_RUNS)]
+        self._lock = threading.Lock()
+        if resume and path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.signature = json.load(f)
+
+    def record_signature(self, failed_node_ids: t.Sequence[str]):
+        self.signature = list(failed_node_ids)
+        print("Recorded a failure signature of", len(self.signature), "tests")
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.signature, f, indent=1)
+
+    @property
+    def flake_rate(self) -> float:
+        with self._lock:
+            return self._flakes[0] / self._flakes[1]
+
+    @property
+    def miss_rate(self) -> float:
+        with self._lock:
+            return self._misses[0] / self._misses[1]
+
+    def reproduces(self, test_run: TestRun) -> bool:
+        if test_run.passed:
+            return False
+        # a run that failed without reporting any test, e.g. a collection error or a timeout, can't be told apart
+        if not self.signature or not test_run.failed_node_ids:
+            return True
+        return not set(test_run.failed_node_ids).isdisjoint(self.signature)
+
+    def probability_bad(self, observations: t.Sequence[bool]) -> float:
+        # posterior that the probe really reproduces the failure, from an even prior
+        flake_rate, miss_rate = self.flake_rate, self.miss_rate
+        reproduced = sum(observations)
+        missed = len(observations) - reproduced
+        bad = (1 - miss_rate) ** reproduced * miss_rate**missed
+        good = flake_rate**reproduced * (1 - flake_rate) ** missed
+        return bad / (bad + good)
+
+    def _decided(self, observations: t.Sequence[bool], probability_bad: float) -> bool:
+        if max(probability_bad, 1 - probability_bad) < self.confidence:
+            return False
+        return probability_bad < 0.5 or sum(observations) >= self.REPRODUCTIONS_TO_FAIL
+
+    def judge(self, first_run: TestRun, rerun: t.Callable[[], TestRun]) -> Verdict:
+        if self.signature is None:
+            # the first failing run is the probe with everything unpinned, which is what the search explains
+            if not first_run.passed:
+                self.record_signature(first_run.failed_node_ids)
+            return Verdict(first_run.passed, 1.0, 1)
+        observations = [self.reproduces(first_run)]
+        probability_bad = self.probability_bad(observations)
+        while len(observations) < self.max_runs and not self._decided(observations, probability_bad):
+            observations.append(self.reproduces(rerun()))
+            probability_bad = self.probability_bad(observations)
+        passed = probability_bad < 0.5
+        with self._lock:
+            if passed:
+                self._flakes[0] += sum(observations)
+                self._flakes[1] += len(observations)
+            else:
+                self._misses[0] += len(observations) - sum(observations)
+                self._misses[1] += len(observations)
+        return Verdict(passed, max(probability_bad, 1 - probability_bad), len(observations))
@@ -0,0 +1,142 @@
+import collections
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+import typing as t
+
+
+def _json_value(value):
+    return value if isinstance(value, (int, float, str, bool)) or value is None else str(value)
+
+
+class Span:
+    def __init__(self, name: str, start: float, thread_id: int, args: dict):
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.thread_id = thread_id
+        # callers can attach results, e.g. the outcome, while the span is open
+        self.args = args
+
+    def __setitem__(self, key: str, value):
+        self.args[key] = value
+
+
+class Tracer:
+    # Records nested spans per thread. Spans inherit the probe_id of the span they are opened in, so every
+    # compile attempt, install and test run can be attributed to its probe
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: list[Span] = []
+        self._started = time.perf_counter()
+        self._probe_ids = iter(range(1, 1 << 62))
+        self._thread_ids = iter(range(1 << 62))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _thread_id(self) -> int:
+        # numbered in the order threads first open a span. threading.get_ident() values are reused once a thread
+        # exits, which would merge short-lived probe threads into one row of the trace
+        if not hasattr(self._local, "thread_id"):
+            with self._lock:
+                self._local.thread_id = next(self._thread_ids)
+        return self._local.thread_id
+
+    def next_probe_id(self) -> int:
+        with self._lock:
+            return next(self._probe_ids)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args) -> t.Iterator[Span]:
+        stack = self._stack()
+        if stack and "probe_id" in stack[-1].args:
+            args.setdefault("probe_id", stack[-1].args["probe_id"])
+        span = Span(name, time.perf_counter() - self._started, self._thread_id(), args)
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            stack.pop()
+            span.duration = time.perf_counter() - self._started - span.start
+            if self.enabled:
+                with self._lock:
+                    self.spans.append(span)
+
+    def chrome_trace(self) -> dict:
+        # complete ("X") events, readable by chrome://tracing and https://ui.perfetto.dev
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "traceEvents": [
+                {
+                    "name": s.name,
+                    "ph": "X",
+                    "ts": round(s.start * 1e6),
+                    "dur": round(s.duration * 1e6),
+                    "pid": os.getpid(),
+                    "tid": s.thread_id,
+                    "args": {key: _json_value(value) for key, value in s.args.items()},
+                }
+                for s in sorted(spans, key=lambda s: s.start)
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_chrome_trace(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self) -> str:
+        with self._lock:
+            spans = list(self.spans)
+        by_name: dict[str, list[float]] = collections.defaultdict(list)
+        for s in spans:
+            by_name[s.name].append(s.duration)
+        lines = [f"{'span':<24} {'count':>6} {'total s':>10} {'mean s':>9} {'max s':>9}"]
+        for name, durations in sorted(by_name.items(), key=lambda item: -sum(item[1])):
+            lines.append(
+                f"{name:<24} {len(durations):>6} {sum(durations):>10.2f}"
+                f" {sum(durations) / len(durations):>9.2f} {max(durations):>9.2f}"
+            )
+        return "\n".join(lines)
+
+
+# spans are recorded from deep inside the probe pipeline, so there is one tracer for the whole run
+TRACER = Tracer()
+
+
+def span(name: str, **args) -> t.ContextManager[Span]:
+    return TRACER.span(name, **args)
+
+
+def estimate_remaining_probes(candidates: int) -> int:
+    # each probe halves the candidates, and the last one left is confirmed on its own
+    return math.ceil(math.log2(candidates)) if candidates > 1 else 0
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class ProgressLine:
+    def __init__(self):
+        self._started = time.monotonic()
+
+    def format(self, probes_run: int, remaining_probes: int) -> str:
+        elapsed = time.monotonic() - self._started
+        average = elapsed / probes_run if probes_run else 0.0
+        return (
+            f"Progress: {probes_run} probes in {format_duration(elapsed)}, {average:.1f}s per probe,"
+            f" about {remaining_probes} left, ETA {format_duration(average * remaining_probes)}"
+        )
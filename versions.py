@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import typing as t
+
+from packaging.version import InvalidVersion, Version
+
+AVAILABLE_VERSIONS_PREFIX = "Available versions:"
+
+
+def list_available_versions(name: str, pip_args: t.Sequence[str] = ()) -> list[str]:
+    # pip index honours --no-index/--find-links, so this also works against a wheelhouse
+    result = subprocess.run(
+        [sys.executable, "-m", "pip", "index", "versions", name, *pip_args], capture_output=True, check=True
+    )
+    for line in result.stdout.decode("utf-8").splitlines():
+        if line.startswith(AVAILABLE_VERSIONS_PREFIX):
+            return [version.strip() for version in line[len(AVAILABLE_VERSIONS_PREFIX) :].split(",")]
+    return []
+
+
+def versions_between(versions: t.Iterable[str], old_version: str, new_version: str) -> list[str]:
+    # releases after the old pin, up to and including the new version, oldest first. Pre-releases are only
+    # kept when the new version is one, as that is the only way the resolver could have picked them
+    old, new = Version(old_version), Version(new_version)
+    between = []
+    for version in versions:
+        try:
+            parsed = Version(version)
+        except InvalidVersion:
+            continue
+        if old < parsed <= new and (not parsed.is_prerelease or new.is_prerelease):
+            between.append((parsed, version))
+    return [version for _, version in sorted(between)]
+
+
+def find_first_bad_version(
+    candidates: t.Sequence[str], is_good: t.Callable[[str], t.Optional[bool]]
+) -> t.Optional[str]:
+    # candidates are ordered oldest first. The release before the first one is known to be good and the last
+    # one known to be bad, so it is never probed. Galloping from the good end finds a bracket around the first
+    # bad release in O(log k) probes, where k is its position, and binary search narrows the bracket down.
+    # is_good returns None for a release that cannot be tested, which is skipped like with git bisect skip, so
+    # skipped releases just before the result may be the actual first bad one
+    remaining = list(candidates)
+    if not remaining:
+        return None
+    good, bad = -1, len(remaining) - 1
+    step = 1
+    while good + step < bad:
+        verdict = is_good(remaining[good + step])
+        if verdict is None:
+            del remaining[good + step]
+            bad -= 1
+        elif verdict:
+            good += step
+            step *= 2
+        else:
+            bad = good + step
+            break
+    while bad - good > 1:
+        middle = (good + bad) // 2
+        verdict = is_good(remaining[middle])
+        if verdict is None:
+            del remaining[middle]
+            bad -= 1
+        elif verdict:
+            good = middle
+        else:
+            bad = middle
+    return remaining[bad]
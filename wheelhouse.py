@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+import typing as t
+
+# needed to build sdists while resolving without an index
+BUILD_REQUIREMENTS = ("setuptools", "wheel")
+
+
+class Wheelhouse:
+    # Probes look here before the index. Only the two ends of the search are prefetched, and a probe in between
+    # can resolve a version neither of them has, so the index stays as the fallback unless running offline
+    def __init__(self, directory: str, offline: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.offline = offline
+
+    def pip_args(self) -> list[str]:
+        if self.offline:
+            return ["--no-index", "--find-links", self.directory]
+        return ["--find-links", self.directory]
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.directory) and bool(os.listdir(self.directory))
+
+    def _download(self, args: t.Sequence[str]):
+        os.makedirs(self.directory, exist_ok=True)
+        # lock files are complete, so there is nothing for pip to resolve
+        subprocess.run(
+            [sys.executable, "-m", "pip", "download", "--no-deps", "--quiet", "--dest", self.directory, *args],
+            check=True,
+        )
+
+    def download_lock_file(self, lock_file: str):
+        print("Prefetching", lock_file, "into", self.directory)
+        self._download(["-r", lock_file])
+
+    def download_build_requirements(self):
+        self._download(BUILD_REQUIREMENTS)
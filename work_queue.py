@@ -0,0 +1,263 @@
+import concurrent.futures
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import typing as t
+import uuid
+
+QUEUE_DIRS = ("pending", "claimed", "results", "workers")
+RUN_FILE = "run.json"
+STOP_FILE = "stop"
+
+
+def _write_json(path: str, data: dict):
+    # written under a temporary name and renamed, so a reader never sees half a file
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    # A directory shared by the coordinator and its workers, on a network filesystem when the workers run on
+    # other hosts. Each probe spec is a file, and moving it between the state directories is an atomic rename,
+    # so exactly one worker claims it
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def reset(self, run: dict):
+        for directory in QUEUE_DIRS[:-1]:
+            shutil.rmtree(self.path(directory), ignore_errors=True)
+        for directory in QUEUE_DIRS:
+            os.makedirs(self.path(directory), exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path(STOP_FILE))
+        _write_json(self.path(RUN_FILE), run)
+
+    def run(self) -> t.Optional[dict]:
+        try:
+            return _read_json(self.path(RUN_FILE))
+        except FileNotFoundError:
+            return None
+
+    def stopped(self) -> bool:
+        return os.path.exists(self.path(STOP_FILE))
+
+    def stop(self):
+        with open(self.path(STOP_FILE), "w"):
+            pass
+
+    def enqueue(self, probe_id: str, spec: dict):
+        _write_json(self.path("pending", f"{probe_id}.json"), spec)
+
+    def claim(self, worker_id: str) -> t.Optional[str]:
+        # specs are named in submission order, so the probe the search is waiting on goes before speculative ones
+        for name in sorted(os.listdir(self.path("pending"))):
+            if not name.endswith(".json"):
+                continue
+            claimed = self.path("claimed", f"{name[:-len('.json')]}@{worker_id}.json")
+            try:
+                os.rename(self.path("pending", name), claimed)
+            except FileNotFoundError:
+                # another worker got there first
+                continue
+            return claimed
+        return None
+
+    def claims(self) -> dict[str, str]:
+        # probe ID to the worker holding it
+        claims = {}
+        for name in os.listdir(self.path("claimed")):
+            if name.endswith(".json"):
+                probe_id, worker_id = name[: -len(".json")].split("@", 1)
+                claims[probe_id] = worker_id
+        return claims
+
+    def release(self, probe_id: str, worker_id: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.replace(self.path("claimed", f"{probe_id}@{worker_id}.json"), self.path("pending", f"{probe_id}.json"))
+
+    def heartbeat(self, worker_id: str) -> t.Optional[str]:
+        try:
+            with open(self.path("workers", worker_id), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class Heartbeat:
+    # Bumps a counter in the worker's heartbeat file while the worker is alive. The coordinator only checks whether
+    # the counter changes, so the hosts' clocks don't need to agree
+    def __init__(self, queue: WorkQueue, worker_id: str, interval: float):
+        self.path = queue.path("workers", worker_id)
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        for beat in itertools.count():
+            with open(self.path, "w") as f:
+                f.write(str(beat))
+            if self._stopped.wait(self.interval):
+                return
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+class ProbeFailed(Exception):
+    # raised from a probe's future when the probe raised on the worker
+    pass
+
+
+class QueueCoordinator:
+    # Takes the place of a ProbePool in search(): each submitted probe is written to the queue and its future is
+    # resolved once a worker reports back. Probes held by a worker whose heartbeat stops are put back in the queue
+    def __init__(
+        self,
+        root: str,
+        jobs: int,
+        run: dict,
+        on_result: t.Optional[t.Callable[[frozenset[str], dict], None]] = None,
+        heartbeat_timeout: float = 60.0,
+        poll_interval: float = 0.5,
+    ):
+        self.queue = WorkQueue(root)
+        self.queue.reset(run)
+        self.jobs = jobs
+        self.on_result = on_result
+        self.heartbeat_timeout = heartbeat_timeout
+        self.poll_interval = poll_interval
+        self.reassigned = 0
+        self._ids = itertools.count()
+        self._futures: dict[str, tuple[concurrent.futures.Future, frozenset[str]]] = {}
+        self._heartbeats: dict[str, tuple[t.Optional[str], float]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def submit(self, probe: t.Callable, spec: t.Iterable[str]) -> "concurrent.futures.Future[bool]":
+        # the probe function is only there to match ProbePool, workers run their own copy of run_probe
+        unpinned = frozenset(spec)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            probe_id = f"{next(self._ids):06d}"
+            self._futures[probe_id] = (future, unpinned)
+        self.queue.enqueue(probe_id, {"id": probe_id, "unpinned": sorted(unpinned)})
+        return future
+
+    def _worker_alive(self, worker_id: str) -> bool:
+        beat = self.queue.heartbeat(worker_id)
+        now = time.monotonic()
+        last = self._heartbeats.get(worker_id)
+        if last is None or last[0] != beat:
+            self._heartbeats[worker_id] = (beat, now)
+            return True
+        return now - last[1] < self.heartbeat_timeout
+
+    def poll(self):
+        claims = self.queue.claims()
+        with self._lock:
+            futures = list(self._futures.items())
+        for probe_id, (future, unpinned) in futures:
+            result_path = self.queue.path("results", f"{probe_id}.json")
+            if os.path.exists(result_path):
+                result = _read_json(result_path)
+                os.remove(result_path)
+                # a probe that was reassigned may still be waiting for a second worker
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.queue.path("pending", f"{probe_id}.json"))
+                with self._lock:
+                    del self._futures[probe_id]
+                if "error" in result:
+                    if not future.cancelled():
+                        error = f"Probe {probe_id} failed on worker {result['worker']}: {result['error']}"
+                        future.set_exception(ProbeFailed(error))
+                    continue
+                if self.on_result is not None:
+                    self.on_result(unpinned, result)
+                if not future.cancelled():
+                    future.set_result(result["passed"])
+            elif future.cancelled():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.queue.path("pending", f"{probe_id}.json"))
+                with self._lock:
+                    del self._futures[probe_id]
+            elif probe_id in claims:
+                if not future.running():
+                    future.set_running_or_notify_cancel()
+                worker_id = claims[probe_id]
+                if not self._worker_alive(worker_id):
+                    print(f"Worker {worker_id} stopped responding, putting probe {probe_id} back in the queue")
+                    self.queue.release(probe_id, worker_id)
+                    self.reassigned += 1
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.poll()
+
+    def shutdown(self):
+        self._stopped.set()
+        self._thread.join()
+        self.queue.stop()
+        with self._lock:
+            for future, _ in self._futures.values():
+                future.cancel()
+        if self.reassigned:
+            print(f"{self.reassigned} probes were reassigned from workers that stopped responding")
+
+
+def run_worker(
+    queue: WorkQueue,
+    probe: t.Callable[[frozenset[str]], dict],
+    worker_id: t.Optional[str] = None,
+    poll_interval: float = 1.0,
+    heartbeat_interval: float = 5.0,
+) -> int:
+    # Claims and runs probes until the coordinator stops the queue. probe returns the result to report, which
+    # needs at least "passed". A probe that raises is reported with its "error" instead, so the coordinator isn't
+    # left waiting on it. Returns how many probes this worker ran
+    worker_id = worker_id or default_worker_id()
+    probes = 0
+    with Heartbeat(queue, worker_id, heartbeat_interval):
+        while not queue.stopped():
+            claimed = queue.claim(worker_id)
+            if claimed is None:
+                time.sleep(poll_interval)
+                continue
+            spec = _read_json(claimed)
+            started = time.monotonic()
+            try:
+                result = dict(probe(frozenset(spec["unpinned"])))
+            except Exception as e:
+                print(f"Probe {spec['id']} failed: {e!r}")
+                result = {"error": repr(e)}
+            result.update(id=spec["id"], worker=worker_id, seconds=round(time.monotonic() - started, 3))
+            _write_json(queue.path("results", f"{spec['id']}.json"), result)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(claimed)
+            probes += 1
+    return probes
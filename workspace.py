@@ -0,0 +1,108 @@
+import concurrent.futures
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import typing as t
+
+WORKSPACE_INPUT_FILES = ("requirements.dev.in",)
+
+T = t.TypeVar("T")
+R = t.TypeVar("R")
+
+
+class VirtualEnvironment:
+    def __init__(self, venv_dir: str):
+        self.venv_dir = os.path.abspath(venv_dir)
+
+    @property
+    def bin_dir(self) -> str:
+        return os.path.join(self.venv_dir, "Scripts" if sys.platform == "win32" else "bin")
+
+    @property
+    def python(self) -> str:
+        return os.path.join(self.bin_dir, "python")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.python)
+
+    def create(self):
+        subprocess.run([sys.executable, "-m", "venv", self.venv_dir], capture_output=True, check=True)
+
+    def environ(self) -> dict[str, str]:
+        env = dict(os.environ)
+        env.pop("PYTHONHOME", None)
+        env["VIRTUAL_ENV"] = self.venv_dir
+        env["PATH"] = self.bin_dir + os.pathsep + env.get("PATH", "")
+        return env
+
+
+class ProbeWorkspace:
+    def __init__(self, root: str, project_dir: str):
+        self.project_dir = os.path.abspath(project_dir)
+        self.directory = tempfile.mkdtemp(dir=root, prefix="probe-")
+        # replaced by a pooled environment when one is checked out for this probe
+        self.venv = VirtualEnvironment(os.path.join(self.directory, "venv"))
+        for filename in WORKSPACE_INPUT_FILES:
+            shutil.copy(os.path.join(self.project_dir, filename), self.directory)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ProbePool:
+    def __init__(
+        self,
+        jobs: int,
+        root: str,
+        project_dir: str = ".",
+        keep_workspaces: bool = False,
+        create_virtualenvs: bool = True,
+    ):
+        self.jobs = jobs
+        self.create_virtualenvs = create_virtualenvs
+        self.root = os.path.abspath(root)
+        self.project_dir = project_dir
+        self.keep_workspaces = keep_workspaces
+        os.makedirs(self.root, exist_ok=True)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+
+    def _run_isolated(self, probe: t.Callable[[T, ProbeWorkspace], R], spec: T, project_dir: str) -> R:
+        workspace = ProbeWorkspace(self.root, project_dir)
+        try:
+            if self.create_virtualenvs:
+                workspace.venv.create()
+            return probe(spec, workspace)
+        finally:
+            if not self.keep_workspaces:
+                workspace.cleanup()
+
+    def submit(
+        self, probe: t.Callable[[T, ProbeWorkspace], R], spec: T, project_dir: t.Optional[str] = None
+    ) -> "concurrent.futures.Future[R]":
+        return self._executor.submit(self._run_isolated, probe, spec, project_dir or self.project_dir)
+
+    def map(self, probe: t.Callable[[T, ProbeWorkspace], R], specs: t.Iterable[T]) -> list[R]:
+        futures = [self.submit(probe, spec) for spec in specs]
+        return [future.result() for future in futures]
+
+    def for_project(self, project_dir: str) -> "ProjectProbePool":
+        return ProjectProbePool(self, project_dir)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class ProjectProbePool:
+    # one project's view of a ProbePool shared between several projects' searches
+    def __init__(self, pool: ProbePool, project_dir: str):
+        self.pool = pool
+        self.project_dir = project_dir
+        self.jobs = pool.jobs
+
+    def submit(self, probe: t.Callable[[T, ProbeWorkspace], R], spec: T) -> "concurrent.futures.Future[R]":
+        return self.pool.submit(probe, spec, self.project_dir)